@@ -1,18 +1,14 @@
 # -*- coding: utf-8 -*-
 from mcp.server.fastmcp import FastMCP
 import sys
-from tools.email_qq import register_email_tools
-from tools.system import register_system_tools
-from tools.web_tools import register_web_tools as register_new_web_tools  # 新增网页工具
-from tools.sleep import register_power_tools as register_power_tools  
-from tools.bilibili_search import register_bilibili_tool as  register_bilibili_tool
-from tools.music import register_music_tools as  register_music_tools
-from tools.vision import register_vision_tools as  register_vision_tools
-from tools.note import register_sticky_notes_tools as  register_sticky_notes_tools
+from tools.lazy import LazyTools
+from tools.metrics import register_metrics_tools
 if sys.platform == 'win32':
     sys.stderr.reconfigure(encoding='utf-8')
     sys.stdout.reconfigure(encoding='utf-8')
+import argparse
 import io
+import logging
 import os
 
 
@@ -21,15 +17,37 @@ import os
 # 创建MCP服务器
 mcp = FastMCP("AggregateMCP", encoding='utf-8')
 
-# 注册所有工具
-register_email_tools(mcp)
-register_system_tools(mcp)
-register_new_web_tools(mcp)  # 注册新的网页工具
-register_power_tools(mcp)
-register_bilibili_tool(mcp)
-register_music_tools(mcp)
-register_vision_tools(mcp)
-register_sticky_notes_tools(mcp)
+# 注册所有工具（工具模块在首次调用时才导入，设置 MCP_EAGER_TOOLS=1 可在启动时全部导入）
+# 同步工具在线程池中并发执行（MCP_TOOL_THREADS 设置线程数）；共用同一资源（摄像头、浏览器、便签）的工具同一时间只运行一个
+lazy_tools = LazyTools(mcp)
+lazy_tools.register("tools.email_qq", "register_email_tools", limits={"send_email": 2})
+lazy_tools.register("tools.system", "register_system_tools")
+lazy_tools.register("tools.web_tools", "register_web_tools")  # 新增网页工具
+lazy_tools.register("tools.sleep", "register_power_tools")
+lazy_tools.register("tools.bilibili_search", "register_bilibili_tool", resources=("bilibili_browser",))
+lazy_tools.register("tools.music", "register_music_tools", resources=("music_browser",))
+lazy_tools.register("tools.vision", "register_vision_tools", resources=("camera",))
+lazy_tools.register("tools.note", "register_sticky_notes_tools", resources=("sticky_notes",))
+
+# 各工具的调用次数、耗时、错误率和返回大小，可通过 get_tool_metrics 查询（设置 MCP_TOOL_METRICS_INTERVAL 秒数可定期写入日志）
+register_metrics_tools(mcp, lazy_tools)
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    # 默认通过 stdio 供 mcp_pipe.py 使用；sse / streamable-http 通过 HTTP 让多个本地客户端共用这一个进程（及其摄像头、浏览器和缓存）
+    parser = argparse.ArgumentParser(description="Aggregate MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default="stdio",
+                        help="stdio (default, for mcp_pipe.py), sse (GET /sse) or streamable-http (POST /mcp)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Address to listen on for sse / streamable-http (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000,
+                        help="Port to listen on for sse / streamable-http (default: 8000)")
+    args = parser.parse_args()
+    if args.transport != "stdio":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        if args.host not in ("127.0.0.1", "localhost", "::1"):
+            # run_command 等工具可以执行任意命令，不要在不受信任的网络上开放
+            logging.getLogger("aggregate").warning(
+                f"Serving tools such as run_command on {args.host}:{args.port}; anyone who can reach it can use them")
+    mcp.run(transport=args.transport)
\ No newline at end of file
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# 浏览器类工具（网页、B站、音乐），供 mcp_pipe.py 按子系统拆分进程时使用
+from mcp.server.fastmcp import FastMCP
+import sys
+from tools.lazy import LazyTools
+if sys.platform == 'win32':
+    sys.stderr.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+# 创建MCP服务器
+mcp = FastMCP("BrowserMCP", encoding='utf-8')
+
+# 注册浏览器类工具（首次调用时才导入）
+lazy_tools = LazyTools(mcp)
+lazy_tools.register("tools.web_tools", "register_web_tools")
+lazy_tools.register("tools.bilibili_search", "register_bilibili_tool", resources=("bilibili_browser",))
+lazy_tools.register("tools.music", "register_music_tools", resources=("music_browser",))
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 轻量工具（邮件、系统、电源、便签），供 mcp_pipe.py 按子系统拆分进程时使用
+from mcp.server.fastmcp import FastMCP
+import sys
+from tools.lazy import LazyTools
+if sys.platform == 'win32':
+    sys.stderr.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+# 创建MCP服务器
+mcp = FastMCP("LightMCP", encoding='utf-8')
+
+# 注册轻量工具（首次调用时才导入）
+lazy_tools = LazyTools(mcp)
+lazy_tools.register("tools.email_qq", "register_email_tools", limits={"send_email": 2})
+lazy_tools.register("tools.system", "register_system_tools")
+lazy_tools.register("tools.sleep", "register_power_tools")
+lazy_tools.register("tools.note", "register_sticky_notes_tools", resources=("sticky_notes",))
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# 视觉类工具（摄像头、图像分析），供 mcp_pipe.py 按子系统拆分进程时使用
+from mcp.server.fastmcp import FastMCP
+import sys
+from tools.lazy import LazyTools
+if sys.platform == 'win32':
+    sys.stderr.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+
+# 创建MCP服务器
+mcp = FastMCP("VisionMCP", encoding='utf-8')
+
+# 注册视觉类工具（首次调用时才导入）
+lazy_tools = LazyTools(mcp)
+lazy_tools.register("tools.vision", "register_vision_tools", resources=("camera",))
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
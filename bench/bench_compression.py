@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Measure what permessage-deflate costs and saves for typical mcp_pipe messages.
+
+Each sample message is encoded the way mcp_pipe.py sends it (a text frame through
+`ThresholdPerMessageDeflate`, with context takeover) and the bytes on the wire
+and CPU time per message are reported for each zlib level. Use it to pick
+`--compression-level` and `--compression-threshold` for a given link.
+
+Samples:
+    small     a short tools/call response
+    tools     a tools/list response with 40 tools
+    notes     list_all_sticky_notes with `--notes` notes
+    vision    a `--frame-kb` KiB base64 JPEG frame (random bytes, as incompressible as JPEG)
+
+Usage:
+
+python bench/bench_compression.py
+python bench/bench_compression.py --levels 1,6,9 --frame-kb 300
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+
+from websockets.frames import OP_TEXT, Frame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipe.child import dumps  # noqa: E402
+from pipe.compression import ThresholdPerMessageDeflate, WireStats  # noqa: E402
+
+WORDS = ["学习", "工作", "购物", "明天", "下午", "开会", "记得", "ESP32", "小智", "提醒", "买菜", "复习"]
+
+
+def response(result):
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    return dumps({"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}], "isError": False}})
+
+
+def samples(notes, frame_kb):
+    rng = random.Random(1)
+    tools = [
+        {"name": f"tool_{i}", "description": f"工具 {i} 的说明：" + "".join(rng.choices(WORDS, k=12)),
+         "inputSchema": {"type": "object", "properties": {"text": {"type": "string", "title": "Text"}},
+                         "required": ["text"]}}
+        for i in range(40)
+    ]
+    note_list = [
+        {"id": i, "content": "".join(rng.choices(WORDS, k=8)), "timestamp": "2025-06-08 15:09:33",
+         "importance": rng.choice(["紧急", "重要", "普通"]), "category": rng.choice(["学习", "工作", "生活"])}
+        for i in range(notes)
+    ]
+    frame = base64.b64encode(rng.randbytes(frame_kb * 1024 * 3 // 4)).decode()
+    return {
+        "small": response({"success": True, "message": "便签已添加", "note_id": 7}),
+        "tools": dumps({"jsonrpc": "2.0", "id": 1, "result": {"tools": tools}}),
+        "notes": response({"success": True, "notes": note_list}),
+        "vision": response({"success": True, "image": frame}),
+    }
+
+
+def measure(message, level, repeat):
+    """Return (payload bytes, wire bytes, microseconds) per message at zlib `level`"""
+    stats = WireStats()
+    payload = message.encode('utf-8')
+    elapsed = 0.0
+    for _ in range(repeat):
+        # A fresh compressor each time, so repeats cannot refer back to the previous copy
+        extension = ThresholdPerMessageDeflate(False, False, 15, 15, {'memLevel': 5, 'level': level},
+                                               threshold=0, stats=stats)
+        started = time.process_time()
+        extension.encode(Frame(OP_TEXT, payload))
+        elapsed += time.process_time() - started
+    return len(payload), stats.wire_bytes / repeat, elapsed / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="permessage-deflate cost per mcp_pipe message")
+    parser.add_argument("--levels", default="1,6,9", help="Comma separated zlib levels")
+    parser.add_argument("--notes", type=int, default=200, help="Notes in the list_all_sticky_notes sample")
+    parser.add_argument("--frame-kb", type=int, default=100, help="Size of the vision frame sample in KiB")
+    parser.add_argument("--repeat", type=int, default=200, help="Messages encoded per measurement")
+    args = parser.parse_args()
+
+    for name, message in samples(args.notes, args.frame_kb).items():
+        for level in map(int, args.levels.split(',')):
+            payload, wire, micros = measure(message, level, args.repeat)
+            print(f"{name:>7} level {level}: {payload:8d} bytes -> {wire:10.0f} on wire "
+                  f"({wire / payload:5.0%})  {micros:8.1f} us CPU per message")
+
+
+if __name__ == "__main__":
+    main()
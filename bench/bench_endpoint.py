@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end load test of mcp_pipe.py against a local stand-in for the MCP endpoint.
+
+A `websockets` server on 127.0.0.1 plays the xiaozhi endpoint: once mcp_pipe.py
+connects it sends `initialize`, then replays a mix of `tools/list` and
+`tools/call` requests at a fixed concurrency. The MCP server is a generated stub
+with cheap tools, so the numbers cover the bridge and FastMCP, not selenium or
+the vision API. Everything runs offline.
+
+Reported: throughput, latency percentiles per operation, CPU seconds per 1000
+requests and peak RSS for the pipe process and its MCP server processes.
+
+Stub tools:
+    echo    returns its text argument
+    sleep   sleeps for `--sleep-ms` milliseconds, like a tool waiting on I/O
+    blob    returns `--blob-kb` KiB of base64 text, like a vision frame
+
+Usage:
+
+python bench/bench_endpoint.py --requests 5000 --concurrency 16
+python bench/bench_endpoint.py --mix tools/list=1,echo=4,blob=1 --pipe-args="--transport inprocess"
+
+# Regression gate: save a baseline once, then fail when a run is noticeably worse
+python bench/bench_endpoint.py --save baseline.json
+python bench/bench_endpoint.py --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shlex
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+import psutil
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STUB_SERVER = """
+import base64
+import logging
+import time
+from mcp.server.fastmcp import FastMCP
+
+logging.disable(logging.INFO)
+
+mcp = FastMCP("EndpointBench")
+BLOB = base64.b64encode(bytes(range(256)) * ({blob_kb} * 3)).decode()[:{blob_kb} * 1024]
+
+@mcp.tool()
+def echo(text: str = "") -> dict:
+    \"\"\"Return the text\"\"\"
+    return {{"success": True, "text": text}}
+
+@mcp.tool()
+def sleep() -> dict:
+    \"\"\"Wait like a tool blocked on I/O\"\"\"
+    time.sleep({sleep_ms} / 1000)
+    return {{"success": True}}
+
+@mcp.tool()
+def blob() -> dict:
+    \"\"\"Return a large payload like a vision frame\"\"\"
+    return {{"success": True, "image": BLOB}}
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
+"""
+
+INITIALIZE_PARAMS = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {},
+    "clientInfo": {"name": "bench_endpoint", "version": "0.1.0"},
+}
+
+
+def parse_mix(value):
+    """Parse `op=weight,...`; ops are `tools/list` or a tool name"""
+    mix = {}
+    for part in value.split(','):
+        op, _, weight = part.partition('=')
+        mix[op.strip()] = float(weight or 1)
+    return mix
+
+
+def build_request(op, request_id):
+    if op == 'tools/list':
+        return {"jsonrpc": "2.0", "id": request_id, "method": "tools/list", "params": {}}
+    arguments = {"text": f"bench-{request_id}"} if op == 'echo' else {}
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": op, "arguments": arguments}}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProcessTree:
+    """CPU time and RSS of the pipe process and, separately, its MCP server processes"""
+
+    def __init__(self, pid):
+        self.root = psutil.Process(pid)
+        self.peak_rss = {"pipe": 0, "server": 0}
+
+    def processes(self):
+        try:
+            return [("pipe", self.root)] + [("server", p) for p in self.root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+
+    def cpu(self):
+        totals = {"pipe": 0.0, "server": 0.0}
+        for role, process in self.processes():
+            try:
+                times = process.cpu_times()
+                totals[role] += times.user + times.system
+            except psutil.NoSuchProcess:
+                pass
+        return totals
+
+    def sample_rss(self):
+        totals = {"pipe": 0, "server": 0}
+        for role, process in self.processes():
+            try:
+                totals[role] += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        for role, rss in totals.items():
+            self.peak_rss[role] = max(self.peak_rss[role], rss)
+
+
+class FakeEndpoint:
+    """The endpoint side of one mcp_pipe connection"""
+
+    def __init__(self):
+        self.connected = asyncio.get_running_loop().create_future()
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.frames = 0
+        self.bytes_received = 0
+
+    async def handler(self, websocket, path=None):
+        if self.connected.done():
+            await websocket.close()
+            return
+        self.connected.set_result(websocket)
+        async for frame in websocket:
+            self.frames += 1
+            self.bytes_received += len(frame)
+            data = json.loads(frame)
+            # Coalesced responses arrive as a JSON-RPC batch
+            for msg in data if isinstance(data, list) else [data]:
+                future = self.pending.pop(msg.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(msg)
+
+    async def request(self, websocket, msg, timeout):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[msg['id']] = future
+        await websocket.send(json.dumps(msg))
+        return await asyncio.wait_for(future, timeout)
+
+
+async def run_workload(endpoint, websocket, ops, concurrency, timeout):
+    latencies = {}
+    errors = {}
+    queue = iter(ops)
+
+    async def worker():
+        for op in queue:
+            msg = build_request(op, next(endpoint.ids))
+            started = time.perf_counter()
+            try:
+                response = await endpoint.request(websocket, msg, timeout)
+                failed = 'error' in response or (response.get('result') or {}).get('isError')
+            except asyncio.TimeoutError:
+                failed = True
+            latencies.setdefault(op, []).append(time.perf_counter() - started)
+            if failed:
+                errors[op] = errors.get(op, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def bench(args, script):
+    loop = asyncio.get_running_loop()
+    endpoint = FakeEndpoint()
+    async with websockets.serve(endpoint.handler, '127.0.0.1', args.port) as server:
+        port = server.sockets[0].getsockname()[1]
+        env = dict(os.environ, MCP_ENDPOINT=f"ws://127.0.0.1:{port}")
+        env.pop('MCP_ENDPOINTS', None)
+        pipe = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(ROOT, 'mcp_pipe.py'), script,
+            '--env-file', os.devnull, *shlex.split(args.pipe_args),
+            cwd=ROOT, env=env,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=None if args.verbose else asyncio.subprocess.DEVNULL,
+        )
+        try:
+            started = time.perf_counter()
+            websocket = await asyncio.wait_for(endpoint.connected, args.timeout)
+            response = await endpoint.request(websocket, {
+                "jsonrpc": "2.0", "id": next(endpoint.ids), "method": "initialize", "params": INITIALIZE_PARAMS
+            }, args.timeout)
+            if 'error' in response:
+                raise RuntimeError(f"initialize failed: {response['error']}")
+            await websocket.send(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}))
+            startup = time.perf_counter() - started
+
+            tree = ProcessTree(pipe.pid)
+            random.seed(args.seed)
+            mix = parse_mix(args.mix)
+            ops = random.choices(list(mix), weights=list(mix.values()), k=args.requests)
+            # Warm up so imports and first-call costs stay out of the numbers
+            await run_workload(endpoint, websocket, ops[:args.warmup], args.concurrency, args.timeout)
+
+            async def sample():
+                while True:
+                    tree.sample_rss()
+                    await asyncio.sleep(0.1)
+
+            sampler = asyncio.ensure_future(sample())
+            cpu_before = tree.cpu()
+            bytes_before = endpoint.bytes_received
+            frames_before = endpoint.frames
+            began = loop.time()
+            latencies, errors = await run_workload(endpoint, websocket, ops, args.concurrency, args.timeout)
+            elapsed = loop.time() - began
+            cpu_after = tree.cpu()
+            sampler.cancel()
+            tree.sample_rss()
+        finally:
+            if pipe.returncode is None:
+                pipe.send_signal(signal.SIGINT)  # Lets mcp_pipe stop its MCP server processes
+            try:
+                await asyncio.wait_for(pipe.wait(), 10)
+            except asyncio.TimeoutError:
+                pipe.kill()
+                await pipe.wait()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "pipe_args": args.pipe_args,
+        "startup_ms": startup * 1000,
+        "throughput": args.requests / elapsed,
+        "errors": sum(errors.values()),
+        "p50_ms": percentile(all_latencies, 50) * 1000,
+        "p95_ms": percentile(all_latencies, 95) * 1000,
+        "p99_ms": percentile(all_latencies, 99) * 1000,
+        "ops": {
+            op: {
+                "count": len(values),
+                "errors": errors.get(op, 0),
+                "mean_ms": statistics.mean(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+            }
+            for op, values in sorted(latencies.items())
+        },
+        "cpu_ms_per_1k": {
+            role: (cpu_after[role] - cpu_before[role]) * 1000 * 1000 / args.requests for role in cpu_after
+        },
+        "peak_rss_mb": {role: rss / 1024 / 1024 for role, rss in tree.peak_rss.items()},
+        "frames": endpoint.frames - frames_before,
+        "bytes_on_wire": endpoint.bytes_received - bytes_before,
+    }
+
+
+def report(result):
+    print(f"{result['requests']} requests, concurrency {result['concurrency']}, mix {result['mix']}"
+          f"{', pipe args ' + result['pipe_args'] if result['pipe_args'] else ''}")
+    print(f"startup (connect + initialize): {result['startup_ms']:.0f} ms")
+    print(f"throughput: {result['throughput']:.0f} req/s, errors {result['errors']}, "
+          f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+    for op, s in result['ops'].items():
+        print(f"  {op:>12}: {s['count']:7d} req  errors {s['errors']:5d}  mean {s['mean_ms']:8.2f} ms  "
+              f"p50 {s['p50_ms']:8.2f} ms  p95 {s['p95_ms']:8.2f} ms  p99 {s['p99_ms']:8.2f} ms")
+    cpu, rss = result['cpu_ms_per_1k'], result['peak_rss_mb']
+    print(f"CPU per 1000 requests: pipe {cpu['pipe']:.0f} ms, server {cpu['server']:.0f} ms")
+    print(f"peak RSS: pipe {rss['pipe']:.1f} MiB, server {rss['server']:.1f} MiB")
+    print(f"received {result['frames']} frames, {result['bytes_on_wire'] / 1024:.0f} KiB")
+
+
+def check_baseline(result, baseline, tolerance):
+    """Return the regressions of `result` against `baseline`, allowing `tolerance` (0.2 = 20%)"""
+    problems = []
+    if result['errors'] > baseline['errors']:
+        problems.append(f"errors {result['errors']} > {baseline['errors']}")
+    if result['throughput'] < baseline['throughput'] * (1 - tolerance):
+        problems.append(f"throughput {result['throughput']:.0f} < {baseline['throughput']:.0f} req/s")
+    for key in ('p50_ms', 'p99_ms'):
+        if result[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {result[key]:.2f} > {baseline[key]:.2f}")
+    for role in ('pipe', 'server'):
+        if result['cpu_ms_per_1k'][role] > baseline['cpu_ms_per_1k'][role] * (1 + tolerance):
+            problems.append(f"{role} CPU {result['cpu_ms_per_1k'][role]:.0f} > "
+                            f"{baseline['cpu_ms_per_1k'][role]:.0f} ms per 1000 requests")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mcp_pipe end-to-end load test")
+    parser.add_argument("--requests", type=int, default=2000, help="Measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests sent first")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--mix", default="tools/list=1,echo=8,sleep=1",
+                        help="Weighted operations: tools/list or stub tool names (echo, sleep, blob)")
+    parser.add_argument("--sleep-ms", type=float, default=5, help="Duration of the sleep tool")
+    parser.add_argument("--blob-kb", type=int, default=64, help="Size of the blob tool's result")
+    parser.add_argument("--script", help="MCP script to run instead of the stub (its tools must take no required arguments)")
+    parser.add_argument("--pipe-args", default="", help="Extra mcp_pipe.py arguments, e.g. \"--transport inprocess\"")
+    parser.add_argument("--port", type=int, default=0, help="Port of the stand-in endpoint (default: any free port)")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout per request in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the operation mix")
+    parser.add_argument("--save", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results saved by --save and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show mcp_pipe.py's log")
+    args = parser.parse_args()
+
+    script = args.script
+    if script is None:
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(STUB_SERVER.format(sleep_ms=args.sleep_ms, blob_kb=args.blob_kb))
+        script = f.name
+    try:
+        result = asyncio.run(bench(args, script))
+    finally:
+        if args.script is None:
+            os.unlink(script)
+
+    report(result)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems = check_baseline(result, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
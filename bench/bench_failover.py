@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Measure how long mcp_pipe.py needs to recover from a crashed MCP child.
+
+The active child process is killed with SIGKILL and the time until the
+replacement answers `tools/list` is recorded, for a cold restart, a warm
+standby swap and the fork server (with and without standby).
+
+By default a stub FastMCP server is used whose module import sleeps for
+`--import-delay` seconds, standing in for aggregate.py's selenium, cv2, openai
+and pyautogui imports. Pass `--script aggregate.py` to measure the real thing.
+
+Usage:
+
+python bench/bench_failover.py --import-delay 2.5 --rounds 5
+python bench/bench_failover.py --script aggregate.py
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipe.child import MCPChild  # noqa: E402
+from pipe.forkserver import ForkServer  # noqa: E402
+
+STUB_SERVER = """
+import time
+import logging
+time.sleep({delay})  # Stand-in for importing selenium, cv2, openai, pyautogui
+from mcp.server.fastmcp import FastMCP
+
+logging.disable(logging.INFO)
+
+mcp = FastMCP("FailoverBench")
+
+@mcp.tool()
+def echo(text: str) -> str:
+    return text
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
+"""
+
+MODES = {
+    'cold': dict(standby=False, forkserver=False),
+    'standby': dict(standby=True, forkserver=False),
+    'forkserver': dict(standby=False, forkserver=True),
+    'forkserver+standby': dict(standby=True, forkserver=True),
+}
+
+
+async def measure_once(script, mode, forkserver):
+    child = MCPChild(script, name=mode, standby=MODES[mode]['standby'], forkserver=forkserver)
+    await child.start()
+    try:
+        if child.standby:
+            # Give the spare time to finish starting, as it would in steady state
+            while child._spare is None or not child._spare.done():
+                await asyncio.sleep(0.05)
+        process = child.process
+        started = time.perf_counter()
+        os.kill(process.pid, signal.SIGKILL)
+        while child.process is process or not child.ready.is_set():
+            await asyncio.sleep(0.001)
+        await child.request(child.process, 'tools/list', {}, 60)
+        return time.perf_counter() - started
+    finally:
+        await child.stop()
+
+
+async def measure(script, mode, rounds):
+    # A fresh child per round, so crash-loop backoff does not kick in
+    forkserver = ForkServer(script) if MODES[mode]['forkserver'] else None
+    if forkserver is not None:
+        await forkserver.start()
+    try:
+        return [await measure_once(script, mode, forkserver) for _ in range(rounds)]
+    finally:
+        if forkserver is not None:
+            await forkserver.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP child failover benchmark")
+    parser.add_argument("--script", help="MCP script to run (default: generated stub server)")
+    parser.add_argument("--import-delay", type=float, default=2.0,
+                        help="Import time of the stub server in seconds")
+    parser.add_argument("--rounds", type=int, default=3, help="Failovers per mode")
+    parser.add_argument("--modes", default=','.join(MODES), help="Comma separated modes to run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    script = args.script
+    if script is None:
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(STUB_SERVER.format(delay=args.import_delay))
+        script = f.name
+    try:
+        for mode in args.modes.split(','):
+            timings = asyncio.run(measure(script, mode, args.rounds))
+            print(f"{mode:>18}: median {statistics.median(timings) * 1000:9.1f} ms  "
+                  f"max {max(timings) * 1000:9.1f} ms")
+    finally:
+        if args.script is None:
+            os.unlink(script)
+
+
+if __name__ == "__main__":
+    main()
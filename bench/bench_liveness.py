@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Measure how quickly mcp_pipe notices a dead endpoint connection and reconnects.
+
+An `Endpoint` (without MCP children) connects through a local TCP proxy to a
+stand-in WebSocket server that answers JSON-RPC `ping` requests like an MCP
+endpoint. Once connected, a fault is injected into the existing connection:
+
+    drop     the proxy resets both sides (detected by `recv()` right away)
+    stall    the proxy silently discards everything, like a half-open connection
+    hang     the server keeps answering WebSocket pings but stops handling
+             messages; only `--liveness-probe` detects this
+
+New connections are not affected, so the endpoint can reconnect. For each fault
+the time from injection to the endpoint dropping the connection (detect) and to
+the next successful handshake (reconnect, including the reconnect backoff) is
+reported.
+
+Usage:
+
+python bench/bench_liveness.py
+python bench/bench_liveness.py --keepalive-interval 5 --keepalive-timeout 5 --liveness-probe
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mcp_pipe  # noqa: E402
+from pipe.router import Router  # noqa: E402
+
+FAULTS = ('drop', 'stall', 'hang')
+
+
+class StandInServer:
+    """WebSocket server answering JSON-RPC pings, until told to hang"""
+
+    def __init__(self):
+        self.hanging = set()
+        self.connections = set()
+
+    async def handle(self, websocket, path=None):
+        self.connections.add(websocket)
+        try:
+            async for message in websocket:
+                if websocket in self.hanging:
+                    await asyncio.Future()  # Stop handling messages; pongs are still sent
+                msg = json.loads(message)
+                if msg.get('method') == 'ping' and 'id' in msg:
+                    await websocket.send(json.dumps({"jsonrpc": "2.0", "id": msg['id'], "result": {}}))
+        finally:
+            self.connections.discard(websocket)
+            self.hanging.discard(websocket)
+
+    def hang(self):
+        self.hanging.update(self.connections)
+
+
+class FaultyProxy:
+    """TCP proxy whose existing connections can be reset or silently stalled"""
+
+    def __init__(self, upstream_port):
+        self.upstream_port = upstream_port
+        self.pairs = []  # (client writer, upstream writer, stalled flag holder)
+
+    async def handle(self, reader, writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', self.upstream_port)
+        state = {'stalled': False}
+        self.pairs.append((writer, upstream_writer, state))
+        await asyncio.gather(self.pump(reader, upstream_writer, state), self.pump(upstream_reader, writer, state),
+                             return_exceptions=True)
+
+    @staticmethod
+    async def pump(reader, writer, state):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if not state['stalled']:
+                    writer.write(data)
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    def drop(self):
+        for client, upstream, _ in self.pairs:
+            client.transport.abort()
+            upstream.transport.abort()
+        self.pairs.clear()
+
+    def stall(self):
+        for _, _, state in self.pairs:
+            state['stalled'] = True
+        self.pairs.clear()
+
+
+async def wait_for(predicate, timeout):
+    """Seconds until `predicate()` holds, or None after `timeout`"""
+    started = time.monotonic()
+    while not predicate():
+        if time.monotonic() - started > timeout:
+            return None
+        await asyncio.sleep(0.005)
+    return time.monotonic() - started
+
+
+async def measure(fault, args):
+    server = StandInServer()
+    ws_server = await websockets.serve(server.handle, '127.0.0.1', 0)
+    proxy = FaultyProxy(ws_server.sockets[0].getsockname()[1])
+    tcp_server = await asyncio.start_server(proxy.handle, '127.0.0.1', 0)
+    uri = f"ws://127.0.0.1:{tcp_server.sockets[0].getsockname()[1]}"
+
+    router = Router([])
+    endpoint = mcp_pipe.Endpoint(uri, router, fault, compression='off',
+                                 keepalive_interval=args.keepalive_interval,
+                                 keepalive_timeout=args.keepalive_timeout,
+                                 liveness_probe=args.liveness_probe)
+    task = asyncio.ensure_future(endpoint.connect_with_retry())
+    link = endpoint.link
+    results = []
+    try:
+        await wait_for(lambda: link.connects > 0, 10)
+        for _ in range(args.rounds):
+            # Let a keepalive round or two pass on the healthy connection
+            await asyncio.sleep(args.keepalive_interval * 1.5)
+            disconnects, connects = link.disconnects, link.connects
+            {'drop': proxy.drop, 'stall': proxy.stall, 'hang': server.hang}[fault]()
+            limit = args.keepalive_interval + args.keepalive_timeout + 5
+            detect = await wait_for(lambda: link.disconnects > disconnects, limit)
+            reconnect = await wait_for(lambda: link.connects > connects, limit + mcp_pipe.MAX_BACKOFF) \
+                if detect is not None else None
+            results.append((detect, None if reconnect is None else detect + reconnect))
+            if detect is None:
+                break  # Not detected; the connection stays dead
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        tcp_server.close()
+        ws_server.close()
+    return results
+
+
+def describe(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return "not detected"
+    return f"mean {statistics.mean(values):6.2f} s, max {max(values):6.2f} s"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Dead-connection detection and reconnection times")
+    parser.add_argument("--faults", default=','.join(FAULTS), help="Comma separated faults to inject")
+    parser.add_argument("--rounds", type=int, default=3, help="Faults injected per kind")
+    parser.add_argument("--keepalive-interval", type=float, default=2)
+    parser.add_argument("--keepalive-timeout", type=float, default=2)
+    parser.add_argument("--liveness-probe", action="store_true")
+    args = parser.parse_args()
+    for name in ('MCP_PIPE', 'websockets'):
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+
+    print(f"keepalive every {args.keepalive_interval} s, timeout {args.keepalive_timeout} s, "
+          f"liveness probe {'on' if args.liveness_probe else 'off'}")
+    for fault in args.faults.split(','):
+        results = await measure(fault, args)
+        print(f"{fault:>6}: detect {describe([d for d, _ in results])}; "
+              f"reconnect {describe([r for _, r in results])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Measure rendering and writing of the sticky notes page.
+
+For each size the page of generated notes (see `bench_note_store.py`) is
+rendered by a fresh `NotePageRenderer` (every card rendered, as before card
+caching) and by a warm one after one note changed (one card re-rendered). Then
+writing the page is timed: in place, atomically through a temporary file, and
+a repeated write of identical output, which is skipped. Milliseconds per page.
+
+Usage:
+
+python bench/bench_note_html.py
+python bench/bench_note_html.py --notes 100,1000,10000 --pages 50
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_note_store import generate  # noqa: E402
+from tools.note_html import NotePageRenderer  # noqa: E402
+
+
+def per_page(fn, pages, repeat=5):
+    """Best of `repeat` runs of `pages` calls, in milliseconds per call"""
+    return min(timeit.repeat(fn, number=pages, repeat=repeat)) / pages * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sticky notes page rendering and writing")
+    parser.add_argument("--notes", default="100,1000,10000", help="Comma separated note counts")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per timing run, the best of 5 runs is reported")
+    args = parser.parse_args()
+
+    print(f"{'notes':>7}{'full render':>13}{'incremental':>13}{'write':>9}{'atomic':>9}{'unchanged':>11}  (ms per page)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sticky_notes.html")
+        for count in (int(n) for n in args.notes.split(',')):
+            notes = generate(count)
+            full = per_page(lambda: NotePageRenderer().render(notes, count), args.pages)
+
+            renderer = NotePageRenderer()
+            renderer.render(notes, count)
+            edits = iter(range(10 ** 9))
+
+            def render_after_edit():
+                notes[count // 2]["content"] = f"修改后的内容 {next(edits)}"
+                return renderer.render(notes, count)
+
+            incremental = per_page(render_after_edit, args.pages)
+            if renderer.render(notes, count) != NotePageRenderer().render(notes, count):
+                print("  incremental page DIFFERS from a full render")
+
+            html = renderer.render(notes, count)
+            in_place = NotePageRenderer(atomic=False, skip_unchanged=False)
+            atomic = NotePageRenderer(skip_unchanged=False)
+            skipping = NotePageRenderer()
+            write = per_page(lambda: in_place.write(path, html), args.pages)
+            atomic_write = per_page(lambda: atomic.write(path, html), args.pages)
+            unchanged = per_page(lambda: skipping.write(path, html), args.pages)
+            print(f"{count:7d}{full:13.3f}{incremental:13.3f}{write:9.3f}{atomic_write:9.3f}{unchanged:11.3f}")
+
+
+if __name__ == "__main__":
+    main()
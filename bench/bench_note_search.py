@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Compare keyword search over sticky notes with and without the inverted index.
+
+For each size the generated notes of `bench_note_store.py` are searched by a
+linear scan (what `JsonNoteStore.search` did before the index) and through a
+`NoteIndex`: single keywords of different lengths, multi-term AND/OR queries
+and BM25 top-10 ranking. Times are microseconds per query; both must return
+the same notes. Incremental maintenance (add, content change, delete) and the
+time to build the index at startup are reported too.
+
+Usage:
+
+python bench/bench_note_search.py
+python bench/bench_note_search.py --notes 10000,100000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_note_store import generate  # noqa: E402
+from tools.note_index import NoteIndex, query_terms  # noqa: E402
+from tools.note_store import matches  # noqa: E402
+
+QUERIES = [
+    ("会议纪要", "phrase", 0),
+    ("开会", "phrase", 0),
+    ("ESP32", "phrase", 0),
+    ("item42", "phrase", 0),
+    ("会议纪要 item42", "all", 0),
+    ("会议纪要 买牛奶", "any", 0),
+    ("python esp32 开会", "any", 10),
+    ("会议纪要", "phrase", 10),
+]
+
+
+def scan(notes, keyword, match, top_k):
+    """Linear scan; ranked queries have no baseline and fall back to the first top_k by id"""
+    terms = query_terms(keyword, match)
+    combine = any if match == "any" else all
+    found = [note for note in notes if combine(term in note["content"].lower() for term in terms)]
+    return found[:top_k] if top_k else found
+
+
+def per_query(fn, queries, repeat=5):
+    """Best of `repeat` runs of `queries` calls, in microseconds per call"""
+    return min(timeit.repeat(fn, number=queries, repeat=repeat)) / queries * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Linear scan vs inverted index for sticky note search")
+    parser.add_argument("--notes", default="10000,100000", help="Comma separated note counts")
+    parser.add_argument("--queries", type=int, default=100, help="Queries per timing run, the best of 5 runs is reported")
+    args = parser.parse_args()
+
+    for count in (int(n) for n in args.notes.split(',')):
+        notes = generate(count)
+        started = time.perf_counter()
+        index = NoteIndex(notes)
+        build = time.perf_counter() - started
+        print(f"{count} notes (index build {build * 1000:.0f} ms, {len(index.postings)} bigrams), µs per query:")
+        print(f"  {'query':<28}{'hits':>7}{'scan':>12}{'index':>10}")
+        for keyword, match, top_k in QUERIES:
+            found = index.search(keyword, match, top_k)
+            if not top_k and found != scan(notes, keyword, match, top_k):
+                print(f"  {keyword} ({match}) results DIFFER")
+            label = f"{keyword} ({match}{f', top {top_k}' if top_k else ''})"
+            scan_us = per_query(lambda: scan(notes, keyword, match, top_k), max(args.queries // 20, 1), 1)
+            index_us = per_query(lambda: index.search(keyword, match, top_k), args.queries)
+            print(f"  {label:<28}{len(found):7d}{scan_us:12.1f}{index_us:10.1f}")
+
+        rng = random.Random(3)
+        ids = [rng.randint(1, count) for _ in range(args.queries)]
+        updates = [{"id": note_id, "content": f"修改后的内容 {i} 会议纪要", "importance": "普通", "category": "其他"}
+                   for i, note_id in enumerate(ids)]
+        added = iter({"id": count + i + 1, "content": f"新便签 {i} 开会", "importance": "普通", "category": "其他"}
+                     for i in range(args.queries))
+        print(f"  maintenance, µs per note: add {per_query(lambda: index.add(next(added)), args.queries, 1):.1f}, "
+              f"modify {per_query(lambda: index.update(updates.pop()), args.queries, 1):.1f}, "
+              f"delete {per_query(lambda: index.remove(ids.pop()), args.queries, 1):.1f}")
+        if [note["id"] for note in index.search("会议纪要", accept=lambda note: matches(note, None, "普通", None))] \
+                != sorted(note["id"] for note in index.notes.values()
+                          if "会议纪要" in note["content"] and note["importance"] == "普通"):
+            print("  search after maintenance DIFFERS")
+
+
+if __name__ == "__main__":
+    main()
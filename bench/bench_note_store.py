@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the sticky note storage backends at different note counts.
+
+For each size a JSON file of generated notes is written, loaded by
+`JsonNoteStore` (journal fsync policy `--fsync`) and migrated into a fresh
+`SqliteNoteStore`. Then add, modify, delete, keyword search (3+ character
+keywords that can use the FTS5 trigram index, and a 2 character one that
+cannot) and category filtering are timed on both, in milliseconds per
+operation. Both backends must return the same search results.
+
+Usage:
+
+python bench/bench_note_store.py
+python bench/bench_note_store.py --notes 1000,10000,50000 --ops 50
+python bench/bench_note_store.py --fsync always
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.note_store import JsonNoteStore, SqliteNoteStore  # noqa: E402
+
+CATEGORIES = ["工作", "生活", "学习", "其他"]
+IMPORTANCE = ["普通", "重要", "紧急"]
+# Rare words the keyword searches look for, mixed into a large random vocabulary
+KEYWORDS = ["会议纪要", "开会", "ESP32", "Python", "买牛奶"]
+
+
+def generate(count, seed=1):
+    rng = random.Random(seed)
+    vocabulary = ["".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(1, 3))) for _ in range(5000)]
+    vocabulary += [f"item{i}" for i in range(1000)]
+    notes = []
+    for i in range(1, count + 1):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 12))]
+        if rng.random() < 0.05:
+            words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        notes.append({
+            "id": i,
+            "content": " ".join(words),
+            "timestamp": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00",
+            "importance": rng.choice(IMPORTANCE),
+            "category": rng.choice(CATEGORIES),
+        })
+    return notes
+
+
+def per_op(fn, ops):
+    """Milliseconds per call of fn(i), averaged over `ops` calls"""
+    started = time.perf_counter()
+    for i in range(ops):
+        fn(i)
+    return (time.perf_counter() - started) / ops * 1000
+
+
+def measure(store, count, ops):
+    rng = random.Random(2)
+    ids = [rng.randint(1, count) for _ in range(ops)]
+    return {
+        "add": per_op(lambda i: store.add(f"新便签 {i}", "2025-06-01 12:00:00", "普通", "其他"), ops),
+        "modify": per_op(lambda i: store.update(ids[i], {"content": f"修改后的内容 {i}"}), ops),
+        "delete": per_op(lambda i: store.delete(ids[i]), ops),
+        "search 会议纪要": per_op(lambda i: store.search("会议纪要"), ops),
+        "search 开会": per_op(lambda i: store.search("开会"), ops),
+        "search item42": per_op(lambda i: store.search("item42"), ops),
+        "category": per_op(lambda i: store.search(category="学习"), ops),
+        "category+level": per_op(lambda i: store.search(importance="紧急", category="工作"), ops),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs SQLite sticky note storage")
+    parser.add_argument("--notes", default="1000,10000", help="Comma separated note counts")
+    parser.add_argument("--ops", type=int, default=20, help="Operations timed per measurement")
+    parser.add_argument("--fsync", default="everysec", choices=("always", "everysec", "no"),
+                        help="fsync policy of the JSON store's journal")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(n) for n in args.notes.split(',')):
+            json_file = os.path.join(directory, f"notes_{count}.json")
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump({"notes": generate(count)}, f, indent=4, ensure_ascii=False)
+
+            started = time.perf_counter()
+            json_store = JsonNoteStore(json_file, fsync=args.fsync)
+            load = time.perf_counter() - started
+            started = time.perf_counter()
+            sqlite_store = SqliteNoteStore(os.path.join(directory, f"notes_{count}.db"), json_file=json_file)
+            migrate = time.perf_counter() - started
+
+            for query in (("会议纪要",), ("开会",), ("ITEM42",), (None, "紧急", "工作")):
+                if json_store.search(*query) != sqlite_store.search(*query):
+                    print(f"  search {query} results DIFFER")
+
+            print(f"{count} notes (JSON load {load * 1000:.0f} ms, SQLite migration {migrate * 1000:.0f} ms), "
+                  f"ms per operation:")
+            results = {"json": measure(json_store, count, args.ops),
+                       "sqlite": measure(sqlite_store, count, args.ops)}
+            json_store.close()
+            sqlite_store.close()
+            print(f"  {'operation':<16}{'json':>10}{'sqlite':>10}")
+            for operation in results["json"]:
+                print(f"  {operation:<16}{results['json'][operation]:10.3f}{results['sqlite'][operation]:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the stdout/stdin forwarding engine of mcp_pipe.py.
+
+Compares the legacy engine (subprocess.Popen in text mode, one executor-thread
+`readline` per line, blocking stdin writes) against the asyncio subprocess
+engine behind the JSON-RPC router. A fake WebSocket feeds JSON-RPC messages to an echo child and records
+when each response is forwarded back, so the numbers cover only the pipe.
+
+Usage:
+
+python bench/bench_pipe_streams.py --messages 20000 --payload 256
+python bench/bench_pipe_streams.py --messages 200 --payload 262144 --concurrency 1  # vision-sized frames
+
+The legacy engine can deadlock when many large messages are in flight: its
+blocking stdin write stalls the loop that has to schedule the next stdout read.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import mcp_pipe  # noqa: E402
+from pipe.child import MCPChild  # noqa: E402
+from pipe.router import Router  # noqa: E402
+
+# Child that answers every JSON-RPC request with its own params
+ECHO_CHILD = r"""
+import json, sys
+for line in sys.stdin:
+    request = json.loads(line)
+    if "id" not in request:
+        continue  # Notification, e.g. notifications/initialized
+    sys.stdout.write(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": request["params"]}) + "\n")
+    sys.stdout.flush()
+"""
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a websockets connection, fed from a queue"""
+
+    def __init__(self, messages, expected, concurrency):
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait(message)
+        # Like a real client, keep at most `concurrency` requests in flight
+        self.window = asyncio.Semaphore(concurrency)
+        self.expected = expected
+        self.sent_at = {}
+        self.received_at = {}
+        self.done = asyncio.Event()
+
+    async def recv(self):
+        await self.window.acquire()
+        message = await self.incoming.get()
+        self.sent_at[json.loads(message)["id"]] = time.perf_counter()
+        return message
+
+    async def send(self, data):
+        self.received_at[json.loads(data)["id"]] = time.perf_counter()
+        self.window.release()
+        if len(self.received_at) >= self.expected:
+            self.done.set()
+
+
+# ---------------------------------------------------------------------------
+# Legacy engine, as it was before the asyncio subprocess rewrite
+# ---------------------------------------------------------------------------
+async def legacy_websocket_to_process(websocket, process):
+    while True:
+        message = await websocket.recv()
+        process.stdin.write(message + '\n')
+        process.stdin.flush()
+
+
+async def legacy_process_to_websocket(process, websocket):
+    while True:
+        data = await asyncio.get_event_loop().run_in_executor(None, process.stdout.readline)
+        if not data:
+            break
+        await websocket.send(data)
+
+
+async def run_legacy(websocket):
+    process = subprocess.Popen(
+        [sys.executable, '-c', ECHO_CHILD],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, encoding='utf-8'
+    )
+    tasks = [
+        asyncio.ensure_future(legacy_websocket_to_process(websocket, process)),
+        asyncio.ensure_future(legacy_process_to_websocket(process, websocket)),
+    ]
+    try:
+        await websocket.done.wait()
+    finally:
+        for task in tasks:
+            task.cancel()
+        process.kill()
+        process.wait()
+
+
+async def run_asyncio(websocket, script):
+    router = Router([MCPChild(script)])
+    await router.start()
+    task = asyncio.ensure_future(mcp_pipe.Endpoint(None, router, 'bench').serve(websocket))
+    try:
+        await websocket.done.wait()
+    finally:
+        task.cancel()
+        await router.stop()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def bench(engine, count, payload_size, concurrency):
+    payload = 'x' * payload_size
+    messages = [
+        json.dumps({"jsonrpc": "2.0", "id": i, "method": "tools/call", "params": {"data": payload}})
+        for i in range(count)
+    ]
+    websocket = FakeWebSocket(messages, count, concurrency)
+    started = time.perf_counter()
+    if engine == 'legacy':
+        await run_legacy(websocket)
+    else:
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(ECHO_CHILD)
+        try:
+            await run_asyncio(websocket, f.name)
+        finally:
+            os.unlink(f.name)
+    elapsed = time.perf_counter() - started
+    latencies = [
+        (websocket.received_at[i] - websocket.sent_at[i]) * 1000
+        for i in websocket.received_at
+    ]
+    return {
+        "engine": engine,
+        "messages": count,
+        "msgs_per_sec": count / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mcp_pipe stream engine benchmark")
+    parser.add_argument("--messages", type=int, default=10000, help="Messages per run")
+    parser.add_argument("--payload", type=int, default=256, help="Payload size in bytes")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    args = parser.parse_args()
+
+    mcp_pipe.logger.setLevel('WARNING')
+    for engine in ('legacy', 'asyncio'):
+        result = asyncio.run(bench(engine, args.messages, args.payload, args.concurrency))
+        print(f"{result['engine']:>8}: {result['msgs_per_sec']:10.0f} msg/s  "
+              f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
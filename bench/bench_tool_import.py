@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Report what lazy tool loading saves at MCP server startup.
+
+For every tool module the script registers through `tools.lazy.LazyTools`, the
+time and RSS it costs to import the module and register its tools are measured
+in a fresh interpreter. Then the script itself is started with eager
+(MCP_EAGER_TOOLS=1) and lazy loading, and the time until it answers
+`initialize` and its RSS after `tools/list` are compared; the two tool lists
+must be identical.
+
+Modules that fail to import (e.g. selenium not installed) are reported as such.
+
+Usage:
+
+python bench/bench_tool_import.py
+python bench/bench_tool_import.py --script aggregate_light.py --rounds 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LIST_MODULES = """
+import json, runpy, sys
+from tools.lazy import LazyTools
+sys.argv = [{script!r}]
+namespace = runpy.run_path({script!r}, run_name='__bench__')
+registrations = [r for value in namespace.values() if isinstance(value, LazyTools) for r in value.registrations]
+print(json.dumps(registrations))
+"""
+
+MEASURE_IMPORT = """
+import importlib, json, time, psutil
+from mcp.server.fastmcp import FastMCP
+mcp = FastMCP("bench")
+process = psutil.Process()
+before = process.memory_info().rss
+started = time.perf_counter()
+try:
+    getattr(importlib.import_module({module!r}), {function!r})(mcp)
+except Exception as e:
+    print(json.dumps({{"error": f"{{type(e).__name__}}: {{e}}"}}))
+else:
+    print(json.dumps({{"seconds": time.perf_counter() - started, "rss": process.memory_info().rss - before}}))
+"""
+
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+    "protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "bench", "version": "0"}}}
+
+
+def run_python(code):
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output")
+    return json.loads(lines[-1])
+
+
+def measure_startup(script, eager):
+    """Seconds until `initialize` is answered, RSS after `tools/list`, and the tool list"""
+    env = dict(os.environ, MCP_EAGER_TOOLS='1' if eager else '0')
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], cwd=ROOT, env=env, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8')
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + '\n')
+        process.stdin.flush()
+        line = process.stdout.readline()
+        if not line:
+            return None
+        seconds = time.perf_counter() - started
+        process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + '\n')
+        process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "tools/list"}) + '\n')
+        process.stdin.flush()
+        tools = json.loads(process.stdout.readline())['result']['tools']
+        rss = psutil.Process(process.pid).memory_info().rss
+        return seconds, rss, tools
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and memory saved by lazy tool loading")
+    parser.add_argument("--script", default="aggregate.py", help="MCP script to measure (default: aggregate.py)")
+    parser.add_argument("--rounds", type=int, default=3, help="Startups measured per mode")
+    args = parser.parse_args()
+
+    print(f"Tool modules of {args.script} (import + register in a fresh interpreter):")
+    for module, function in run_python(LIST_MODULES.format(script=args.script)):
+        result = run_python(MEASURE_IMPORT.format(module=module, function=function))
+        if 'error' in result:
+            print(f"  {module:<24} import failed: {result['error']}")
+        else:
+            print(f"  {module:<24} {result['seconds'] * 1000:8.1f} ms  {result['rss'] / 2 ** 20:6.1f} MiB")
+
+    print(f"Startup of {args.script} until `initialize` is answered:")
+    results = {}
+    for mode in ('eager', 'lazy'):
+        runs = [measure_startup(args.script, mode == 'eager') for _ in range(args.rounds)]
+        if None in runs:
+            print(f"  {mode:>5}: failed to start")
+            continue
+        seconds = statistics.median(run[0] for run in runs)
+        rss = statistics.median(run[1] for run in runs)
+        results[mode] = (seconds, rss, runs[0][2])
+        print(f"  {mode:>5}: {seconds * 1000:8.1f} ms  {rss / 2 ** 20:6.1f} MiB RSS  {len(runs[0][2])} tools")
+    if len(results) == 2:
+        (eager_s, eager_rss, eager_tools), (lazy_s, lazy_rss, lazy_tools) = results['eager'], results['lazy']
+        print(f"  saved: {(eager_s - lazy_s) * 1000:.1f} ms, {(eager_rss - lazy_rss) / 2 ** 20:.1f} MiB; "
+              f"tool lists {'identical' if eager_tools == lazy_tools else 'DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the per-call overhead of the tool metrics middleware.
+
+Each case calls a trivial tool directly and through `ToolMetrics.wrap()` and
+reports the difference per call. For dict results the baseline includes the
+serialization FastMCP would perform on the bare tool's result anyway, since the
+wrapper performs it in FastMCP's place; for the other cases it is the bare call.
+
+Usage:
+
+python bench/bench_tool_metrics.py
+python bench/bench_tool_metrics.py --calls 500000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import pydantic_core
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.metrics import ToolMetrics  # noqa: E402
+
+SMALL_DICT = {"success": True, "result": {"cpu": 12.5, "memory": 48.1, "disk": 71.0}}
+NOTE_DICT = {"success": True, "result": [{"id": i, "content": "买牛奶和面包" * 4, "category": "生活",
+                                          "importance": 3} for i in range(20)]}
+
+
+def returns_none():
+    return None
+
+
+def returns_text():
+    return "ok"
+
+
+def returns_small_dict():
+    return SMALL_DICT
+
+
+def returns_note_dict():
+    return NOTE_DICT
+
+
+def raises():
+    raise ValueError("bench")
+
+
+def serialized(fn):
+    """The bare tool plus the serialization FastMCP applies to its result"""
+    def call():
+        return pydantic_core.to_json(fn(), fallback=str, indent=2).decode()
+    return call
+
+
+def swallow(fn):
+    def call():
+        try:
+            fn()
+        except ValueError:
+            pass
+    return call
+
+
+def per_call(fn, calls, repeat):
+    """Best of `repeat` runs, in microseconds per call"""
+    return min(timeit.repeat(fn, number=calls, repeat=repeat)) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call overhead of ToolMetrics.wrap()")
+    parser.add_argument("--calls", type=int, default=200000, help="Calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per case, the best is reported")
+    args = parser.parse_args()
+
+    metrics = ToolMetrics()
+    cases = [
+        ("None result", returns_none, returns_none),
+        ("str result", returns_text, returns_text),
+        ("small dict result", serialized(returns_small_dict), returns_small_dict),
+        ("20-note dict result", serialized(returns_note_dict), returns_note_dict),
+        ("exception", swallow(raises), raises),
+    ]
+    print(f"{'case':<22}{'bare':>10}{'wrapped':>10}{'overhead':>10}  (µs per call)")
+    for label, bare, tool in cases:
+        wrapped = metrics.wrap(tool, tool.__name__)
+        if tool is raises:
+            wrapped = swallow(wrapped)
+        bare_us = per_call(bare, args.calls, args.repeat)
+        wrapped_us = per_call(wrapped, args.calls, args.repeat)
+        print(f"{label:<22}{bare_us:10.3f}{wrapped_us:10.3f}{wrapped_us - bare_us:10.3f}")
+    calls = sum(s['calls'] for s in metrics.snapshot().values())
+    print(f"{calls} calls recorded")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,37 @@ Usage:
 export MCP_ENDPOINT=<mcp_endpoint>
 python mcp_pipe.py <mcp_script>
 
+# Serve several endpoints from one pipe, sharing the MCP server processes
+python mcp_pipe.py <mcp_script> --env-file .env.xiaozhi1 --env-file .env.xiaozhi2
+
+# Run each subsystem in its own process; tool calls are routed by tool name
+python mcp_pipe.py aggregate_browser.py aggregate_vision.py aggregate_light.py
+
+# Restart the MCP server without downtime whenever aggregate.py or tools/*.py change
+python mcp_pipe.py aggregate.py --reload
+
 """
 
 import asyncio
 import websockets
-import subprocess
+import json
 import logging
 import os
 import signal
 import sys
 import random
+import re
+import time
 import argparse
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
+from pipe.child import PING_INTERVAL, PING_TIMEOUT, MCPChild, dumps
+from pipe.compression import ClientThresholdDeflateFactory, WireStats, uses_threshold_deflate
+from pipe.flow import BLOCK, DROP, FAIL, MessageQueue, OutboundSpool, send_coalesced
+from pipe.forkserver import ForkServer
+from pipe.link import KEEPALIVE_INTERVAL, KEEPALIVE_TIMEOUT, LinkMonitor
+from pipe.reload import watch
+from pipe.router import Router, error_response
+from pipe.stats import serve_stats
 
 # Configure logging
 logging.basicConfig(
@@ -31,142 +50,330 @@ logger = logging.getLogger('MCP_PIPE')
 # Reconnection settings
 INITIAL_BACKOFF = 1  # Initial wait time in seconds
 MAX_BACKOFF = 60  # Maximum wait time in seconds
-reconnect_attempt = 0
-backoff = INITIAL_BACKOFF
 
-async def connect_with_retry(uri):
-    """Connect to WebSocket server with retry mechanism"""
-    global reconnect_attempt, backoff
-    while True:  # Infinite reconnection
+class Endpoint:
+    """One MCP endpoint: keeps a WebSocket connected and routes it through the shared children.
+
+    Messages pass through a bounded queue in each direction. When a queue is full,
+    notifications are dropped, requests from the endpoint wait or are refused
+    depending on `request_overflow`, and everything else waits for room.
+    Responses finished while disconnected are spooled and sent after reconnecting;
+    responses owed to a dropped connection that finish after the reconnect are
+    sent on the new one.
+    The connection is pinged every `keepalive_interval` seconds and dropped when no
+    answer arrives within `keepalive_timeout`; `liveness_probe` adds a JSON-RPC ping.
+    """
+
+    def __init__(self, uri, router, name, inbound_size=256, outbound_size=256,
+                 request_overflow=BLOCK, coalesce_window=0, coalesce_max_bytes=4096,
+                 spool_size=256, spool_max_bytes=16 * 1024 * 1024, spool_ttl=300,
+                 compression='deflate', compression_threshold=1024, compression_level=1,
+                 keepalive_interval=KEEPALIVE_INTERVAL, keepalive_timeout=KEEPALIVE_TIMEOUT,
+                 liveness_probe=False):
+        self.uri = uri
+        self.router = router
+        self.name = name
+        # Reconnection state is kept per endpoint so endpoints back off independently
+        self.reconnect_attempt = 0
+        self.backoff = INITIAL_BACKOFF
+        # Queues and their counters outlive reconnects; leftovers are cleared per connection
+        self.inbound = MessageQueue(inbound_size)
+        self.outbound = MessageQueue(outbound_size)
+        self.request_overflow = request_overflow
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_bytes = coalesce_max_bytes
+        self.spool = OutboundSpool(spool_size, spool_max_bytes, spool_ttl)
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self.wire = WireStats()
+        self.link = LinkMonitor(keepalive_interval, keepalive_timeout, liveness_probe)
+
+    async def connect_with_retry(self):
+        """Connect to WebSocket server with retry mechanism"""
+        while True:  # Infinite reconnection
+            try:
+                if self.reconnect_attempt > 0:
+                    wait_time = self.backoff * (1 + random.random() * 0.1)  # Add some random jitter
+                    logger.info(f"[{self.name}] Waiting {wait_time:.2f} seconds before reconnection attempt {self.reconnect_attempt}...")
+                    await asyncio.sleep(wait_time)
+                    # Calculate wait time for next reconnection (exponential backoff)
+                    self.backoff = min(self.backoff * 2, MAX_BACKOFF)
+                    
+                # Attempt to connect
+                await self.connect_to_server()
+            
+            except Exception as e:
+                self.reconnect_attempt += 1
+                logger.warning(f"[{self.name}] Connection closed (attempt: {self.reconnect_attempt}): {e}")
+
+    async def connect_to_server(self):
+        """Connect to WebSocket server and serve the connection"""
         try:
-            if reconnect_attempt > 0:
-                wait_time = backoff * (1 + random.random() * 0.1)  # Add some random jitter
-                logger.info(f"Waiting {wait_time:.2f} seconds before reconnection attempt {reconnect_attempt}...")
-                await asyncio.sleep(wait_time)
+            logger.info(f"[{self.name}] Connecting to WebSocket server...")
+            extensions = None
+            if self.compression == 'deflate':
+                extensions = [ClientThresholdDeflateFactory(
+                    self.compression_threshold, self.wire, self.compression_level)]
+            # The built-in keepalive is replaced by `LinkMonitor`, which also measures it
+            async with websockets.connect(self.uri, compression=None, extensions=extensions,
+                                          ping_interval=None) as websocket:
+                logger.info(f"[{self.name}] Successfully connected to WebSocket server")
                 
-            # Attempt to connect
-            await connect_to_server(uri)
-        
+                # Reset reconnection counter if connection closes normally
+                self.reconnect_attempt = 0
+                self.backoff = INITIAL_BACKOFF
+                self.link.connected()
+                
+                try:
+                    await self.serve(websocket)
+                finally:
+                    self.link.disconnected()
+        except websockets.exceptions.ConnectionClosed as e:
+            logger.error(f"[{self.name}] WebSocket connection closed: {e}")
+            raise  # Re-throw exception to trigger reconnection
         except Exception as e:
-            reconnect_attempt += 1
-            logger.warning(f"Connection closed (attempt: {reconnect_attempt}): {e}")            
-            # Calculate wait time for next reconnection (exponential backoff)
-            backoff = min(backoff * 2, MAX_BACKOFF)
-
-async def connect_to_server(uri):
-    """Connect to WebSocket server and establish bidirectional communication with `mcp_script`"""
-    global reconnect_attempt, backoff
-    try:
-        logger.info(f"Connecting to WebSocket server...")
-        async with websockets.connect(uri) as websocket:
-            logger.info(f"Successfully connected to WebSocket server")
-            
-            # Reset reconnection counter if connection closes normally
-            reconnect_attempt = 0
-            backoff = INITIAL_BACKOFF
-            
-            # Start mcp_script process
-            # process = subprocess.Popen(
-            #     ['python', mcp_script],
-            #     stdin=subprocess.PIPE,
-            #     stdout=subprocess.PIPE,
-            #     stderr=subprocess.PIPE,
-            #     text=True  # Use text mode
-            # )
-            process = subprocess.Popen(
-                ['python', mcp_script],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8' # 显式指定编码为 UTF-8
-            )
-            logger.info(f"Started {mcp_script} process")
-            
-            # Create two tasks: read from WebSocket and write to process, read from process and write to WebSocket
-            await asyncio.gather(
-                pipe_websocket_to_process(websocket, process),
-                pipe_process_to_websocket(process, websocket),
-                pipe_process_stderr_to_terminal(process)
-            )
-    except websockets.exceptions.ConnectionClosed as e:
-        logger.error(f"WebSocket connection closed: {e}")
-        raise  # Re-throw exception to trigger reconnection
-    except Exception as e:
-        logger.error(f"Connection error: {e}")
-        raise  # Re-throw exception
-    finally:
-        # Ensure the child process is properly terminated
-        if 'process' in locals():
-            logger.info(f"Terminating {mcp_script} process")
+            logger.error(f"[{self.name}] Connection error: {e}")
+            raise  # Re-throw exception
+
+    async def serve(self, websocket):
+        """Pump one connection through the queues until it fails"""
+        self.inbound.clear()
+        # Messages queued after the last connection closed belong to it as well
+        self.spool_messages(self.outbound.clear())
+        # The children keep running across reconnects; only the session is new
+        spool = self.spool.add if self.spool.max_messages > 0 else None
+        session = self.router.open_session(self.name, self.enqueue, spool)
+        # With compression negotiated the deflate extension counts the bytes itself
+        send = websocket.send if uses_threshold_deflate(websocket) else self.wire.count(websocket.send)
+        tasks = [
+            asyncio.ensure_future(self.receive(websocket)),
+            asyncio.ensure_future(self.dispatch(session)),
+            asyncio.ensure_future(self.forward_spool()),
+            # Messages taken off the queue when sending fails are spooled ahead of the queue's leftovers
+            asyncio.ensure_future(send_coalesced(
+                self.outbound, send, self.coalesce_window, self.coalesce_max_bytes,
+                unsent=self.spool_messages)),
+            asyncio.ensure_future(self.link.run(websocket)),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # A sender cancelled mid-send spools what it held; that goes ahead of the queue's leftovers
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.router.close_session(session)
+            # Also wakes up router deliveries still waiting for room in the old connection's queue
+            self.spool_messages(self.outbound.clear())
+
+    async def enqueue(self, data, droppable=False):
+        """Queue one JSON string for the endpoint"""
+        return await self.outbound.put(data, DROP if droppable else BLOCK)
+
+    def spool_messages(self, messages):
+        for data in messages:
+            self.spool.add(data)
+
+    async def flush_spool(self):
+        """Send the responses spooled while the endpoint was disconnected"""
+        messages = self.spool.drain()
+        if messages:
+            logger.info(f"[{self.name}] Sending {len(messages)} spooled message(s)")
+        for i, data in enumerate(messages):
             try:
-                process.terminate()
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            logger.info(f"{mcp_script} process terminated")
-
-async def pipe_websocket_to_process(websocket, process):
-    """Read data from WebSocket and write to process stdin"""
-    try:
+                await self.enqueue(data)
+            except BaseException:
+                # The connection went away while waiting for room; keep the rest for the next one
+                self.spool.restore(messages[i:])
+                raise
+
+    async def forward_spool(self):
+        """Send responses spooled while this connection is up.
+
+        The router spools the responses of a closed session, including requests sent
+        on the previous connection that finish after the reconnect.
+        """
         while True:
-            # Read message from WebSocket
-            message = await websocket.recv()
-            logger.debug(f"<< {message[:120]}...")
-            
-            # Write to process stdin (in text mode)
-            if isinstance(message, bytes):
-                message = message.decode('utf-8')
-            process.stdin.write(message + '\n')
-            process.stdin.flush()
-    except Exception as e:
-        logger.error(f"Error in WebSocket to process pipe: {e}")
-        raise  # Re-throw exception to trigger reconnection
-    finally:
-        # Close process stdin
-        if not process.stdin.closed:
-            process.stdin.close()
+            await self.spool.ready.wait()
+            await self.flush_spool()
 
-async def pipe_process_to_websocket(process, websocket):
-    """Read data from process stdout and send to WebSocket"""
-    try:
+    async def receive(self, websocket):
+        """Read data from WebSocket and queue it for the children"""
+        try:
+            # Spooled responses go out before anything from the new connection is handled
+            await self.flush_spool()
+            while True:
+                # Read message from WebSocket
+                message = await websocket.recv()
+                received = time.perf_counter()
+                self.link.seen()
+                logger.debug(f"[{self.name}] << {message[:120]}...")
+
+                try:
+                    msg = json.loads(message)
+                except ValueError:
+                    msg = message  # Logged and dropped by the router
+                if not isinstance(msg, dict) or 'method' not in msg:
+                    if isinstance(msg, dict) and self.link.resolve(msg):
+                        continue  # Answer to a liveness probe
+                    overflow = BLOCK
+                elif 'id' not in msg:
+                    overflow = DROP
+                else:
+                    overflow = self.request_overflow
+
+                # Blocking here stops reading from the WebSocket, so a slow child applies backpressure
+                if not await self.inbound.put((msg, received), overflow) and overflow == FAIL:
+                    await self.enqueue(dumps(error_response(msg['id'], -32000, "Too many pending requests")))
+        except Exception as e:
+            logger.error(f"[{self.name}] Error in WebSocket to process pipe: {e}")
+            raise  # Re-throw exception to trigger reconnection
+
+    async def dispatch(self, session):
+        """Route queued messages to the children"""
         while True:
-            # Read data from process stdout
-            data = await asyncio.get_event_loop().run_in_executor(
-                None, process.stdout.readline
-            )
-            
-            if not data:  # If no data, the process may have ended
-                logger.info("Process has ended output")
-                break
-                
-            # Send data to WebSocket
-            logger.debug(f">> {data[:120]}...")
-            # In text mode, data is already a string, no need to decode
-            await websocket.send(data)
-    except Exception as e:
-        logger.error(f"Error in process to WebSocket pipe: {e}")
-        raise  # Re-throw exception to trigger reconnection
+            msg, received = await self.inbound.get()
+            # Waits for the child's stdin to drain
+            await session.handle(msg, received)
+
+async def log_stats(router, endpoints, interval):
+    """Periodically log queue statistics for every endpoint and latencies per tool"""
+    while True:
+        await asyncio.sleep(interval)
+        for endpoint in endpoints:
+            logger.info(f"[{endpoint.name}] inbound: {endpoint.inbound.summary()}")
+            logger.info(f"[{endpoint.name}] outbound: {endpoint.outbound.summary()}")
+            logger.info(f"[{endpoint.name}] spool: {endpoint.spool.summary()}")
+            logger.info(f"[{endpoint.name}] sent: {endpoint.wire.summary()}")
+            logger.info(f"[{endpoint.name}] link: {endpoint.link.summary()}")
+        for child in router.children:
+            logger.info(f"{child.name}: {child.summary()}")
+        cache = router.cache_stats()
+        logger.info(f"Response cache: {cache['entries']} entries, {cache['hits']} hits, {cache['misses']} misses")
+        for line in router.latency.summary_lines():
+            logger.info(f"Latency {line}")
+
+def collect_stats(router, endpoints):
+    """Statistics served by `--stats-port`"""
+    return {
+        "endpoints": {
+            endpoint.name: {
+                "inbound": endpoint.inbound.stats(),
+                "outbound": endpoint.outbound.stats(),
+                "spool": endpoint.spool.stats(),
+                "sent": endpoint.wire.stats(),
+                "link": endpoint.link.stats(),
+            }
+            for endpoint in endpoints
+        },
+        "children": {child.name: child.stats() for child in router.children},
+        "cache": router.cache_stats(),
+        "latency_ms": router.latency.snapshot(),
+    }
+
+async def run_pipe(endpoints, mcp_scripts, children=1, standby=False, use_forkserver=False,
+                   transport='subprocess', stats_interval=0, stats_port=None,
+                   ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT, reload=False,
+                   **endpoint_options):
+    """Start `children` copies of each of `mcp_scripts` once and serve them to every endpoint.
+
+    `endpoints` is a list of (name, uri) pairs. With several scripts their tools
+    are merged into one catalogue and every `tools/call` is routed to the script
+    that registered the tool. With `standby` every child keeps an initialized
+    spare process for failover; with `use_forkserver` processes are forked from a
+    template that has already imported the script. The `inprocess` transport runs
+    the script's FastMCP server inside this process instead.
+    Child processes are pinged every `ping_interval` seconds and restarted when
+    they do not answer within `ping_timeout`.
+    With `reload` the scripts and their `tools/*.py` modules are watched, and a
+    change switches every child to a new process without dropping the endpoints.
+    Statistics are logged every `stats_interval` seconds and served as JSON on
+    127.0.0.1:`stats_port`. `endpoint_options` are passed on to every `Endpoint`.
+    """
+    if isinstance(mcp_scripts, str):
+        mcp_scripts = [mcp_scripts]
+    forkservers = {script: ForkServer(script) for script in mcp_scripts} if use_forkserver else {}
+    await asyncio.gather(*(forkserver.start() for forkserver in forkservers.values()))
+    if transport == 'inprocess':
+        from pipe.inprocess import InProcessChild
+        pool = [InProcessChild(script) for script in mcp_scripts]
+    else:
+        pool = [
+            MCPChild(script, name=script if children == 1 else f"{script}#{i + 1}",
+                     standby=standby, forkserver=forkservers.get(script),
+                     ping_interval=ping_interval, ping_timeout=ping_timeout)
+            for script in mcp_scripts
+            for i in range(children)
+        ]
+    router = Router(pool)
+    await router.start()
+    connections = [Endpoint(uri, router, name, **endpoint_options) for name, uri in endpoints]
+    stats = asyncio.ensure_future(log_stats(router, connections, stats_interval)) if stats_interval > 0 else None
 
-async def pipe_process_stderr_to_terminal(process):
-    """Read data from process stderr and print to terminal"""
+    retiring = []
+
+    async def reload_children(changed):
+        logger.info(f"Reloading after changes to {', '.join(os.path.relpath(path) for path in changed)}")
+        # The fork server templates hold the old modules, and their forked processes
+        # die with them: fork from new templates and stop the old ones once unused
+        for script, forkserver in list(forkservers.items()):
+            forkservers[script] = ForkServer(script)
+            retiring.append(asyncio.ensure_future(forkserver.retire()))
+        for child in pool:
+            if child.forkserver is not None:
+                child.forkserver = forkservers[child.script]
+        if await router.reload():
+            logger.info("Reload complete")
+
+    watcher = asyncio.ensure_future(watch(mcp_scripts, reload_children)) if reload else None
+    stats_server = None
+    if stats_port:
+        stats_server = await serve_stats('127.0.0.1', stats_port, lambda: collect_stats(router, connections))
+        logger.info(f"Serving statistics on http://127.0.0.1:{stats_port}/")
     try:
-        while True:
-            # Read data from process stderr
-            data = await asyncio.get_event_loop().run_in_executor(
-                None, process.stderr.readline
-            )
-            
-            if not data:  # If no data, the process may have ended
-                logger.info("Process has ended stderr output")
-                break
-                
-            # Print stderr data to terminal (in text mode, data is already a string)
-            sys.stderr.write(data)
-            sys.stderr.flush()
-    except Exception as e:
-        logger.error(f"Error in process stderr pipe: {e}")
-        raise  # Re-throw exception to trigger reconnection
+        await asyncio.gather(*(endpoint.connect_with_retry() for endpoint in connections))
+    finally:
+        if stats is not None:
+            stats.cancel()
+        if watcher is not None:
+            watcher.cancel()
+        if stats_server is not None:
+            stats_server.close()
+        await router.stop()
+        await asyncio.gather(*(forkserver.stop() for forkserver in forkservers.values()), *retiring)
+
+def split_endpoints(value):
+    """Split an endpoint list separated by commas, semicolons or whitespace"""
+    return [uri for uri in re.split(r'[\s,;]+', value or '') if uri]
+
+def collect_endpoints(env_files):
+    """Collect (name, uri) endpoint pairs.
+
+    Exported `MCP_ENDPOINT`/`MCP_ENDPOINTS` variables take precedence; otherwise
+    each env file contributes the endpoints it defines.
+    """
+    exported = split_endpoints(os.environ.get('MCP_ENDPOINT')) + split_endpoints(os.environ.get('MCP_ENDPOINTS'))
+    if exported:
+        sources = [('env', exported)]
+    else:
+        sources = []
+        for env_file in env_files:
+            values = dotenv_values(env_file)
+            uris = split_endpoints(values.get('MCP_ENDPOINT')) + split_endpoints(values.get('MCP_ENDPOINTS'))
+            sources.append((os.path.basename(env_file).lstrip('.') or env_file, uris))
+
+    endpoints = []
+    seen = set()
+    for source, uris in sources:
+        for i, uri in enumerate(uris):
+            if uri in seen:
+                continue
+            seen.add(uri)
+            endpoints.append((source if len(uris) == 1 else f"{source}#{i + 1}", uri))
+    return endpoints
 
 def signal_handler(sig, frame):
     """Handle interrupt signals"""
@@ -176,29 +383,99 @@ def signal_handler(sig, frame):
 if __name__ == "__main__":
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="MCP Pipe")
-    parser.add_argument("mcp_script", help="MCP script filename")
-    parser.add_argument("--env-file", default=".env", help="Path to .env file (default: .env)")
+    parser.add_argument("mcp_script", nargs="+",
+                        help="MCP script filename; give several to split the tools over one process per script")
+    parser.add_argument("--env-file", action="append",
+                        help="Path to .env file (default: .env); repeat to serve several endpoints")
+    parser.add_argument("--children", type=int, default=1,
+                        help="Number of MCP server processes shared by all endpoints (default: 1)")
+    parser.add_argument("--standby", action="store_true",
+                        help="Keep an initialized spare process per child for fast failover")
+    parser.add_argument("--forkserver", action="store_true",
+                        help="Fork MCP server processes from a pre-imported template (POSIX only)")
+    parser.add_argument("--transport", choices=("subprocess", "inprocess"), default="subprocess",
+                        help="Run the MCP server as a child process (default) or inside the pipe")
+    parser.add_argument("--reload", action="store_true",
+                        help="Restart the MCP server without downtime when the script or tools/*.py change")
+    parser.add_argument("--ping-interval", type=float, default=PING_INTERVAL,
+                        help=f"Seconds between health pings to the MCP server process; 0 disables them (default: {PING_INTERVAL})")
+    parser.add_argument("--ping-timeout", type=float, default=PING_TIMEOUT,
+                        help=f"Restart the MCP server process if a ping is not answered within this many seconds (default: {PING_TIMEOUT})")
+    parser.add_argument("--inbound-queue", type=int, default=256,
+                        help="Messages buffered from each endpoint towards the MCP server (default: 256)")
+    parser.add_argument("--outbound-queue", type=int, default=256,
+                        help="Messages buffered from the MCP server towards each endpoint (default: 256)")
+    parser.add_argument("--request-overflow", choices=(BLOCK, FAIL), default=BLOCK,
+                        help="When the inbound queue is full, wait for room (default) or answer requests with an error")
+    parser.add_argument("--coalesce-window-ms", type=float, default=0,
+                        help="Batch small outgoing messages sent within this window into one frame; "
+                             "the endpoint must accept JSON-RPC batches (default: 0, off)")
+    parser.add_argument("--coalesce-max-bytes", type=int, default=4096,
+                        help="Only coalesce messages smaller than this (default: 4096)")
+    parser.add_argument("--spool-size", type=int, default=256,
+                        help="Responses held per endpoint while it is disconnected; 0 disables the spool (default: 256)")
+    parser.add_argument("--spool-max-bytes", type=int, default=16 * 1024 * 1024,
+                        help="Total size of the held responses per endpoint (default: 16 MiB)")
+    parser.add_argument("--spool-ttl", type=float, default=300,
+                        help="Seconds a held response stays valid (default: 300)")
+    parser.add_argument("--compression", choices=("deflate", "off"), default="deflate",
+                        help="Offer permessage-deflate to the endpoint (default: deflate)")
+    parser.add_argument("--compression-threshold", type=int, default=1024,
+                        help="Send messages smaller than this many bytes uncompressed (default: 1024)")
+    parser.add_argument("--compression-level", type=int, default=1, choices=range(-1, 10), metavar="{-1..9}",
+                        help="zlib level: 1 is fastest, 9 smallest, -1 the zlib default (default: 1)")
+    parser.add_argument("--keepalive-interval", type=float, default=KEEPALIVE_INTERVAL,
+                        help=f"Seconds between keepalive pings to the endpoint; 0 disables them (default: {KEEPALIVE_INTERVAL})")
+    parser.add_argument("--keepalive-timeout", type=float, default=KEEPALIVE_TIMEOUT,
+                        help=f"Reconnect if a keepalive ping is not answered within this many seconds (default: {KEEPALIVE_TIMEOUT})")
+    parser.add_argument("--liveness-probe", action="store_true",
+                        help="Also send a JSON-RPC ping with every keepalive; the endpoint must answer it")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="Log queue statistics and per-tool latencies every N seconds (default: 0, off)")
+    parser.add_argument("--stats-port", type=int,
+                        help="Serve queue statistics and per-tool latencies as JSON on 127.0.0.1:PORT")
     args = parser.parse_args()
+    if args.transport == "inprocess" and (args.children != 1 or args.standby or args.forkserver or args.reload
+                                          or len(args.mcp_script) > 1):
+        parser.error("--children, --standby, --forkserver, --reload and several scripts "
+                     "only apply to the subprocess transport")
+    env_files = args.env_file or [".env"]
+
+    # 收集接入点（需在加载 .env 之前读取已导出的环境变量）
+    endpoints = collect_endpoints(env_files)
 
-    # 加载指定的 .env 文件
-    load_dotenv(args.env_file)
+    # 加载指定的 .env 文件，工具配置以第一个文件为准
+    for env_file in env_files:
+        load_dotenv(env_file)
 
     # Register signal handler
     signal.signal(signal.SIGINT, signal_handler)
 
-    mcp_script = args.mcp_script
+    mcp_scripts = args.mcp_script
 
-    # Get token from environment variable or command line arguments
-    endpoint_url = os.environ.get('MCP_ENDPOINT')
-    if not endpoint_url:
+    if not endpoints:
         logger.error("Please set the `MCP_ENDPOINT` environment variable")
         sys.exit(1)
+    logger.info(f"Serving {len(endpoints)} endpoint(s) with {args.children} process(es) each of "
+                f"{', '.join(mcp_scripts)}")
     
     # Start main loop
     try:
-        asyncio.run(connect_with_retry(endpoint_url))
+        asyncio.run(run_pipe(endpoints, mcp_scripts, args.children, args.standby, args.forkserver,
+                             args.transport, args.stats_interval, args.stats_port,
+                             args.ping_interval, args.ping_timeout, args.reload,
+                             inbound_size=args.inbound_queue, outbound_size=args.outbound_queue,
+                             request_overflow=args.request_overflow,
+                             coalesce_window=args.coalesce_window_ms / 1000,
+                             coalesce_max_bytes=args.coalesce_max_bytes,
+                             spool_size=args.spool_size, spool_max_bytes=args.spool_max_bytes,
+                             spool_ttl=args.spool_ttl, compression=args.compression,
+                             compression_threshold=args.compression_threshold,
+                             compression_level=args.compression_level,
+                             keepalive_interval=args.keepalive_interval,
+                             keepalive_timeout=args.keepalive_timeout,
+                             liveness_probe=args.liveness_probe))
     except KeyboardInterrupt:
         logger.info("Program interrupted by user")
     except Exception as e:
         logger.error(f"Program execution error: {e}")
-
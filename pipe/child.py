@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+Supervised MCP server child process.
+
+The child is started once and outlives WebSocket connections; its stdout is handed
+to a single attached listener (the router). A process only counts as ready once it
+has answered the MCP `initialize` handshake, i.e. imported and registered all of its
+tools. If it exits it is restarted (with exponential backoff for crash loops) and the
+last handshake is replayed so the new process is ready to serve `tools/call`.
+
+A watchdog pings the active process; one that stops answering, e.g. because a sync
+tool is stuck in a `WebDriverWait`, is killed and restarted like a crashed one.
+
+`reload()` replaces a healthy process without downtime: a new process is started
+and initialized next to the running one, new messages go to it from then on, and
+the old process is left running until the caller has drained and retired it.
+"""
+
+import asyncio
+import codecs
+import functools
+import itertools
+import json
+import logging
+import sys
+
+from tools.histogram import Histogram
+
+logger = logging.getLogger('MCP_PIPE')
+
+dumps = functools.partial(json.dumps, ensure_ascii=False, separators=(',', ':'))
+
+READ_CHUNK_SIZE = 64 * 1024  # Bytes read from the child's stdout/stderr per call
+RESTART_BACKOFF = 1  # Initial wait before restarting a crashed child, in seconds
+MAX_RESTART_BACKOFF = 30  # Maximum wait before restarting a crashed child, in seconds
+HANDSHAKE_TIMEOUT = 30  # Seconds to wait for the child to answer a replayed `initialize`
+PING_INTERVAL = 15  # Seconds between watchdog pings
+PING_TIMEOUT = 120  # Seconds without a ping response before the child counts as hung
+INTERNAL_ID_PREFIX = 'mcp_pipe-'  # Ids of requests issued by the pipe itself
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+# Handshake used until a client has sent its own `initialize`
+DEFAULT_HANDSHAKE = {
+    "protocolVersion": "2024-11-05",
+    "capabilities": {},
+    "clientInfo": {"name": "mcp_pipe", "version": "0.1.0"}
+}
+
+
+async def terminate_process(process, timeout=5):
+    """Terminate the child process, killing it if it does not exit within `timeout` seconds"""
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+    except ProcessLookupError:
+        pass  # Already exited
+
+
+async def read_lines(stream):
+    """Yield complete lines from a byte stream, decoding UTF-8 incrementally.
+
+    Chunks are read without a line length limit, so large payloads (e.g. base64
+    vision frames) are handled without `LimitOverrunError`. Multi-byte characters
+    split across chunk boundaries are reassembled by the incremental decoder.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = []
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            pending.append(decoder.decode(b'', final=True))
+            tail = ''.join(pending)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(chunk)
+        start = 0
+        while True:
+            end = text.find('\n', start)
+            if end < 0:
+                break
+            pending.append(text[start:end])
+            yield ''.join(pending)
+            pending.clear()
+            start = end + 1
+        if start < len(text):
+            pending.append(text[start:])
+
+
+class MCPChild:
+    """Long-lived MCP server process shared across WebSocket connections.
+
+    With `standby` a spare process is kept started and initialized next to the
+    active one, so a crash is handled by swapping it in instead of a cold start.
+    `forkserver` (a `pipe.forkserver.ForkServer`) forks processes from a template
+    that has already imported the script, instead of starting a new interpreter.
+    Every `ping_interval` seconds the active process is pinged; if it does not answer
+    within `ping_timeout` it is killed (0 disables the watchdog).
+    """
+
+    def __init__(self, script, name=None, standby=False, forkserver=None,
+                 ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT):
+        self.script = script
+        self.name = name or script
+        self.standby = standby
+        self.forkserver = forkserver
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.process = None
+        self.ready = asyncio.Event()
+        self.restarts = 0
+        self.hangs = 0  # Processes killed by the watchdog
+        self.reloads = 0
+        self.last_failover = None  # Seconds from the last exit to being ready again
+        self.ping_rtt = Histogram()
+        self.last_ping_rtt = None
+        self._listener = None
+        self._exit_listener = None
+        self._hung = None  # Last process killed by the watchdog
+        self._handshake = DEFAULT_HANDSHAKE  # Last `initialize` params, replayed on restart
+        self._handshaken = {}  # process -> params it was initialized with
+        self._internal_ids = itertools.count(1)
+        self._internal_pending = {}
+        self._supervisor = None
+        self._spare = None  # Task producing an initialized standby process
+        self._switch = None  # Future the supervisor waits on for a reloaded process
+        self._pumps = {}
+        self._stopping = False
+
+    async def start(self):
+        """Start the child and wait until it is ready to accept messages"""
+        self._supervisor = asyncio.ensure_future(self._supervise())
+        await self.ready.wait()
+
+    async def stop(self):
+        """Stop supervising and terminate the child"""
+        self._stopping = True
+        self.ready.clear()
+        for task in (self._supervisor, self._spare):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        for process in list(self._pumps):
+            logger.info(f"Terminating {self.name} process (pid {process.pid})")
+            await terminate_process(process)
+        await asyncio.gather(*self._pumps.values(), return_exceptions=True)
+        logger.info(f"{self.name} process terminated")
+
+    def attach(self, listener, exit_listener=None):
+        """Forward every stdout line of the child to the coroutine function `listener`.
+
+        `exit_listener(reason)` is awaited when the active process has exited and all
+        of its output has been forwarded, so requests it never answered can be failed.
+        """
+        self._listener = listener
+        self._exit_listener = exit_listener
+
+    def detach(self, listener):
+        """Stop forwarding to `listener`; output produced while detached is dropped"""
+        if self._listener is listener:
+            self._listener = None
+            self._exit_listener = None
+
+    def stats(self):
+        return {
+            "pid": self.process.pid if self.process is not None else None,
+            "ready": self.ready.is_set(),
+            "restarts": self.restarts,
+            "hangs": self.hangs,
+            "reloads": self.reloads,
+            "last_failover": self.last_failover,
+            "ping_rtt_ms": {
+                "last": round(self.last_ping_rtt * 1000, 3) if self.last_ping_rtt is not None else None,
+                "p50": self.ping_rtt.percentile(50) / 1000,
+                "p99": self.ping_rtt.percentile(99) / 1000,
+            },
+        }
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        text = f"restarts {self.restarts}, hangs {self.hangs}, reloads {self.reloads}"
+        if self.ping_rtt.count:
+            text += (f", ping RTT last {self.last_ping_rtt * 1000:.1f} ms, "
+                     f"p50 {self.ping_rtt.percentile(50) / 1000:.1f} ms, "
+                     f"p99 {self.ping_rtt.percentile(99) / 1000:.1f} ms")
+        return text
+
+    async def send(self, message):
+        """Write one JSON-RPC message to the child's stdin, waiting for it to drain"""
+        if isinstance(message, bytes):
+            message = message.decode('utf-8')
+        await self.ready.wait()
+        await self._write(self.process, message)
+
+    async def send_message(self, msg):
+        """Serialize and send one JSON-RPC message given as a dict"""
+        await self.send(dumps(msg))
+
+    async def reload(self):
+        """Start a fresh process and switch to it once it has registered its tools.
+
+        Returns the previous process, which keeps running so it can answer the
+        requests it already has; hand it to `retire()` once they are done. Returns
+        None if the child is restarting anyway, in which case the restarted
+        process picks up the new code.
+        """
+        process = await self._spawn()
+        try:
+            await self._prepare_or_exit(process)
+        except BaseException:
+            await terminate_process(process)
+            raise
+        switch = self._switch
+        if switch is None or switch.done() or self._stopping:
+            await terminate_process(process)
+            return None
+        old = self.process
+        self.process = process
+        switch.set_result(process)
+        self.reloads += 1
+        logger.info(f"Switched {self.name} to reloaded process (pid {process.pid}), "
+                    f"draining pid {old.pid}")
+        if self._spare is not None:
+            # The standby process still runs the old code
+            asyncio.ensure_future(self._replace_spare())
+        return old
+
+    async def retire(self, process):
+        """Terminate a process replaced by `reload()`"""
+        logger.info(f"Terminating previous {self.name} process (pid {process.pid})")
+        await terminate_process(process)
+
+    async def initialize(self, params, timeout=HANDSHAKE_TIMEOUT):
+        """Run the MCP `initialize` handshake with `params` and return the child's response.
+
+        The params are remembered and replayed whenever the child is restarted.
+        """
+        self._handshake = params
+        await self.ready.wait()
+        process = self.process
+        response = await self._initialize(process, params, timeout)
+        self._handshaken[process] = params
+        return response
+
+    async def _write(self, process, message):
+        process.stdin.write(message.encode('utf-8') + b'\n')
+        await process.stdin.drain()
+
+    async def _supervise(self):
+        loop = asyncio.get_running_loop()
+        backoff = 0
+        exited_at = None
+        while not self._stopping:
+            started = loop.time()
+            try:
+                process = await self._next_process()
+            except Exception as e:
+                logger.error(f"Failed to start {self.name}: {e}")
+            else:
+                self.process = process
+                self.ready.set()
+                if exited_at is not None:
+                    self.last_failover = loop.time() - exited_at
+                    logger.info(f"{self.name} ready again after {self.last_failover:.3f} seconds")
+                if self.standby and self._spare is None:
+                    self._spare = asyncio.ensure_future(self._prepare_spare())
+                while True:
+                    watchdog = asyncio.ensure_future(self._watch(process)) if self.ping_interval > 0 else None
+                    try:
+                        replacement = await self._run(process)
+                    finally:
+                        if watchdog is not None:
+                            watchdog.cancel()
+                    if replacement is None:
+                        break
+                    process = replacement
+                self.ready.clear()
+                exited_at = loop.time()
+                if self._stopping:
+                    break
+                logger.warning(f"{self.name} exited with code {process.returncode}")
+                if self._exit_listener is not None:
+                    if process is self._hung:
+                        reason = f"{self.name} stopped responding and was restarted"
+                    else:
+                        reason = f"{self.name} exited with code {process.returncode}"
+                    try:
+                        await self._exit_listener(reason)
+                    except Exception as e:
+                        logger.error(f"Error handling exit of {self.name}: {e}")
+            self.restarts += 1
+            # A child that stayed up for a while is restarted right away; crash loops back off
+            if loop.time() - started > MAX_RESTART_BACKOFF:
+                backoff = 0
+            if backoff:
+                logger.info(f"Restarting {self.name} in {backoff} seconds...")
+                await asyncio.sleep(backoff)
+            backoff = min(max(backoff * 2, RESTART_BACKOFF), MAX_RESTART_BACKOFF)
+
+    async def _run(self, process):
+        """Wait until `process` exits, or return the process `reload()` switched to"""
+        switch = self._switch = asyncio.get_running_loop().create_future()
+        exited = asyncio.ensure_future(process.wait())
+        try:
+            await asyncio.wait({exited, switch}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._switch = None
+            if not switch.done():
+                switch.cancel()
+        if switch.done() and not switch.cancelled():
+            exited.cancel()
+            return switch.result()
+        pumps = self._pumps.get(process)
+        if pumps is not None:
+            # Shielded so stop() can cancel the supervisor without losing output
+            await asyncio.shield(pumps)
+        return None
+
+    async def _watch(self, process):
+        """Ping `process` periodically and kill it when it stops answering"""
+        loop = asyncio.get_running_loop()
+        while process.returncode is None:
+            await asyncio.sleep(self.ping_interval)
+            started = loop.time()
+            try:
+                # The write is covered by the deadline too, a hung child may stop reading stdin
+                await asyncio.wait_for(self.request(process, 'ping', {}, self.ping_timeout), self.ping_timeout)
+            except asyncio.TimeoutError:
+                if process.returncode is not None:
+                    return
+                self.hangs += 1
+                self._hung = process
+                logger.error(f"{self.name} (pid {process.pid}) did not answer a ping within "
+                             f"{self.ping_timeout} seconds, killing it")
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                return
+            except (ConnectionError, RuntimeError) as e:
+                logger.debug(f"Ping to {self.name} failed: {e}")
+                return
+            self.last_ping_rtt = loop.time() - started
+            self.ping_rtt.record(self.last_ping_rtt)
+
+    async def _next_process(self):
+        """Swap in the standby process if one is ready, otherwise start a new one"""
+        spare = self._spare
+        if spare is not None and spare.done():
+            self._spare = None
+            process = None if spare.cancelled() or spare.exception() else spare.result()
+            if process is not None and process.returncode is None:
+                if self._handshaken.get(process) is not self._handshake:
+                    await self._prepare(process)
+                logger.info(f"Switched {self.name} to standby process (pid {process.pid})")
+                return process
+        process = await self._spawn()
+        try:
+            await self._prepare(process)
+        except Exception:
+            await terminate_process(process)
+            raise
+        return process
+
+    async def _replace_spare(self):
+        """Discard the standby process and prepare a new one"""
+        spare, self._spare = self._spare, None
+        if spare is None:
+            return
+        spare.cancel()
+        try:
+            process = await spare
+        except (asyncio.CancelledError, Exception):
+            process = None
+        if not self._stopping:
+            self._spare = asyncio.ensure_future(self._prepare_spare())
+        if process is not None:
+            await terminate_process(process)
+
+    async def _prepare_spare(self):
+        """Start and initialize a standby process, retrying with backoff on failure"""
+        backoff = RESTART_BACKOFF
+        while True:
+            process = await self._spawn()
+            try:
+                await self._prepare(process)
+                logger.info(f"Standby {self.name} process ready (pid {process.pid})")
+                return process
+            except asyncio.CancelledError:
+                await terminate_process(process)
+                raise
+            except Exception as e:
+                logger.error(f"Failed to prepare standby {self.name} process: {e}")
+                await terminate_process(process)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+
+    async def _spawn(self):
+        if self.forkserver is not None:
+            process = await self.forkserver.spawn()
+        else:
+            process = await asyncio.create_subprocess_exec(
+                'python', self.script,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        pumps = asyncio.gather(
+            self._pump_stdout(process),
+            self._pump_stderr(process)
+        )
+        self._pumps[process] = pumps
+        pumps.add_done_callback(lambda _: self._forget(process))
+        logger.info(f"Started {self.name} process (pid {process.pid})")
+        return process
+
+    def _forget(self, process):
+        self._pumps.pop(process, None)
+        self._handshaken.pop(process, None)
+        spare = self._spare
+        if (not self._stopping and spare is not None and spare.done() and not spare.cancelled()
+                and spare.result() is process):
+            logger.warning(f"Standby {self.name} process exited, starting a new one")
+            self._spare = asyncio.ensure_future(self._prepare_spare())
+
+    async def _prepare_or_exit(self, process):
+        """`_prepare()` that fails as soon as `process` exits, e.g. on a syntax error"""
+        prepare = asyncio.ensure_future(self._prepare(process))
+        exited = asyncio.ensure_future(process.wait())
+        try:
+            done, _ = await asyncio.wait({prepare, exited}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            exited.cancel()
+            if not prepare.done():
+                prepare.cancel()
+        if prepare not in done:
+            raise RuntimeError(f"{self.name} exited with code {process.returncode} during startup")
+        prepare.result()
+
+    async def _prepare(self, process):
+        """Initialize `process`; it has finished registering its tools once it answers"""
+        params = self._handshake
+        response = await self._initialize(process, params, HANDSHAKE_TIMEOUT)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        self._handshaken[process] = params
+
+    async def _initialize(self, process, params, timeout):
+        # `initialize` and `notifications/initialized` go out in a single write, so no
+        # other connection's request can reach the child while it is between the two
+        return await self.request(process, 'initialize', params, timeout, trailer=INITIALIZED)
+
+    async def request(self, process, method, params, timeout, trailer=None):
+        """Send a request owned by the pipe and return the child's response.
+
+        `trailer` is an optional notification written together with the request.
+        """
+        request_id = f"{INTERNAL_ID_PREFIX}{next(self._internal_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        self._internal_pending[request_id] = future
+        message = json.dumps(
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params},
+            ensure_ascii=False)
+        if trailer is not None:
+            message += '\n' + json.dumps(trailer)
+        try:
+            await self._write(process, message)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._internal_pending.pop(request_id, None)
+
+    def _resolve_internal(self, line):
+        """Complete a pending pipe-owned request; returns True if `line` was its response"""
+        try:
+            response = json.loads(line)
+        except ValueError:
+            return False
+        future = self._internal_pending.get(response.get('id')) if isinstance(response, dict) else None
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(response)
+        return True
+
+    async def _pump_stdout(self, process):
+        """Read data from process stdout and hand it to the attached listener"""
+        try:
+            async for data in read_lines(process.stdout):
+                data = data.rstrip('\r')
+                if not data:
+                    continue
+                if self._internal_pending and INTERNAL_ID_PREFIX in data and self._resolve_internal(data):
+                    continue
+
+                listener = self._listener
+                if listener is None:
+                    logger.debug(f"No connection attached, dropping: {data[:120]}...")
+                    continue
+                logger.debug(f">> {data[:120]}...")
+                try:
+                    await listener(data)
+                except Exception as e:
+                    # The connection is going away; its receive side triggers the reconnect
+                    logger.error(f"Error in process to WebSocket pipe: {e}")
+
+            # If no data, the process may have ended
+            logger.info(f"{self.name} has ended output")
+        except Exception as e:
+            logger.error(f"Error reading {self.name} stdout: {e}")
+
+    async def _pump_stderr(self, process):
+        """Read data from process stderr and print to terminal"""
+        try:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            while True:
+                # Read whatever is available; stderr is forwarded as-is, no line framing needed
+                chunk = await process.stderr.read(READ_CHUNK_SIZE)
+
+                if not chunk:  # If no data, the process may have ended
+                    logger.info(f"{self.name} has ended stderr output")
+                    break
+
+                # Print stderr data to terminal
+                sys.stderr.write(decoder.decode(chunk))
+                sys.stderr.flush()
+        except Exception as e:
+            logger.error(f"Error in process stderr pipe: {e}")
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+permessage-deflate with a size threshold, and bytes-on-wire accounting.
+
+websockets compresses every message once permessage-deflate is negotiated. Most
+JSON-RPC messages are a few hundred bytes, where deflate saves little and costs
+a zlib call per message, while vision frames and note listings are large and
+compress well (base64 JPEG by about a quarter, note JSON far more). RFC 7692
+allows sending individual messages uncompressed, so messages smaller than the
+threshold are sent as they are and only larger ones go through zlib.
+
+`WireStats` counts payload and on-wire bytes per endpoint and the CPU time spent
+compressing, for the stats log.
+"""
+
+import time
+
+from websockets.extensions.permessage_deflate import (
+    ClientPerMessageDeflateFactory,
+    PerMessageDeflate,
+)
+from websockets.frames import CTRL_OPCODES, OP_CONT
+
+
+class WireStats:
+    """Bytes sent to one endpoint, before and after compression"""
+
+    def __init__(self):
+        self.messages = 0
+        self.compressed = 0
+        self.payload_bytes = 0
+        self.wire_bytes = 0
+        self.compress_time = 0.0
+
+    def count(self, send):
+        """Wrap `send` to count messages sent without compression"""
+        async def counted(data):
+            size = len(data) if data.isascii() else len(data.encode('utf-8'))
+            self.messages += 1
+            self.payload_bytes += size
+            self.wire_bytes += size
+            await send(data)
+        return counted
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "compressed": self.compressed,
+            "payload_bytes": self.payload_bytes,
+            "wire_bytes": self.wire_bytes,
+            "compress_us_per_message": round(self.compress_time / self.compressed * 1e6, 1) if self.compressed else 0,
+        }
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        ratio = self.wire_bytes / self.payload_bytes if self.payload_bytes else 1
+        text = (f"{self.messages} messages, {self.payload_bytes} bytes payload, "
+                f"{self.wire_bytes} bytes on wire ({ratio:.0%})")
+        if self.compressed:
+            text += (f", {self.compressed} compressed at "
+                     f"{self.compress_time / self.compressed * 1e6:.0f} us each")
+        return text
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves messages under `threshold` bytes uncompressed"""
+
+    def __init__(self, *args, threshold=0, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold = threshold
+        self.stats = stats or WireStats()
+        self._compressing = False
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        stats = self.stats
+        size = len(frame.data)
+        if frame.opcode is not OP_CONT:
+            stats.messages += 1
+            self._compressing = not (frame.fin and size < self.threshold)
+        stats.payload_bytes += size
+        if not self._compressing:
+            stats.wire_bytes += size
+            return frame
+
+        started = time.perf_counter()
+        frame = super().encode(frame)
+        stats.compress_time += time.perf_counter() - started
+        if frame.fin:
+            stats.compressed += 1
+        stats.wire_bytes += len(frame.data)
+        return frame
+
+
+class ClientThresholdDeflateFactory(ClientPerMessageDeflateFactory):
+    """Offers permessage-deflate and sets up `ThresholdPerMessageDeflate` once accepted"""
+
+    def __init__(self, threshold=0, stats=None, level=1, **kwargs):
+        kwargs.setdefault('compress_settings', {'memLevel': 5, 'level': level})
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.stats = stats
+
+    def process_response_params(self, params, accepted_extensions):
+        extension = super().process_response_params(params, accepted_extensions)
+        return ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            threshold=self.threshold,
+            stats=self.stats,
+        )
+
+
+def uses_threshold_deflate(websocket):
+    """Whether `websocket` negotiated `ThresholdPerMessageDeflate`, which counts bytes itself"""
+    extensions = getattr(websocket, 'extensions', None) or []
+    return any(isinstance(extension, ThresholdPerMessageDeflate) for extension in extensions)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded message queues between the WebSocket and the MCP children.
+
+Each endpoint has one queue per direction. When a queue is full, notifications
+are dropped (they carry no response anyone waits for), while requests and
+responses either wait for room (`block`, applying backpressure upstream) or,
+for inbound requests, are refused with a JSON-RPC error (`fail`). Depth, stall
+time, drops and failures are counted for the periodic stats log.
+
+Outbound messages can optionally be coalesced into JSON-RPC batch frames; only
+enable that if the endpoint accepts batches.
+
+Responses that become ready while the endpoint is disconnected are kept in an
+`OutboundSpool` and sent once a connection is up: right after the next connection
+comes up, or as soon as they are spooled if one already is (a request sent on a
+dropped connection may finish after the reconnect).
+"""
+
+import asyncio
+import collections
+import time
+
+# Overflow policies, chosen per message by the caller of `MessageQueue.put`
+BLOCK = 'block'  # Wait for room
+FAIL = 'fail'  # Refuse the message
+DROP = 'drop'  # Discard the message
+
+
+class MessageQueue:
+    """Bounded FIFO with per-message overflow policies and counters"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.queue = asyncio.Queue(maxsize)
+        self.max_depth = 0
+        self.forwarded = 0
+        self.dropped = 0
+        self.failed = 0
+        self.stalls = 0
+        self.stall_time = 0.0
+        self.frames = 0  # WebSocket frames sent (outbound only)
+        self.coalesced = 0  # Messages sent inside a batch frame (outbound only)
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    async def put(self, item, overflow=BLOCK):
+        """Queue `item`; returns False if it was dropped or refused because the queue is full"""
+        if self.queue.full():
+            if overflow == DROP:
+                self.dropped += 1
+                return False
+            if overflow == FAIL:
+                self.failed += 1
+                return False
+            started = time.perf_counter()
+            await self.queue.put(item)
+            self.stalls += 1
+            self.stall_time += time.perf_counter() - started
+        else:
+            self.queue.put_nowait(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    async def get(self):
+        item = await self.queue.get()
+        self.forwarded += 1
+        return item
+
+    def clear(self):
+        """Remove and return queued items, e.g. those left behind by a closed connection.
+
+        This also wakes up producers blocked on a full queue.
+        """
+        items = []
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "forwarded": self.forwarded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "stalls": self.stalls,
+            "stall_time": round(self.stall_time, 3),
+            "frames": self.frames,
+            "coalesced": self.coalesced,
+        }
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        text = (f"depth {self.queue.qsize()}/{self.maxsize} (max {self.max_depth}), "
+                f"forwarded {self.forwarded}, dropped {self.dropped}, failed {self.failed}, "
+                f"stalled {self.stalls}x {self.stall_time:.3f}s")
+        if self.frames:
+            text += f", frames {self.frames}, coalesced {self.coalesced}"
+        return text
+
+
+class OutboundSpool:
+    """Messages held for an endpoint while it is disconnected, bounded by count, bytes and age"""
+
+    def __init__(self, max_messages=256, max_bytes=16 * 1024 * 1024, ttl=300):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.items = collections.deque()  # (expiry time, data)
+        self.bytes = 0
+        self.spooled = 0
+        self.flushed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.ready = asyncio.Event()  # Set while messages are held
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, data):
+        """Hold `data`, evicting the oldest messages if the spool is full"""
+        if self.max_messages <= 0 or len(data) > self.max_bytes:
+            self.evicted += 1
+            return
+        self.items.append((time.monotonic() + self.ttl, data))
+        self.bytes += len(data)
+        self.spooled += 1
+        while len(self.items) > self.max_messages or self.bytes > self.max_bytes:
+            _, dropped = self.items.popleft()
+            self.bytes -= len(dropped)
+            self.evicted += 1
+        self.ready.set()
+
+    def restore(self, messages):
+        """Put drained `messages` that could not be sent back in front, oldest first"""
+        expires = time.monotonic() + self.ttl
+        for data in reversed(messages):
+            self.items.appendleft((expires, data))
+            self.bytes += len(data)
+        self.flushed -= len(messages)
+        if self.items:
+            self.ready.set()
+
+    def drain(self):
+        """Remove and return all messages that have not expired yet, oldest first"""
+        now = time.monotonic()
+        items = []
+        while self.items:
+            expires, data = self.items.popleft()
+            if expires < now:
+                self.expired += 1
+            else:
+                items.append(data)
+        self.bytes = 0
+        self.flushed += len(items)
+        self.ready.clear()
+        return items
+
+    def stats(self):
+        return {
+            "held": len(self.items),
+            "bytes": self.bytes,
+            "spooled": self.spooled,
+            "flushed": self.flushed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        return (f"held {len(self.items)} ({self.bytes} bytes), spooled {self.spooled}, "
+                f"flushed {self.flushed}, expired {self.expired}, evicted {self.evicted}")
+
+
+async def send_coalesced(queue, send, window=0, max_bytes=4096, max_messages=32, unsent=None):
+    """Send everything from `queue` through `send`, coalescing small messages.
+
+    Messages shorter than `max_bytes` that arrive within `window` seconds of each
+    other are sent as one JSON-RPC batch array of up to `max_messages` entries;
+    larger messages, or all of them when `window` is 0, are sent on their own.
+    If `send` fails or the task is cancelled, the messages already taken off the
+    queue but not sent are passed to `unsent(messages)`, oldest first.
+    """
+    loop = asyncio.get_running_loop()
+    getter = None
+    pending = []  # Taken off the queue, not sent yet
+    try:
+        while True:
+            if getter is None:
+                item = await queue.get()
+            else:
+                item = await getter
+                getter = None
+            pending = [item]
+            if window <= 0 or len(item) >= max_bytes:
+                await send(item)
+                pending = []
+                queue.frames += 1
+                continue
+
+            held = None
+            deadline = loop.time() + window
+            while len(pending) < max_messages:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                # The getter outlives a timeout, so a message arriving late is never lost
+                getter = getter or asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=remaining)
+                if not done:
+                    break
+                item = getter.result()
+                getter = None
+                pending.append(item)
+                if len(item) >= max_bytes:
+                    held = item
+                    break
+
+            batch = pending[:-1] if held is not None else pending
+            if len(batch) == 1:
+                await send(batch[0])
+            else:
+                await send('[' + ','.join(batch) + ']')
+                queue.coalesced += len(batch)
+            queue.frames += 1
+            pending = [held] if held is not None else []
+            if held is not None:
+                await send(held)
+                pending = []
+                queue.frames += 1
+    except BaseException:
+        if unsent is not None and pending:
+            unsent(pending)
+        raise
+    finally:
+        if getter is not None:
+            # A message the getter already took (e.g. while a batch was being sent) is in hand too
+            if unsent is not None and getter.done() and not getter.cancelled() and getter.exception() is None:
+                unsent([getter.result()])
+            else:
+                getter.cancel()
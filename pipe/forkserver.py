@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Fork server for MCP child processes (POSIX only).
+
+A template process runs the MCP script once without its `__main__` block, so all
+tool modules are imported and registered (including those the script defers with
+`tools.lazy`), then waits for fork requests. Each
+request carries the stdin/stdout/stderr pipe ends for a new child; the template
+forks, the fork installs them as its standard streams and serves the already
+registered FastMCP instance over stdio. Starting a child then costs a `fork()`
+instead of a fresh interpreter plus the selenium/cv2/openai imports.
+
+Everything the template holds is copied into every fork, frozen at the moment
+of the fork, and its threads are not copied at all. Tool modules therefore must
+not open data files, connections or background threads at import time: they open
+them on first use, or drop what they inherited in an `os.register_at_fork()`
+after-fork hook (see `tools.note`).
+
+The pipe side is `ForkServer`, whose `spawn()` returns a `ForkedProcess` that can
+be used wherever an `asyncio.subprocess.Process` is expected.
+
+Usage (run by ForkServer, not by hand):
+
+python pipe/forkserver.py <mcp_script> <control_fd>
+"""
+
+import asyncio
+import logging
+import os
+import runpy
+import signal
+import socket
+import sys
+import threading
+import traceback
+
+logger = logging.getLogger('MCP_PIPE')
+
+
+class ForkedProcess:
+    """A child forked by the fork server, mimicking `asyncio.subprocess.Process`"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self.stdin = None
+        self.stdout = None
+        self.stderr = None
+        self._exit = asyncio.get_running_loop().create_future()
+
+    async def _connect(self, stdin_fd, stdout_fd, stderr_fd):
+        loop = asyncio.get_running_loop()
+        self.stdout = await self._connect_reader(loop, stdout_fd)
+        self.stderr = await self._connect_reader(loop, stderr_fd)
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(stdin_fd, 'wb', 0))
+        self.stdin = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    @staticmethod
+    async def _connect_reader(loop, fd):
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', 0))
+        return reader
+
+    def _exited(self, returncode):
+        if self.returncode is None:
+            self.returncode = returncode
+        if not self._exit.done():
+            self._exit.set_result(returncode)
+
+    async def wait(self):
+        await asyncio.shield(self._exit)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.returncode is not None:
+            raise ProcessLookupError(self.pid)
+        os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """Pipe-side handle of the fork server for one MCP script"""
+
+    def __init__(self, script):
+        if not hasattr(os, 'fork') or not hasattr(socket, 'send_fds'):
+            raise RuntimeError("The fork server requires a POSIX system")
+        self.script = script
+        self.server = None
+        self._control = None
+        self._replies = None
+        self._pids = None
+        self._processes = {}
+        self._early_exits = {}
+        self._lock = None
+
+    async def start(self):
+        """Start the template process and wait until it has imported the script"""
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.server = await asyncio.create_subprocess_exec(
+                'python', os.path.abspath(__file__), self.script, str(child.fileno()),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                pass_fds=(child.fileno(),)
+            )
+        finally:
+            child.close()
+        self._control = parent
+        self._pids = asyncio.Queue()
+        line = await self.server.stdout.readline()
+        if line.strip() != b'ready':
+            await self.stop()
+            raise RuntimeError(f"Fork server for {self.script} failed to start")
+        self._replies = asyncio.ensure_future(self._read_replies(self.server))
+        logger.info(f"Fork server for {self.script} ready (pid {self.server.pid})")
+
+    async def stop(self):
+        """Stop the template process; already forked children are left to their owners"""
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+        if self.server is not None:
+            try:
+                await asyncio.wait_for(self.server.wait(), 5)
+            except asyncio.TimeoutError:
+                self.server.kill()
+                await self.server.wait()
+            self.server = None
+        if self._replies is not None:
+            await self._replies
+            self._replies = None
+
+    async def retire(self):
+        """Stop the template once every child forked from it has exited"""
+        await asyncio.gather(*(process.wait() for process in list(self._processes.values())))
+        await self.stop()
+
+    async def spawn(self):
+        """Fork a new ready-to-serve child from the template"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.server is None or self.server.returncode is not None:
+                await self.start()
+            stdin_r, stdin_w = os.pipe()
+            stdout_r, stdout_w = os.pipe()
+            stderr_r, stderr_w = os.pipe()
+            try:
+                socket.send_fds(self._control, [b'fork'], [stdin_r, stdout_w, stderr_w])
+            finally:
+                for fd in (stdin_r, stdout_w, stderr_w):
+                    os.close(fd)
+            pid = await self._pids.get()
+        if pid is None:
+            for fd in (stdin_w, stdout_r, stderr_r):
+                os.close(fd)
+            raise RuntimeError(f"Fork server for {self.script} exited")
+
+        process = ForkedProcess(pid)
+        await process._connect(stdin_w, stdout_r, stderr_r)
+        if pid in self._early_exits:
+            process._exited(self._early_exits.pop(pid))
+        else:
+            self._processes[pid] = process
+        return process
+
+    async def _read_replies(self, server):
+        while True:
+            line = await server.stdout.readline()
+            if not line:
+                break
+            kind, *values = line.decode('ascii').split()
+            if kind == 'pid':
+                self._pids.put_nowait(int(values[0]))
+            elif kind == 'exit':
+                pid, returncode = int(values[0]), int(values[1])
+                process = self._processes.pop(pid, None)
+                if process is not None:
+                    process._exited(returncode)
+                else:
+                    self._early_exits[pid] = returncode
+
+        # Without the template nobody reaps the forked children; stop them here
+        logger.warning(f"Fork server for {self.script} exited")
+        self._pids.put_nowait(None)
+        for pid, process in list(self._processes.items()):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process._exited(-signal.SIGKILL)
+        self._processes.clear()
+
+
+def find_server(namespace):
+    """Return the FastMCP instance defined by the script"""
+    from mcp.server.fastmcp import FastMCP
+    for value in namespace.values():
+        if isinstance(value, FastMCP):
+            return value
+    raise RuntimeError("No FastMCP instance found in the MCP script")
+
+
+def preload(namespace):
+    """Import tool modules the script defers, so every fork starts with them loaded"""
+    try:
+        from tools.lazy import LazyTools
+    except ImportError:
+        return
+    for value in namespace.values():
+        if isinstance(value, LazyTools):
+            value.load_all()
+
+
+def serve(script, control_fd):
+    """Template process main loop"""
+    # Replies go to the original stdout; anything the script prints goes to stderr
+    reply = os.fdopen(os.dup(1), 'w', buffering=1)
+    os.dup2(2, 1)
+    control = socket.socket(fileno=control_fd)
+
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    namespace = runpy.run_path(script, run_name='__mcp_template__')
+    server = find_server(namespace)
+    preload(namespace)
+
+    reply_lock = threading.Lock()
+    forked = threading.Event()
+
+    def write_reply(line):
+        with reply_lock:
+            reply.write(line + '\n')
+
+    def reap():
+        while True:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                forked.wait()
+                forked.clear()
+                continue
+            write_reply(f"exit {pid} {os.waitstatus_to_exitcode(status)}")
+
+    threading.Thread(target=reap, daemon=True).start()
+    write_reply('ready')
+
+    while True:
+        message, fds, _, _ = socket.recv_fds(control, 16, 3)
+        if not message:
+            break  # The pipe has gone away
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                control.close()
+                os.close(reply.fileno())
+                for target, fd in enumerate(fds):
+                    os.dup2(fd, target)
+                    os.close(fd)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                server.run(transport='stdio')
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                finally:
+                    os._exit(code)
+        for fd in fds:
+            os.close(fd)
+        write_reply(f"pid {pid}")
+        forked.set()
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1], int(sys.argv[2]))
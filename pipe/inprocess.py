@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+In-process transport: serve the MCP script's FastMCP instance inside mcp_pipe.
+
+Instead of writing JSON lines to a child's stdin and parsing its stdout, messages
+are validated straight from the router's dicts into `JSONRPCMessage` objects and
+handed to the FastMCP server through in-memory streams; responses come back as
+dicts. No subprocess, no stdio pipes and no extra JSON encode/decode round trip.
+
+The server runs on its own thread and event loop, because FastMCP calls sync
+tools directly on its loop and a slow tool must not stall the WebSocket side.
+`InProcessChild` offers the same interface as `MCPChild`, so the router treats
+both alike. A crashing tool can take the whole pipe down with it; use the
+subprocess transport when isolation matters.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import runpy
+import sys
+import threading
+
+import anyio
+from mcp import types
+from mcp.shared.message import SessionMessage
+
+from pipe.child import DEFAULT_HANDSHAKE, HANDSHAKE_TIMEOUT, INITIALIZED, INTERNAL_ID_PREFIX
+from pipe.forkserver import find_server
+
+logger = logging.getLogger('MCP_PIPE')
+
+INBOX_SIZE = 64  # Messages buffered towards the server before senders wait
+
+
+def load_server(script):
+    """Run `script` without its `__main__` block and return its FastMCP instance"""
+    script_dir = os.path.dirname(os.path.abspath(script))
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    return find_server(runpy.run_path(script, run_name='__mcp_inprocess__'))
+
+
+class InProcessChild:
+    """The MCP script's FastMCP server, run on a thread of the pipe process"""
+
+    def __init__(self, script, name=None):
+        self.script = script
+        self.name = name or f"{script} (in-process)"
+        self.ready = asyncio.Event()
+        self.restarts = 0
+        self._listener = None
+        self._handshake = DEFAULT_HANDSHAKE
+        self._internal_ids = itertools.count(1)
+        self._internal_pending = {}
+        self._loop = None
+        self._server_loop = None
+        self._inbox = None
+        self._inbox_lock = None
+        self._thread = None
+        self._stopped = None
+
+    async def start(self):
+        """Import the script, start the server thread and run the `initialize` handshake"""
+        self._loop = asyncio.get_running_loop()
+        server = await self._loop.run_in_executor(None, load_server, self.script)
+        started = self._loop.create_future()
+        self._stopped = self._loop.create_future()
+        self._thread = threading.Thread(
+            target=self._serve, args=(server, started), name='mcp-inprocess', daemon=True)
+        self._thread.start()
+        await started
+        logger.info(f"Serving {self.name}")
+        response = await self._initialize(self._handshake, HANDSHAKE_TIMEOUT)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        self.ready.set()
+
+    async def stop(self):
+        """Close the server's input stream and wait for its thread to finish"""
+        self.ready.clear()
+        if self._inbox is not None and self._server_loop is not None:
+            try:
+                self._server_loop.call_soon_threadsafe(self._inbox.close)
+            except RuntimeError:
+                pass  # The server loop has already finished
+            try:
+                await asyncio.wait_for(asyncio.shield(self._stopped), 5)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.name} did not stop within 5 seconds")
+        logger.info(f"{self.name} stopped")
+
+    def attach(self, listener, exit_listener=None):
+        """Forward every message from the server to the coroutine function `listener`.
+
+        The server thread is not restarted, so `exit_listener` is accepted only for
+        compatibility with `MCPChild`.
+        """
+        self._listener = listener
+
+    def detach(self, listener):
+        if self._listener is listener:
+            self._listener = None
+
+    def stats(self):
+        return {"ready": self.ready.is_set(), "restarts": self.restarts}
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        return "in-process, ready" if self.ready.is_set() else "in-process, stopped"
+
+    async def send(self, message):
+        """Send one JSON-RPC message given as a JSON string"""
+        await self._submit(types.JSONRPCMessage.model_validate_json(message))
+
+    async def send_message(self, msg):
+        """Send one JSON-RPC message given as a dict, without re-encoding it"""
+        await self._submit(types.JSONRPCMessage.model_validate(msg))
+
+    async def initialize(self, params, timeout=HANDSHAKE_TIMEOUT):
+        """Run the MCP `initialize` handshake with `params` and return the server's response"""
+        self._handshake = params
+        await self.ready.wait()
+        return await self._initialize(params, timeout)
+
+    async def _initialize(self, params, timeout):
+        request_id = f"{INTERNAL_ID_PREFIX}{next(self._internal_ids)}"
+        future = self._loop.create_future()
+        self._internal_pending[request_id] = future
+        try:
+            # Both messages are queued back to back, so no other request gets in between
+            await self._submit(
+                types.JSONRPCMessage.model_validate(
+                    {"jsonrpc": "2.0", "id": request_id, "method": "initialize", "params": params}),
+                types.JSONRPCMessage.model_validate(INITIALIZED))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._internal_pending.pop(request_id, None)
+
+    async def _submit(self, *messages):
+        """Hand messages to the server loop, waiting while its inbox is full"""
+        async def put():
+            # The lock keeps messages submitted together adjacent in the inbox
+            async with self._inbox_lock:
+                for message in messages:
+                    await self._inbox.send(SessionMessage(message))
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(put(), self._server_loop))
+
+    async def _deliver(self, msg):
+        """Runs on the pipe loop: route one message produced by the server"""
+        future = self._internal_pending.get(msg.get('id')) if self._internal_pending else None
+        if future is not None:
+            if not future.done():
+                future.set_result(msg)
+            return
+        listener = self._listener
+        if listener is None:
+            logger.debug(f"No listener attached, dropping message {msg.get('id')!r}")
+            return
+        try:
+            await listener(msg)
+        except Exception as e:
+            logger.error(f"Error in in-process server to WebSocket pipe: {e}")
+
+    def _serve(self, server, started):
+        try:
+            anyio.run(self._serve_async, server, started)
+        except BaseException as e:
+            logger.error(f"{self.name} stopped with an error: {e}")
+        finally:
+            try:
+                self._loop.call_soon_threadsafe(self._set_stopped)
+            except RuntimeError:
+                pass  # The pipe loop is already closed
+
+    def _set_stopped(self):
+        self.ready.clear()
+        if not self._stopped.done():
+            self._stopped.set_result(None)
+
+    async def _serve_async(self, server, started):
+        inbox, read_stream = anyio.create_memory_object_stream(INBOX_SIZE)
+        write_stream, outbox = anyio.create_memory_object_stream(0)
+        self._inbox = inbox
+        self._inbox_lock = asyncio.Lock()
+        self._server_loop = asyncio.get_running_loop()
+        self._loop.call_soon_threadsafe(started.set_result, None)
+
+        async def forward_output():
+            async with outbox:
+                async for session_message in outbox:
+                    msg = session_message.message.model_dump(by_alias=True, mode='json', exclude_none=True)
+                    # Waiting for delivery keeps a slow WebSocket's backpressure on the server
+                    await asyncio.wrap_future(
+                        asyncio.run_coroutine_threadsafe(self._deliver(msg), self._loop))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(forward_output)
+            # Closing the write side once the session ends lets forward_output finish
+            async with write_stream:
+                await server._mcp_server.run(
+                    read_stream,
+                    write_stream,
+                    server._mcp_server.create_initialization_options()
+                )
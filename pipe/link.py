@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Dead-connection detection for the endpoint WebSocket.
+
+A half-open TCP connection (NAT timeout, Wi-Fi roaming, a proxy that stopped
+forwarding) raises nothing on `recv()`; it just goes quiet until the kernel
+gives up, which can take many minutes. `LinkMonitor` pings the endpoint every
+`interval` seconds and aborts the connection when the pong does not arrive
+within `timeout`, so the reconnect loop can take over.
+
+A WebSocket pong only shows that the peer's WebSocket layer is alive. With
+`probe` a JSON-RPC `ping` request is sent as well and must be answered too,
+which also catches an endpoint whose application has stopped handling
+messages. Any response counts, including an error, but an endpoint that
+ignores the request entirely will be disconnected, so the probe is opt-in.
+
+The monitor also records how long a dead link stayed silent before it was
+noticed (time to detect) and how long it took from losing a connection to the
+next successful handshake (time to reconnect).
+"""
+
+import asyncio
+import itertools
+import time
+
+from pipe.child import dumps
+from tools.histogram import Histogram
+
+KEEPALIVE_INTERVAL = 10  # Seconds between keepalive pings to the endpoint
+KEEPALIVE_TIMEOUT = 10  # Seconds to wait for the answer before the link counts as dead
+PROBE_ID_PREFIX = 'mcp_pipe-probe-'  # Ids of the pipe's JSON-RPC liveness probes
+
+
+class DeadConnection(Exception):
+    """The endpoint stopped answering keepalive pings"""
+
+
+class LinkMonitor:
+    """Keepalive, liveness probes and connection timing for one endpoint"""
+
+    def __init__(self, interval=KEEPALIVE_INTERVAL, timeout=KEEPALIVE_TIMEOUT, probe=False):
+        self.interval = interval
+        self.timeout = timeout
+        self.probe = probe
+        self.connects = 0
+        self.disconnects = 0
+        self.dead = 0  # Connections aborted because the keepalive went unanswered
+        self.rtt = Histogram()
+        self.detect = Histogram()
+        self.reconnect = Histogram()
+        self.last_rtt = None
+        self.last_detect = None
+        self.last_reconnect = None
+        self.last_seen = time.monotonic()
+        self._lost_at = None
+        self._ids = itertools.count(1)
+        self._probes = {}  # probe id -> future
+
+    def seen(self):
+        """Note that something arrived from the endpoint"""
+        self.last_seen = time.monotonic()
+
+    def connected(self):
+        now = time.monotonic()
+        self.connects += 1
+        self.last_seen = now
+        if self._lost_at is not None:
+            self.last_reconnect = now - self._lost_at
+            self.reconnect.record(self.last_reconnect)
+            self._lost_at = None
+
+    def disconnected(self):
+        self.disconnects += 1
+        self._lost_at = time.monotonic()
+        for future in self._probes.values():
+            future.cancel()
+
+    def resolve(self, msg):
+        """Complete a pending liveness probe; returns True if `msg` was its response"""
+        future = self._probes.get(msg.get('id'))
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(msg)
+        return True
+
+    async def run(self, websocket):
+        """Ping `websocket` until it stops answering, then abort it and raise `DeadConnection`"""
+        if self.interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            started = loop.time()
+            try:
+                # The ping itself is covered too: on a dead link the write buffer may never drain
+                await asyncio.wait_for(self._ping(websocket), self.timeout)
+            except asyncio.TimeoutError:
+                self.dead += 1
+                self.last_detect = time.monotonic() - self.last_seen
+                self.detect.record(self.last_detect)
+                # A close handshake would wait for the dead peer as well
+                websocket.transport.abort()
+                raise DeadConnection(f"no answer to keepalive within {self.timeout} seconds, "
+                                     f"silent for {self.last_detect:.1f} seconds") from None
+            self.last_rtt = loop.time() - started
+            self.rtt.record(self.last_rtt)
+            self.seen()
+
+    async def _ping(self, websocket):
+        pong = await websocket.ping()
+        if not self.probe:
+            await pong
+            return
+        request_id = f"{PROBE_ID_PREFIX}{next(self._ids)}"
+        answer = self._probes[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            await websocket.send(dumps({"jsonrpc": "2.0", "id": request_id, "method": "ping"}))
+            await asyncio.gather(pong, answer)
+        finally:
+            self._probes.pop(request_id, None)
+
+    def stats(self):
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "dead": self.dead,
+            "rtt_ms": {"last": ms(self.last_rtt), "p50": self.rtt.percentile(50) / 1000,
+                       "p99": self.rtt.percentile(99) / 1000},
+            "detect_ms": {"last": ms(self.last_detect), "max": self.detect.max / 1000},
+            "reconnect_ms": {"last": ms(self.last_reconnect), "p50": self.reconnect.percentile(50) / 1000,
+                             "max": self.reconnect.max / 1000},
+        }
+
+    def summary(self):
+        """One-line summary for the stats log"""
+        text = f"connects {self.connects}, disconnects {self.disconnects}, dead {self.dead}"
+        if self.rtt.count:
+            text += f", keepalive RTT last {self.last_rtt * 1000:.1f} ms, p99 {self.rtt.percentile(99) / 1000:.1f} ms"
+        if self.detect.count:
+            text += f", detected dead after {self.last_detect:.1f} s (max {self.detect.max / 1e6:.1f} s)"
+        if self.reconnect.count:
+            text += f", reconnected after {self.last_reconnect:.1f} s (max {self.reconnect.max / 1e6:.1f} s)"
+        return text
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Watch the MCP scripts and their tool modules for changes.
+
+The files are polled by modification time and size, which needs no extra
+dependency and costs a few `stat()` calls per second for the handful of files
+in `tools/`. Editors often save in several steps (write a temporary file,
+rename, touch), so a change is only reported once the files have stopped
+changing for `settle` seconds.
+"""
+
+import asyncio
+import glob
+import logging
+import os
+
+logger = logging.getLogger('MCP_PIPE')
+
+WATCH_INTERVAL = 1  # Seconds between polls
+SETTLE_TIME = 0.5  # Seconds the files must stay unchanged before a reload
+
+
+def watched_files(scripts):
+    """The MCP scripts and the `tools/*.py` modules next to them"""
+    paths = set()
+    for script in scripts:
+        script = os.path.abspath(script)
+        paths.add(script)
+        paths.update(glob.glob(os.path.join(os.path.dirname(script), 'tools', '*.py')))
+    return paths
+
+
+def scan(scripts):
+    """Map every watched file to its modification time and size"""
+    state = {}
+    for path in watched_files(scripts):
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue  # Removed between the glob and the stat
+        state[path] = (info.st_mtime_ns, info.st_size)
+    return state
+
+
+async def watch(scripts, on_change, interval=WATCH_INTERVAL, settle=SETTLE_TIME):
+    """Await `on_change(paths)` with the changed files whenever a watched file is added, modified or removed"""
+    last = scan(scripts)
+    logger.info(f"Watching {len(last)} file(s) for changes")
+    while True:
+        await asyncio.sleep(interval)
+        current = scan(scripts)
+        if current == last:
+            continue
+        while True:
+            await asyncio.sleep(settle)
+            latest = scan(scripts)
+            if latest == current:
+                break
+            current = latest
+        changed = sorted(path for path in last.keys() | current.keys() if last.get(path) != current.get(path))
+        last = current
+        try:
+            await on_change(changed)
+        except Exception as e:
+            logger.error(f"Reload failed: {e}")
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+JSON-RPC router between endpoint sessions and a pool of MCP child processes.
+
+Every WebSocket connection is a `Session`. Requests from a session are given a
+pipe-wide unique id before they are written to a child, and the child's response
+is mapped back to the originating session and its original id, so several
+endpoints can share the same children without their ids colliding.
+
+The tool set of a running child does not change, so `initialize` and the list
+requests (`tools/list` and friends) are answered from a cache after the first
+time, with the requesting session's id. The cache is dropped when a child exits
+and per method when a child sends the matching `list_changed` notification.
+
+Children may run different scripts, e.g. one per subsystem (browser, vision,
+lightweight tools). List requests are then sent to every script and the results
+merged into one catalogue, and each `tools/call` goes to the script that
+registered the tool. Other requests go to the first script.
+
+`reload()` switches every child to a freshly started process, e.g. after the
+tool modules were edited, without dropping the connection: requests already
+sent to an old process are answered by it before it is terminated, and the
+sessions are told to fetch the tool list again.
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import time
+
+from pipe.child import HANDSHAKE_TIMEOUT, dumps
+from pipe.stats import LatencyStats, request_name
+
+logger = logging.getLogger('MCP_PIPE')
+
+DRAIN_TIMEOUT = 60  # Seconds a replaced process may take to answer its pending requests
+DRAIN_POLL = 0.05  # Seconds between checks whether a replaced process has drained
+
+
+# Cacheable list requests and the notifications that invalidate them
+CACHED_LISTS = {
+    'tools/list': 'notifications/tools/list_changed',
+    'prompts/list': 'notifications/prompts/list_changed',
+    'resources/list': 'notifications/resources/list_changed',
+    'resources/templates/list': 'notifications/resources/list_changed',
+}
+
+
+# Field holding the items of each list result, used to merge them across scripts
+LIST_FIELDS = {
+    'tools/list': 'tools',
+    'prompts/list': 'prompts',
+    'resources/list': 'resources',
+    'resources/templates/list': 'resourceTemplates',
+}
+
+
+def error_response(request_id, code, message):
+    """Build a JSON-RPC error response"""
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class Session:
+    """One endpoint connection multiplexed over the router.
+
+    `send(data, droppable)` forwards one JSON string to the endpoint; notifications
+    are passed with `droppable=True` and may be dropped when the endpoint is behind.
+    Responses that arrive after the session has closed are handed to `spool(data)`,
+    if given, so the endpoint can still receive them once it reconnects.
+    """
+
+    def __init__(self, router, name, send, spool=None):
+        self.router = router
+        self.name = name
+        self.send = send
+        self.spool = spool
+        self.closed = False
+
+    async def handle(self, message, received=None):
+        """Route one message received from the endpoint at `received` (perf_counter time)"""
+        await self.router.from_session(self, message, received)
+
+
+class PendingRequest:
+    """A session request forwarded to a child, awaiting its response"""
+
+    __slots__ = ('session', 'original_id', 'child', 'token', 'stats', 'received', 'sent', 'cache_key')
+
+    def __init__(self, session, original_id, child, token, stats, received, sent, cache_key=None):
+        self.session = session
+        self.original_id = original_id
+        self.child = child
+        self.token = token  # Progress token, if the request asked for progress notifications
+        self.stats = stats  # `ToolStats` the latency is recorded in
+        self.received = received
+        self.sent = sent
+        self.cache_key = cache_key  # Where to cache the response, for cacheable requests
+
+
+def cache_key(method, params):
+    """Cache key of a request; `_meta` (progress tokens) and `clientInfo` do not change the answer"""
+    params = {k: v for k, v in (params or {}).items() if k not in ('_meta', 'clientInfo')}
+    return method, json.dumps(params, sort_keys=True)
+
+
+class Router:
+    """Multiplex endpoint sessions over a pool of `MCPChild` processes"""
+
+    def __init__(self, children):
+        self.children = children
+        self.groups = {}  # script -> children running it, in order of appearance
+        for child in children:
+            self.groups.setdefault(child.script, []).append(child)
+        self._tool_owner = {}  # tool name -> script that registered it
+        self.sessions = []
+        self._ids = itertools.count(1)
+        self._pending = {}  # upstream id -> PendingRequest
+        self._server_requests = {}  # upstream id -> (child, child's request id)
+        self._progress = {}  # progress token -> session
+        self._inflight = {child: 0 for child in children}
+        self._last_session = {}  # child -> session that most recently sent it a request
+        self.latency = LatencyStats()
+        self._cache = {}  # cache key -> response without its id
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._reload_lock = asyncio.Lock()
+
+    async def start(self):
+        """Start all children and route their output through the router"""
+        for child in self.children:
+            child.attach(functools.partial(self._from_child, child), functools.partial(self._child_exited, child))
+        await asyncio.gather(*(child.start() for child in self.children))
+
+    async def stop(self):
+        await asyncio.gather(*(child.stop() for child in self.children))
+
+    async def reload(self, drain_timeout=DRAIN_TIMEOUT):
+        """Switch every child to a new process and retire the old ones once drained.
+
+        A child whose new process fails to start keeps its current one. Returns
+        True if at least one child was switched.
+        """
+        async with self._reload_lock:
+            results = await asyncio.gather(*(child.reload() for child in self.children), return_exceptions=True)
+            switched_at = time.perf_counter()
+            retired = []
+            for child, old in zip(self.children, results):
+                if isinstance(old, BaseException):
+                    logger.error(f"Reloading {child.name} failed, keeping the running process: {old}")
+                elif old is not None:
+                    retired.append((child, old))
+            if not retired:
+                return False
+            self.invalidate()
+            await self._broadcast({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+            await asyncio.gather(*(self._retire(child, old, switched_at, drain_timeout) for child, old in retired))
+            return True
+
+    async def _retire(self, child, process, switched_at, timeout):
+        """Wait until `process` has answered the requests sent before the switch, then stop it"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        def draining():
+            return [upstream_id for upstream_id, pending in self._pending.items()
+                    if pending.child is child and pending.sent <= switched_at]
+
+        while draining() and process.returncode is None and loop.time() < deadline:
+            await asyncio.sleep(DRAIN_POLL)
+        await child.retire(process)
+        lost = draining()
+        if lost:
+            await self._abort(child, lost, f"{child.name} was reloaded")
+
+    def open_session(self, name, send, spool=None):
+        session = Session(self, name, send, spool)
+        self.sessions.append(session)
+        return session
+
+    def close_session(self, session):
+        """Detach `session`; responses still owed to it are spooled or dropped when they arrive"""
+        session.closed = True
+        if session in self.sessions:
+            self.sessions.remove(session)
+        for token in [t for t, s in self._progress.items() if s is session]:
+            del self._progress[token]
+
+    def _pick_child(self, script=None):
+        """Pick the ready child of `script` (default: the first script) with the fewest requests in flight"""
+        children = self.groups[script if script is not None else self.children[0].script]
+        ready = [child for child in children if child.ready.is_set()] or children
+        return min(ready, key=self._inflight.__getitem__)
+
+    async def from_session(self, session, message, received=None):
+        """Route one message from `session`, given as a JSON string or an already parsed dict"""
+        if isinstance(message, str):
+            try:
+                msg = json.loads(message)
+            except ValueError:
+                logger.warning(f"[{session.name}] Dropping malformed message: {message[:120]}")
+                return
+        else:
+            msg = message
+        if not isinstance(msg, dict):
+            logger.warning(f"[{session.name}] JSON-RPC batches are not supported, dropping message")
+            return
+
+        method = msg.get('method')
+        if method is None:
+            await self._response_to_child(msg)
+        elif 'id' not in msg:
+            await self._notification_to_children(session, msg)
+        elif method == 'initialize':
+            await self._initialize(session, msg)
+        elif method in CACHED_LISTS:
+            key = cache_key(method, msg.get('params'))
+            if await self._answer_from_cache(session, msg, key):
+                pass
+            elif len(self.groups) > 1:
+                await self._merge_list(session, msg, key)
+            else:
+                await self._request_to_child(session, msg, received or time.perf_counter(), key)
+        elif method == 'tools/call' and len(self.groups) > 1:
+            name = (msg.get('params') or {}).get('name')
+            script = self._tool_owner.get(name)
+            if script is None and name is not None:
+                await self._merged_list('tools/list', {})
+                script = self._tool_owner.get(name)
+            await self._request_to_child(session, msg, received or time.perf_counter(), script=script)
+        else:
+            await self._request_to_child(session, msg, received or time.perf_counter())
+
+    async def _answer_from_cache(self, session, msg, key):
+        cached = self._cache.get(key)
+        if cached is None:
+            self.cache_misses += 1
+            return False
+        self.cache_hits += 1
+        await self._deliver(session, dict(cached, id=msg['id']))
+        return True
+
+    def _store(self, key, response):
+        if 'result' in response:
+            self._cache[key] = {k: v for k, v in response.items() if k != 'id'}
+
+    def invalidate(self, method=None):
+        """Drop cached responses, for one method or all of them"""
+        for key in [key for key in self._cache if method is None or key[0] == method]:
+            del self._cache[key]
+        if method in (None, 'tools/list'):
+            self._tool_owner.clear()
+
+    def cache_stats(self):
+        return {"entries": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses}
+
+    async def _list_script(self, script, method, params):
+        """Send a list request owned by the pipe to one child running `script`"""
+        child = self._pick_child(script)
+        await asyncio.wait_for(child.ready.wait(), HANDSHAKE_TIMEOUT)
+        response = await child.request(child.process, method, params, HANDSHAKE_TIMEOUT)
+        if 'result' not in response:
+            raise RuntimeError(response.get('error'))
+        return response['result']
+
+    async def _merged_list(self, method, params):
+        """Ask every script for `method` and merge the results.
+
+        Returns the merged result (None if no script answered) and whether every
+        script answered. Tool owners are recorded along the way.
+        """
+        field = LIST_FIELDS[method]
+        params = {k: v for k, v in (params or {}).items() if k != 'cursor'}
+        scripts = list(self.groups)
+        results = await asyncio.gather(
+            *(self._list_script(script, method, params) for script in scripts), return_exceptions=True)
+        merged = None
+        complete = True
+        seen = set()
+        for script, result in zip(scripts, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"{script} did not answer {method}: {result}")
+                complete = False
+                continue
+            if merged is None:
+                merged = {k: v for k, v in result.items() if k != 'nextCursor'}
+                merged[field] = []
+            for item in result.get(field) or []:
+                name = item.get('name') or item.get('uri') or item.get('uriTemplate')
+                if name in seen:
+                    logger.warning(f"{script} also provides {name!r}, keeping the first one")
+                    continue
+                seen.add(name)
+                merged[field].append(item)
+                if method == 'tools/list':
+                    self._tool_owner[name] = script
+        return merged, complete
+
+    async def _merge_list(self, session, msg, key):
+        """Answer a list request with the merged catalogue of all scripts"""
+        merged, complete = await self._merged_list(msg['method'], msg.get('params'))
+        if merged is None:
+            response = error_response(msg['id'], -32603, f"No MCP server answered {msg['method']}")
+        else:
+            response = {"jsonrpc": "2.0", "id": msg['id'], "result": merged}
+            if complete:
+                self._store(key, response)
+        await self._deliver(session, response)
+
+    async def _request_to_child(self, session, msg, received, key=None, script=None):
+        child = self._pick_child(script)
+        upstream_id = next(self._ids)
+        meta = (msg.get('params') or {}).get('_meta') or {}
+        token = meta.get('progressToken')
+        if token is not None:
+            self._progress[token] = session
+        stats = self.latency.start(request_name(msg))
+        self._pending[upstream_id] = PendingRequest(
+            session, msg['id'], child, token, stats, received, time.perf_counter(), key)
+        self._inflight[child] += 1
+        self._last_session[child] = session
+        msg['id'] = upstream_id
+        await child.send_message(msg)
+
+    async def _initialize(self, session, msg):
+        """Answer a session's `initialize` by (re)initializing every child.
+
+        The children pair it with `notifications/initialized` themselves, so the
+        session's own `initialized` notification is not forwarded. A repeated
+        handshake with the same protocol version and capabilities is answered from
+        the cache without touching the children.
+        """
+        params = msg.get('params') or {}
+        key = cache_key('initialize', params)
+        if await self._answer_from_cache(session, msg, key):
+            return
+        try:
+            responses = await asyncio.gather(*(child.initialize(params) for child in self.children))
+            response = responses[0]
+        except Exception as e:
+            logger.error(f"[{session.name}] Initialize handshake failed: {e}")
+            response = error_response(None, -32603, f"Initialize failed: {e}")
+        else:
+            # Another handshake may have changed the children's state meanwhile; keep only this one
+            self.invalidate('initialize')
+            self._store(key, response)
+        response['id'] = msg['id']
+        await self._deliver(session, response)
+
+    async def _notification_to_children(self, session, msg):
+        method = msg['method']
+        if method == 'notifications/initialized':
+            return  # Already sent by the children's handshake
+        if method == 'notifications/cancelled':
+            params = msg.get('params') or {}
+            for upstream_id, pending in self._pending.items():
+                if pending.session is session and pending.original_id == params.get('requestId'):
+                    params['requestId'] = upstream_id
+                    await pending.child.send_message(msg)
+                    break
+            return
+        for child in self.children:
+            await child.send_message(msg)
+
+    async def _response_to_child(self, msg):
+        entry = self._server_requests.pop(msg.get('id'), None)
+        if entry is None:
+            logger.debug(f"Dropping response to unknown request {msg.get('id')!r}")
+            return
+        child, child_id = entry
+        msg['id'] = child_id
+        await child.send_message(msg)
+
+    async def _from_child(self, child, line):
+        """Route one message from a child; in-process children hand over parsed dicts"""
+        if isinstance(line, dict):
+            msg = line
+        else:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                logger.warning(f"{child.name} wrote a non JSON-RPC line: {line[:120]}")
+                return
+
+        if 'method' not in msg:
+            # Response to a session request
+            pending = self._pending.pop(msg.get('id'), None)
+            if pending is None:
+                logger.debug(f"Dropping response to unknown request {msg.get('id')!r}")
+                return
+            self._inflight[child] -= 1
+            self.latency.finish(pending.stats, pending.received, pending.sent)
+            if pending.token is not None:
+                self._progress.pop(pending.token, None)
+            if pending.cache_key is not None:
+                self._store(pending.cache_key, msg)
+            msg['id'] = pending.original_id
+            await self._deliver(pending.session, msg)
+        elif 'id' in msg:
+            # Request issued by the server, e.g. sampling or roots
+            session = self._last_session.get(child)
+            if session is None or session.closed:
+                session = self.sessions[-1] if self.sessions else None
+            if session is None:
+                logger.debug(f"No session for {msg['method']} request from {child.name}")
+                return
+            upstream_id = next(self._ids)
+            self._server_requests[upstream_id] = (child, msg['id'])
+            msg['id'] = upstream_id
+            await self._deliver(session, msg)
+        else:
+            for method, notification in CACHED_LISTS.items():
+                if msg['method'] == notification:
+                    self.invalidate(method)
+            token = (msg.get('params') or {}).get('progressToken')
+            session = self._progress.get(token) if token is not None else None
+            if session is not None:
+                await self._deliver(session, msg)
+            else:
+                await self._broadcast(msg)
+
+    async def _child_exited(self, child, reason):
+        """Answer the requests `child` will never answer with an error"""
+        # The restarted process may be a different version of the script
+        self.invalidate()
+        lost = [upstream_id for upstream_id, pending in self._pending.items() if pending.child is child]
+        await self._abort(child, lost, reason)
+        self._inflight[child] = 0
+        for upstream_id in [i for i, (owner, _) in self._server_requests.items() if owner is child]:
+            del self._server_requests[upstream_id]
+
+    async def _abort(self, child, upstream_ids, reason):
+        """Answer the pending requests `upstream_ids` of `child` with an error"""
+        for upstream_id in upstream_ids:
+            pending = self._pending.pop(upstream_id, None)
+            if pending is None:
+                continue  # Answered while earlier ones were being delivered
+            pending.stats.inflight -= 1
+            self._inflight[child] -= 1
+            if pending.token is not None:
+                self._progress.pop(pending.token, None)
+            await self._deliver(pending.session,
+                                error_response(pending.original_id, -32000, f"Request aborted: {reason}"))
+        if upstream_ids:
+            logger.warning(f"Failed {len(upstream_ids)} in-flight request(s): {reason}")
+
+    async def _deliver(self, session, msg):
+        if session.closed:
+            if session.spool is not None and 'method' not in msg:
+                logger.debug(f"[{session.name}] Session closed, spooling response {msg.get('id')!r}")
+                session.spool(dumps(msg))
+            else:
+                logger.debug(f"[{session.name}] Session closed, dropping message {msg.get('id')!r}")
+            return
+        await session.send(dumps(msg), 'id' not in msg)
+
+    async def _broadcast(self, msg):
+        data = dumps(msg)
+        for session in list(self.sessions):
+            try:
+                await session.send(data, True)
+            except Exception as e:
+                logger.error(f"[{session.name}] Failed to forward notification: {e}")
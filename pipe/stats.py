@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request latency tracking for mcp_pipe.
+
+The router stamps every request when it arrives from the endpoint and when it is
+written to a child, and looks the stamps up again by JSON-RPC id when the
+response comes back. Latencies are recorded per tool (`tools/call` by tool name,
+other requests by method) in HDR-style histograms (see `tools/histogram.py`).
+
+`total` is the time from receiving the request to queuing the response for the
+endpoint, `child` the time the child took to answer; the difference is time
+spent waiting in the pipe's own queues.
+"""
+
+import asyncio
+import json
+import time
+
+from tools.histogram import Histogram
+
+
+class ToolStats:
+    """Latency histograms and in-flight count for one tool or method"""
+
+    def __init__(self):
+        self.inflight = 0
+        self.total = Histogram()
+        self.child = Histogram()
+
+
+class LatencyStats:
+    """Latency statistics for every tool seen by the router"""
+
+    def __init__(self):
+        self.tools = {}
+
+    def start(self, name):
+        """Count a request for `name` as in flight and return its stats"""
+        stats = self.tools.get(name)
+        if stats is None:
+            stats = self.tools[name] = ToolStats()
+        stats.inflight += 1
+        return stats
+
+    @staticmethod
+    def finish(stats, received, sent):
+        """Record a response to a request received at `received` and written to a child at `sent`"""
+        now = time.perf_counter()
+        stats.inflight -= 1
+        stats.total.record(now - received)
+        stats.child.record(now - sent)
+
+    def snapshot(self):
+        """Statistics per tool with latencies in milliseconds"""
+        return {
+            name: {
+                "count": stats.total.count,
+                "in_flight": stats.inflight,
+                "mean": round(stats.total.total / stats.total.count / 1000, 3) if stats.total.count else 0,
+                "p50": stats.total.percentile(50) / 1000,
+                "p95": stats.total.percentile(95) / 1000,
+                "p99": stats.total.percentile(99) / 1000,
+                "max": stats.total.max / 1000,
+                "child_p50": stats.child.percentile(50) / 1000,
+                "child_p99": stats.child.percentile(99) / 1000,
+            }
+            for name, stats in sorted(self.tools.items())
+        }
+
+    def summary_lines(self):
+        """One line per tool for the stats log"""
+        return [
+            f"{name}: count {s['count']}, in flight {s['in_flight']}, "
+            f"p50 {s['p50']:.1f} ms, p95 {s['p95']:.1f} ms, p99 {s['p99']:.1f} ms, max {s['max']:.1f} ms "
+            f"(child p50 {s['child_p50']:.1f} ms, p99 {s['child_p99']:.1f} ms)"
+            for name, s in self.snapshot().items()
+        ]
+
+
+def request_name(msg):
+    """Name latencies are grouped by: the tool for `tools/call`, otherwise the method"""
+    method = msg['method']
+    if method == 'tools/call':
+        name = (msg.get('params') or {}).get('name')
+        if isinstance(name, str):
+            return name
+    return method
+
+
+async def serve_stats(host, port, collect):
+    """Serve `collect()` as JSON to any HTTP request on host:port"""
+    async def handle(reader, writer):
+        try:
+            # Only the request line and headers are read; every path returns the stats
+            while (await reader.readline()).strip():
+                pass
+            body = json.dumps(collect(), ensure_ascii=False, indent=2).encode('utf-8')
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=utf-8\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
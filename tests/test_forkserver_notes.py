@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Sticky notes written by one forked MCP child must be seen by the next one."""
+
+import asyncio
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="the fork server requires POSIX")
+pytest.importorskip("selenium")  # tools.note imports it
+
+SCRIPT = """
+import sys
+import threading
+sys.path.insert(0, {repo!r})
+from mcp.server.fastmcp import FastMCP
+from tools.note import _sticky_note_manager
+
+mcp = FastMCP("NotesForkTest")
+
+# Touch the store while the template imports the script, as a stateful import would
+_sticky_note_manager.notes
+
+
+@mcp.tool()
+def add(content: str) -> dict:
+    return _sticky_note_manager.add_note(content)
+
+
+@mcp.tool()
+def list_notes() -> dict:
+    result = _sticky_note_manager.list_all_notes()
+    result["journal_thread"] = any(thread.name == "sticky-notes-journal" for thread in threading.enumerate())
+    return result
+"""
+
+
+async def call(child, name, arguments=None):
+    response = await child.request(child.process, 'tools/call', {"name": name, "arguments": arguments or {}}, 30)
+    return json.loads(response["result"]["content"][0]["text"])
+
+
+async def fork_write_kill_fork_read(script):
+    from pipe.child import MCPChild
+    from pipe.forkserver import ForkServer
+
+    forkserver = ForkServer(script)
+    await forkserver.start()
+    child = MCPChild(script, name="notes", forkserver=forkserver)
+    try:
+        await child.start()
+        first = child.process
+        added = await call(child, "add", {"content": "written by the first child"})
+        os.kill(first.pid, signal.SIGKILL)
+        while child.process is first or not child.ready.is_set():
+            await asyncio.sleep(0.01)
+        listed = await call(child, "list_notes")
+        added_again = await call(child, "add", {"content": "written by the second child"})
+    finally:
+        await child.stop()
+        await forkserver.stop()
+    return added, listed, added_again
+
+
+def test_forked_children_share_notes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open("sticky_notes.json", 'w', encoding='utf-8') as f:
+        json.dump({"notes": [{"id": 1, "content": "before the template", "timestamp": "2025-01-01 00:00:00",
+                              "importance": "普通", "category": "未分类"}]}, f)
+    script = tmp_path / "notes_server.py"
+    script.write_text(SCRIPT.format(repo=REPO), encoding='utf-8')
+
+    added, listed, added_again = asyncio.run(fork_write_kill_fork_read(str(script)))
+
+    assert added["note"]["id"] == 2
+    assert [note["id"] for note in listed["notes"]] == [1, 2]
+    assert listed["journal_thread"]
+    assert added_again["note"]["id"] == 3
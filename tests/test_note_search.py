@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Both sticky note backends must find exactly what the old substring scan found."""
+
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from tools.note_store import JsonNoteStore, SqliteNoteStore  # noqa: E402
+
+NOTES = [
+    ("明天上午十点开会，准备会议纪要", "重要", "工作"),
+    ("会议纪要：讨论 ESP32 固件升级", "普通", "工作"),
+    ("下班买牛奶和面包", "普通", "生活"),
+    ("学ESP32，顺便复习 Python", "普通", "学习"),
+    ("Python 会议 python PYTHON", "重要", "学习"),
+    ("Éa ÉCOLE Straße", "普通", "其他"),
+    ("éa école strasse", "普通", "其他"),
+    ("ÄÖÜ Ωμέγα ΣΊΣΥΦΟΣ", "紧急", "其他"),
+    ("äöü ωμέγα σίσυφος", "普通", "其他"),
+    ("100% 完成 under_score", "普通", "未分类"),
+]
+
+KEYWORDS = [
+    "会议纪要",
+    "会议",
+    "开会",
+    "python",
+    "PYTHON",
+    "esp32",
+    "学E",
+    # Terms found in no note: one and two characters, and longer
+    "猫",
+    "学习",
+    "z",
+    "qx",
+    "不存在的词",
+    # Non-ASCII capitals, shorter and longer than a trigram
+    "É",
+    "Éa",
+    "ÉCOLE",
+    "Ä",
+    "ÄÖ",
+    "ΣΊ",
+    "ΩΜΈΓΑ",
+    "ß",
+    "%",
+    "_",
+    # Several terms, some of them missing
+    "会议 学习",
+    "学习 会议",
+    "会议纪要 ESP32",
+    "python 牛奶",
+    "Éa ÄÖ",
+    "猫 z",
+    "ÉCOLE 猫",
+]
+
+
+def scan(notes, keyword, match):
+    """The search before the index: `keyword.lower() in content.lower()` per term"""
+    if match == "phrase":
+        terms = [keyword.lower()]
+    else:
+        terms = keyword.lower().split()
+    combine = any if match == "any" else all
+    return [note["id"] for note in notes if combine(term in note["content"].lower() for term in terms)]
+
+
+@pytest.fixture(scope="module", params=["json", "sqlite"])
+def store(request, tmp_path_factory):
+    directory = tmp_path_factory.mktemp(request.param)
+    if request.param == "json":
+        store = JsonNoteStore(str(directory / "sticky_notes.json"))
+    else:
+        store = SqliteNoteStore(str(directory / "sticky_notes.db"))
+    for content, importance, category in NOTES:
+        store.add(content, "2025-01-01 00:00:00", importance, category)
+    # Exercise index maintenance as well as the initial build
+    store.update(3, {"content": "下班买牛奶、鸡蛋和面包"})
+    removed = store.add("临时会议 python", "2025-01-01 00:00:00", "普通", "工作")
+    store.delete(removed["id"])
+    yield store
+    store.close()
+
+
+@pytest.fixture(scope="module")
+def ranked(tmp_path_factory):
+    """BM25 results of both backends, to compare them with each other"""
+    directory = tmp_path_factory.mktemp("ranked")
+    stores = [JsonNoteStore(str(directory / "sticky_notes.json")), SqliteNoteStore(str(directory / "sticky_notes.db"))]
+    for store in stores:
+        for content, importance, category in NOTES:
+            store.add(content, "2025-01-01 00:00:00", importance, category)
+    yield stores
+    for store in stores:
+        store.close()
+
+
+@pytest.mark.parametrize("match", ["phrase", "all", "any"])
+@pytest.mark.parametrize("keyword", KEYWORDS)
+def test_search_matches_scan(store, keyword, match):
+    expected = scan(store.all(), keyword, match)
+    assert [note["id"] for note in store.search(keyword, match=match)] == expected
+
+
+@pytest.mark.parametrize("match", ["phrase", "all", "any"])
+@pytest.mark.parametrize("keyword", KEYWORDS)
+def test_top_k_ranks_scan_results(store, keyword, match):
+    expected = scan(store.all(), keyword, match)
+    found = [note["id"] for note in store.search(keyword, match=match, top_k=2)]
+    assert len(found) == min(2, len(expected))
+    assert set(found) <= set(expected)
+
+
+@pytest.mark.parametrize("match", ["phrase", "all", "any"])
+@pytest.mark.parametrize("keyword", KEYWORDS)
+def test_backends_rank_alike(ranked, keyword, match):
+    json_store, sqlite_store = ranked
+    assert [note["id"] for note in json_store.search(keyword, match=match, top_k=3)] \
+        == [note["id"] for note in sqlite_store.search(keyword, match=match, top_k=3)]
+
+
+@pytest.mark.parametrize("keyword,match", [("会议", "phrase"), ("python 牛奶", "any"), ("Éa", "phrase")])
+def test_search_with_field_filters(store, keyword, match):
+    notes = [note for note in store.all() if note["importance"] == "普通" and note["category"] == "工作"]
+    expected = scan(notes, keyword, match)
+    found = store.search(keyword, importance="普通", category="工作", match=match)
+    assert [note["id"] for note in found] == expected
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+A response owed to a dropped connection must reach the next one, even if it finishes after the reconnect,
+and responses spooled on a drop keep their order.
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+websockets = pytest.importorskip("websockets")
+
+SLOW_CALL = 2.5  # Seconds; the connection is dropped after DROP_AFTER and comes back about 1 s later
+DROP_AFTER = 0.3
+
+SCRIPT = """
+import time
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("SpoolTest")
+
+
+@mcp.tool()
+def slow() -> str:
+    time.sleep({delay})
+    return "done"
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
+"""
+
+
+async def late_response_after_reconnect(script):
+    from mcp_pipe import Endpoint
+    from pipe.child import MCPChild
+    from pipe.router import Router
+
+    connections = asyncio.Queue()
+    closed = asyncio.Event()
+
+    async def handler(websocket, path=None):
+        await connections.put(websocket)
+        await closed.wait()
+
+    async with websockets.serve(handler, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        router = Router([MCPChild(script, name="slow")])
+        await router.start()
+        endpoint = Endpoint(f"ws://127.0.0.1:{port}", router, "test", keepalive_interval=0)
+        pipe = asyncio.ensure_future(endpoint.connect_with_retry())
+        try:
+            first = await asyncio.wait_for(connections.get(), 30)
+            await first.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                         "params": {"name": "slow", "arguments": {}}}))
+            await asyncio.sleep(DROP_AFTER)
+            await first.close()
+
+            second = await asyncio.wait_for(connections.get(), 10)
+            reconnected = asyncio.get_running_loop().time()
+            response = json.loads(await asyncio.wait_for(second.recv(), SLOW_CALL + 5))
+            answered = asyncio.get_running_loop().time()
+        finally:
+            closed.set()
+            pipe.cancel()
+            await asyncio.gather(pipe, return_exceptions=True)
+            await router.stop()
+    return response, answered - reconnected
+
+
+def test_response_finishing_after_reconnect_is_delivered(tmp_path):
+    script = tmp_path / "slow_server.py"
+    script.write_text(SCRIPT.format(delay=SLOW_CALL), encoding='utf-8')
+
+    response, waited = asyncio.run(late_response_after_reconnect(str(script)))
+
+    assert response["id"] == 1
+    assert response["result"]["content"][0]["text"] == "done"
+    assert waited > 0.1  # The call really finished after the reconnect
+
+
+class StuckWebSocket:
+    """Accepts the first message, then hangs on sending until cancelled; `drop()` fails `recv()`"""
+
+    def __init__(self):
+        self.sent = []
+        self.dropped = asyncio.Event()
+
+    async def send(self, data):
+        if self.sent:
+            await asyncio.Event().wait()
+        self.sent.append(data)
+
+    async def recv(self):
+        await self.dropped.wait()
+        raise ConnectionError("connection dropped")
+
+    def drop(self):
+        self.dropped.set()
+
+
+async def drop_while_sending():
+    from mcp_pipe import Endpoint
+    from pipe.router import Router
+
+    endpoint = Endpoint("ws://unused", Router([]), "test", keepalive_interval=0)
+    websocket = StuckWebSocket()
+    serving = asyncio.ensure_future(endpoint.serve(websocket))
+    for i in range(1, 5):
+        await endpoint.enqueue(json.dumps({"jsonrpc": "2.0", "id": i, "result": {}}))
+    while len(endpoint.outbound) > 2:  # The sender holds message 2, 3 and 4 are queued
+        await asyncio.sleep(0.01)
+    websocket.drop()
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(serving, 5)
+    return websocket.sent, endpoint.spool.drain()
+
+
+def test_messages_held_by_a_cancelled_sender_are_spooled_first():
+    sent, spooled = asyncio.run(drop_while_sending())
+
+    assert [json.loads(data)["id"] for data in sent] == [1]
+    assert [json.loads(data)["id"] for data in spooled] == [2, 3, 4]
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Result caching for idempotent tools.
+
+A voice client often asks the same thing twice within a few seconds, and tools
+like `get_server_status` (which samples the CPU for a second) recompute every
+time. Decorate such a tool inside its `register_*` function, below
+`@mcp.tool()`:
+
+    @mcp.tool()
+    @cached(ttl=2)
+    def get_server_status() -> dict:
+
+Results are kept per argument set for `ttl` seconds, at most `maxsize` of them,
+least recently used first out. Failed results (`{"success": False}`) and
+exceptions are not cached. Cached results are shared between callers and must
+not be modified.
+
+A cache can carry tags; `invalidate(tag)` empties every cache with that tag,
+and `@invalidates(tag)` does so after each call of a tool that changes the
+underlying data (adding a note invalidates note searches), whether it succeeded
+or not, since a failed call may have changed the data halfway. A result
+computed while its tag was invalidated is not stored, so a slow call cannot put
+stale data back into the cache.
+"""
+
+import collections
+import functools
+import inspect
+import json
+import threading
+import time
+
+MAXSIZE = 128  # Default number of results kept per tool
+MISSING = object()
+
+_caches = []  # Every ToolCache, for stats() and invalidate()
+_generations = collections.Counter()  # tag -> number of invalidations
+_lock = threading.Lock()
+
+
+class ToolCache:
+    """TTL and LRU bounded results of one tool, keyed by its arguments"""
+
+    def __init__(self, name, ttl, maxsize=MAXSIZE, tags=()):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.tags = tuple(tags)
+        self.entries = collections.OrderedDict()  # key -> (expires, result)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """The cached result for `key`, or MISSING"""
+        with _lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.entries[key]
+            self.misses += 1
+            return MISSING
+
+    def generation(self):
+        return sum(_generations[tag] for tag in self.tags)
+
+    def put(self, key, result, generation):
+        """Store `result` unless one of the tags was invalidated since `generation` was taken"""
+        with _lock:
+            if self.generation() != generation:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "entries": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _make_key(signature, args, kwargs, key):
+    """Key of a call: its arguments with defaults filled in, so f() and f(x=default) share an entry"""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    if key is not None:
+        return key(**bound.arguments)
+    arguments = tuple(bound.arguments.items())
+    try:
+        hash(arguments)
+    except TypeError:
+        return json.dumps(bound.arguments, sort_keys=True, ensure_ascii=False, default=repr)
+    return arguments
+
+
+def _cacheable(result):
+    return not (isinstance(result, dict) and result.get('success') is False)
+
+
+def cached(ttl, maxsize=MAXSIZE, tags=(), key=None):
+    """Cache the results of a tool for `ttl` seconds.
+
+    `key(**arguments)` may replace the default key, e.g. to ignore the case of
+    a search keyword; it receives the arguments with defaults filled in.
+    """
+    def decorator(fn):
+        cache = ToolCache(fn.__name__, ttl, maxsize, tags)
+        signature = inspect.signature(fn)
+        with _lock:
+            _caches.append(cache)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def tool(*args, **kwargs):
+                cache_key = _make_key(signature, args, kwargs, key)
+                generation = cache.generation()
+                result = cache.get(cache_key)
+                if result is MISSING:
+                    result = await fn(*args, **kwargs)
+                    if _cacheable(result):
+                        cache.put(cache_key, result, generation)
+                return result
+        else:
+            @functools.wraps(fn)
+            def tool(*args, **kwargs):
+                cache_key = _make_key(signature, args, kwargs, key)
+                generation = cache.generation()
+                result = cache.get(cache_key)
+                if result is MISSING:
+                    result = fn(*args, **kwargs)
+                    if _cacheable(result):
+                        cache.put(cache_key, result, generation)
+                return result
+
+        tool.cache = cache
+        return tool
+    return decorator
+
+
+def invalidate(*tags):
+    """Empty every cache carrying one of `tags`"""
+    with _lock:
+        for tag in tags:
+            _generations[tag] += 1
+        for cache in _caches:
+            if any(tag in cache.tags for tag in tags):
+                cache.clear()
+
+
+def invalidates(*tags):
+    """Invalidate `tags` after every call of the decorated tool"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def tool(*args, **kwargs):
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    invalidate(*tags)
+        else:
+            @functools.wraps(fn)
+            def tool(*args, **kwargs):
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    invalidate(*tags)
+        return tool
+    return decorator
+
+
+def stats():
+    """Hit/miss counters of every cached tool"""
+    with _lock:
+        return {cache.name: cache.stats() for cache in _caches}
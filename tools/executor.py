@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Thread-pool execution of synchronous tools with concurrency limits.
+
+FastMCP calls plain `def` tools directly on its event loop, so a tool blocked in
+an SMTP login, `psutil.cpu_percent(interval=1)` or a `WebDriverWait` stalls
+every other request of the server. `ToolExecutor.wrap()` turns a sync tool into
+an async one that runs in a shared thread pool, so independent tools execute
+concurrently.
+
+Tools that share something which must not be used concurrently (the camera, a
+module's WebDriver instance, the sticky notes file) name it as a resource; each
+resource admits `capacity` callers at a time (1 by default). A single tool can
+be capped as well. Limits are taken in a fixed order, so two tools sharing
+several resources cannot deadlock, and are held until the tool's thread has
+finished, even when the request is cancelled, since the thread cannot be
+stopped.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import os
+
+TOOL_THREADS = 8  # Default size of the thread pool, overridden by MCP_TOOL_THREADS
+
+
+class Limit:
+    """Counting semaphore with statistics"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.semaphore = asyncio.Semaphore(capacity)
+        self.running = 0
+        self.waiting = 0
+        self.waits = 0  # Acquisitions that had to wait
+
+    async def acquire(self):
+        if self.semaphore.locked():
+            self.waits += 1
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        self.running -= 1
+        self.semaphore.release()
+
+    def stats(self):
+        return {"capacity": self.capacity, "running": self.running, "waiting": self.waiting, "waits": self.waits}
+
+
+class ToolExecutor:
+    """Runs sync tools in a thread pool, within per-resource and per-tool limits"""
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = int(os.environ.get('MCP_TOOL_THREADS', TOOL_THREADS))
+        self.max_workers = max_workers
+        self.busy = 0  # Calls submitted to the pool and not finished yet
+        self.resources = {}  # resource name -> Limit
+        self.tools = {}  # tool name -> Limit
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix='tool')
+        return self._pool
+
+    def limit_resource(self, name, capacity=1):
+        """Admit at most `capacity` concurrent users of the resource `name`"""
+        self.resources[name] = Limit(capacity)
+
+    def wrap(self, fn, name, resources=(), limit=None):
+        """Async version of the tool `fn` that runs in the pool while holding its limits.
+
+        `resources` not declared with `limit_resource()` get a capacity of 1;
+        `limit` caps concurrent calls of this tool.
+        """
+        if self.max_workers <= 0:
+            return fn
+        for resource in resources:
+            if resource not in self.resources:
+                self.limit_resource(resource)
+        limits = [self.resources[resource] for resource in sorted(set(resources))]
+        if limit is not None:
+            self.tools[name] = Limit(limit)
+            limits.append(self.tools[name])
+        is_async = inspect.iscoroutinefunction(fn)
+
+        @functools.wraps(fn)
+        async def tool(**arguments):
+            acquired = []
+            try:
+                for item in limits:
+                    await item.acquire()
+                    acquired.append(item)
+                if is_async:
+                    return await fn(**arguments)
+                future = asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(fn, **arguments))
+                self.busy += 1
+                future.add_done_callback(self._finished)
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # The thread keeps running; so does its hold on the limits
+                    held, acquired = acquired, []
+                    future.add_done_callback(lambda _: self._release(held))
+                    raise
+            finally:
+                self._release(acquired)
+
+        return tool
+
+    def _finished(self, future):
+        self.busy -= 1
+
+    @staticmethod
+    def _release(limits):
+        for item in reversed(limits):
+            item.release()
+
+    def stats(self):
+        return {
+            "threads": self.max_workers,
+            "busy": self.busy,
+            "resources": {name: limit.stats() for name, limit in sorted(self.resources.items())},
+            "tools": {name: limit.stats() for name, limit in sorted(self.tools.items())},
+        }
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+HDR-style histogram shared by the tool metrics and mcp_pipe's statistics.
+
+Values are counted in log-linear buckets with 32 sub-buckets per power of two,
+so recording is a few integer operations and percentiles are accurate to about
+3% over any range. It lives in tools/ so the tool servers do not depend on
+pipe/, which imports it from here.
+"""
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+class Histogram:
+    """Log-linear histogram of latencies, recorded in microseconds"""
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket_index(value):
+        if value < 2 * SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        return 2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def bucket_value(index):
+        """Highest value that falls into bucket `index`"""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift, offset = divmod(index - 2 * SUB_BUCKETS, SUB_BUCKETS)
+        return ((SUB_BUCKETS + offset + 1) << (shift + 1)) - 1
+
+    def record(self, seconds):
+        self.add(int(seconds * 1_000_000))
+
+    def add(self, value):
+        """Record a non-negative integer, e.g. microseconds or bytes"""
+        index = self.bucket_index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """Value in microseconds at or below which `pct` percent of the recordings fall"""
+        if not self.count:
+            return 0
+        target = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.bucket_value(index), self.max)
+        return self.max
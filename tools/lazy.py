@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy registration of tool modules.
+
+Importing every tool module at startup pulls in selenium, cv2, openai and
+pyautogui and runs module level setup such as loading the sticky notes, even
+though a session may never call those tools. `LazyTools` reads a module's
+`register_*` function with `ast` instead of importing it, and publishes every
+`@mcp.tool()` it finds with the same name, docstring and parameter schema. The
+module is imported and its `register_*` function run on the first call of one
+of its tools; from then on calls go straight to the real functions.
+
+A module whose tools cannot be described without importing it (annotations or
+defaults that refer to the module's own names, tools registered in a loop, ...)
+is imported at startup as before. Set MCP_EAGER_TOOLS=1 to import every module
+at startup.
+
+Every tool, deferred or not, is registered through a `ToolExecutor`, which runs
+sync tools in a thread pool within the resource and per-tool limits given to
+`register()`, and through `ToolMetrics`, which records its calls.
+"""
+
+import ast
+import builtins
+import collections
+import importlib
+import importlib.util
+import inspect
+import logging
+import os
+import threading
+import time
+import typing
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from tools.executor import ToolExecutor
+from tools.metrics import ToolMetrics
+
+logger = logging.getLogger('lazy_tools')
+
+# Names tool annotations may use without importing the tool module
+ANNOTATION_NAMESPACE = {
+    **{name: getattr(typing, name) for name in typing.__all__},
+    **{name: getattr(builtins, name) for name in ('str', 'int', 'float', 'bool', 'bytes', 'dict', 'list',
+                                                  'tuple', 'set')},
+}
+
+ToolSpec = collections.namedtuple('ToolSpec', 'name function_name description signature is_async')
+
+
+class StaticDescriptionError(Exception):
+    """The tools of a module cannot be described without importing it"""
+
+
+def rss():
+    """Resident set size of this process in bytes, or None without psutil"""
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def describe_tools(module_name, function_name):
+    """Read the tools `function_name` of `module_name` registers, without importing the module"""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+        raise StaticDescriptionError("no Python source")
+    with open(spec.origin, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), spec.origin)
+    register = next((node for node in tree.body
+                     if isinstance(node, ast.FunctionDef) and node.name == function_name), None)
+    if register is None or not register.args.args:
+        raise StaticDescriptionError(f"no top-level {function_name}(mcp)")
+    server = register.args.args[0].arg
+
+    tools = []
+    for node in ast.walk(register):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node is not register:
+            for decorator in node.decorator_list:
+                if (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)
+                        and decorator.func.attr == 'tool' and isinstance(decorator.func.value, ast.Name)
+                        and decorator.func.value.id == server):
+                    tools.append(_describe_tool(node, decorator))
+    # Any other use of `mcp.tool` (aliases, calls in loops) registers tools we cannot see
+    uses = sum(1 for node in ast.walk(register)
+               if isinstance(node, ast.Attribute) and node.attr == 'tool'
+               and isinstance(node.value, ast.Name) and node.value.id == server)
+    if uses != len(tools):
+        raise StaticDescriptionError("tools are registered dynamically")
+    return tools
+
+
+def _describe_tool(node, decorator):
+    if decorator.args:
+        raise StaticDescriptionError(f"{node.name}: positional arguments to tool()")
+    options = {}
+    for keyword in decorator.keywords:
+        if keyword.arg not in ('name', 'description'):
+            raise StaticDescriptionError(f"{node.name}: tool({keyword.arg}=...)")
+        options[keyword.arg] = _literal(node, keyword.value)
+
+    args = node.args
+    if args.vararg or args.kwarg:
+        raise StaticDescriptionError(f"{node.name}: *args/**kwargs")
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    parameters = []
+    for arg, default in zip(positional, defaults):
+        parameters.append(_parameter(node, arg, default, inspect.Parameter.POSITIONAL_OR_KEYWORD))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        parameters.append(_parameter(node, arg, default, inspect.Parameter.KEYWORD_ONLY))
+
+    return ToolSpec(
+        name=options.get('name') or node.name,
+        function_name=node.name,
+        # The raw docstring, as FastMCP takes it from `__doc__`
+        description=options.get('description') or ast.get_docstring(node, clean=False) or "",
+        signature=inspect.Signature(parameters),
+        is_async=isinstance(node, ast.AsyncFunctionDef),
+    )
+
+
+def _parameter(node, arg, default, kind):
+    annotation = inspect.Parameter.empty
+    if arg.annotation is not None:
+        source = ast.unparse(arg.annotation)
+        try:
+            annotation = eval(source, {'__builtins__': {}}, ANNOTATION_NAMESPACE)
+        except Exception:
+            raise StaticDescriptionError(f"{node.name}: annotation {source!r}") from None
+    value = inspect.Parameter.empty if default is None else _literal(node, default)
+    return inspect.Parameter(arg.arg, kind, default=value, annotation=annotation)
+
+
+def _literal(node, value):
+    try:
+        return ast.literal_eval(value)
+    except ValueError:
+        raise StaticDescriptionError(f"{node.name}: {ast.unparse(value)!r} is not a literal") from None
+
+
+class _Capture:
+    """Stands in for the FastMCP server while a deferred module registers its tools"""
+
+    def __init__(self, mcp):
+        self._mcp = mcp
+        self.functions = {}
+
+    def tool(self, name=None, description=None, **kwargs):
+        def decorator(fn):
+            self.functions[name or fn.__name__] = fn
+            return fn
+        return decorator
+
+    def __getattr__(self, attr):
+        # Resources and prompts are registered on the real server right away
+        return getattr(self._mcp, attr)
+
+
+class _Registrar:
+    """Stands in for the FastMCP server while a module imported at startup registers its tools"""
+
+    def __init__(self, mcp, wrap):
+        self._mcp = mcp
+        self._wrap = wrap
+
+    def tool(self, name=None, description=None, **kwargs):
+        def decorator(fn):
+            self._mcp.tool(name=name, description=description, **kwargs)(self._wrap(fn, name or fn.__name__))
+            return fn
+        return decorator
+
+    def __getattr__(self, attr):
+        return getattr(self._mcp, attr)
+
+
+class LazyModule:
+    """A tool module whose import is deferred until one of its tools is called"""
+
+    def __init__(self, mcp, name, register_name, specs):
+        self.mcp = mcp
+        self.name = name
+        self.register_name = register_name
+        self.specs = specs
+        self.functions = None
+        self.import_time = None
+        self.rss_delta = None
+        self._lock = threading.Lock()
+
+    def proxy(self, spec):
+        """Stand-in for the tool `spec` with its signature, importing the module when called"""
+        if spec.is_async:
+            async def tool(**arguments):
+                return await self.function(spec.name)(**arguments)
+        else:
+            def tool(**arguments):
+                return self.function(spec.name)(**arguments)
+        tool.__name__ = spec.function_name
+        tool.__qualname__ = spec.function_name
+        tool.__doc__ = spec.description
+        tool.__signature__ = spec.signature
+        return tool
+
+    def function(self, name):
+        functions = self.functions if self.functions is not None else self.load(name)
+        try:
+            return functions[name]
+        except KeyError:
+            raise RuntimeError(f"{self.name} did not register the tool {name}") from None
+
+    def load(self, trigger):
+        """Import the module and collect its tool functions; a failed import is retried on the next call"""
+        with self._lock:
+            if self.functions is None:
+                before = rss()
+                started = time.perf_counter()
+                module = importlib.import_module(self.name)
+                capture = _Capture(self.mcp)
+                getattr(module, self.register_name)(capture)
+                self.import_time = time.perf_counter() - started
+                after = rss()
+                self.rss_delta = after - before if before is not None else None
+                missing = sorted(spec.name for spec in self.specs if spec.name not in capture.functions)
+                if missing:
+                    logger.warning(f"{self.name} no longer registers {', '.join(missing)}")
+                extra = sorted(set(capture.functions) - {spec.name for spec in self.specs})
+                if extra:
+                    logger.warning(f"{self.name} registered tools that were not published: {', '.join(extra)}")
+                self.functions = capture.functions
+                memory = f", RSS +{self.rss_delta / 2 ** 20:.1f} MiB" if self.rss_delta is not None else ""
+                logger.info(f"Imported {self.name} for {trigger} in {self.import_time * 1000:.0f} ms{memory}")
+        return self.functions
+
+
+class LazyTools:
+    """Registers tool modules on `mcp`, deferring their import where possible"""
+
+    def __init__(self, mcp, eager=None, executor=None, metrics=None):
+        self.mcp = mcp
+        self.eager = os.environ.get('MCP_EAGER_TOOLS') == '1' if eager is None else eager
+        self.executor = executor if executor is not None else ToolExecutor()
+        self.metrics = metrics if metrics is not None else ToolMetrics()
+        self.modules = {}  # module name -> LazyModule, or None if it was imported at startup
+        self.registrations = []  # (module name, register function name), in order
+        self.startup_time = 0.0
+
+    def register(self, module_name, function_name, resources=(), limits=None):
+        """Register the tools `function_name(mcp)` of `module_name` would register.
+
+        Every tool of the module holds `resources` while it runs; `limits` maps
+        tool names to the number of calls of that tool allowed at a time.
+        """
+        self.registrations.append((module_name, function_name))
+        limits = limits or {}
+
+        def wrap(fn, name):
+            return self.executor.wrap(self.metrics.wrap(fn, name), name, resources, limits.get(name))
+
+        started = time.perf_counter()
+        if not self.eager:
+            try:
+                specs = describe_tools(module_name, function_name)
+            except (StaticDescriptionError, OSError, SyntaxError) as e:
+                logger.info(f"Importing {module_name} at startup: {e}")
+            else:
+                module = LazyModule(self.mcp, module_name, function_name, specs)
+                for spec in specs:
+                    self.mcp.add_tool(wrap(module.proxy(spec), spec.name), name=spec.name,
+                                      description=spec.description)
+                self.modules[module_name] = module
+                self.startup_time += time.perf_counter() - started
+                return
+        getattr(importlib.import_module(module_name), function_name)(_Registrar(self.mcp, wrap))
+        self.modules[module_name] = None
+        self.startup_time += time.perf_counter() - started
+
+    def load_all(self):
+        """Import every deferred module now, e.g. in a fork server template"""
+        for name, module in self.modules.items():
+            if module is not None and module.functions is None:
+                try:
+                    module.load('preloading')
+                except Exception as e:
+                    logger.warning(f"Failed to import {name}: {e}")
+
+    def report(self):
+        """Per module: whether it is still deferred, and what importing it cost"""
+        return {
+            name: {
+                "deferred": module is not None and module.functions is None,
+                "tools": len(module.specs) if module is not None else None,
+                "import_ms": round(module.import_time * 1000, 1) if module and module.import_time is not None else None,
+                "rss_mib": round(module.rss_delta / 2 ** 20, 1) if module and module.rss_delta is not None else None,
+            }
+            for name, module in self.modules.items()
+        }
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Per-tool call metrics for the MCP server.
+
+`LazyTools` passes every tool it registers through `ToolMetrics.wrap()`, inside
+the thread pool wrapper, so the metrics see the tool's own execution: the number
+of calls, exceptions, failed results (the tools here report errors as
+`{"success": False, ...}` rather than raising), an execution time histogram and
+the size of the results. Time spent waiting for a resource is not included; the
+executor's limit statistics show that.
+
+A dict result is serialized by the wrapper exactly as FastMCP would serialize it
+(`pydantic_core.to_json(result, fallback=str, indent=2)`) and returned as that
+text, which FastMCP passes through unchanged. The response stays the same, its
+size comes for free, and the serialization runs in the tool's worker thread
+instead of on the event loop. String results are measured as UTF-8; other
+results (images, content lists) are passed on unmeasured.
+
+`register_metrics_tools()` publishes the summary as the `get_tool_metrics` tool
+and, with MCP_TOOL_METRICS_INTERVAL set to a number of seconds, logs it
+periodically.
+"""
+
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+import pydantic_core
+from mcp.server.fastmcp import FastMCP
+
+from tools import cache
+from tools.histogram import Histogram
+
+logger = logging.getLogger('tool_metrics')
+
+
+class CallStats:
+    """Counters and histograms for one tool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.errors = 0  # Calls that raised
+        self.failures = 0  # Calls that returned {"success": False}
+        self.latency = Histogram()  # Microseconds
+        self.result_bytes = Histogram()
+
+    def snapshot(self):
+        with self.lock:
+            calls = self.latency.count
+            sizes = self.result_bytes
+            return {
+                "calls": calls,
+                "errors": self.errors,
+                "failures": self.failures,
+                "error_rate": round((self.errors + self.failures) / calls, 4) if calls else 0,
+                "mean_ms": round(self.latency.total / calls / 1000, 3) if calls else 0,
+                "p50_ms": self.latency.percentile(50) / 1000,
+                "p95_ms": self.latency.percentile(95) / 1000,
+                "p99_ms": self.latency.percentile(99) / 1000,
+                "max_ms": self.latency.max / 1000,
+                "result_bytes": {
+                    "measured": sizes.count,
+                    "mean": round(sizes.total / sizes.count) if sizes.count else 0,
+                    "p99": sizes.percentile(99),
+                    "max": sizes.max,
+                    "total": sizes.total,
+                },
+            }
+
+
+class ToolMetrics:
+    """Call metrics for every tool registered through `wrap()`"""
+
+    def __init__(self):
+        self.tools = {}  # tool name -> CallStats
+
+    def wrap(self, fn, name):
+        """Version of the tool `fn` that records its calls under `name`"""
+        stats = self.tools.setdefault(name, CallStats())
+        perf_counter = time.perf_counter
+
+        def finish(started, result):
+            elapsed = int((perf_counter() - started) * 1_000_000)
+            failed = False
+            size = None
+            result_type = type(result)
+            if result_type is dict:
+                failed = result.get('success') is False
+                data = pydantic_core.to_json(result, fallback=str, indent=2)
+                size = len(data)
+                result = data.decode()
+            elif result_type is str:
+                size = len(result) if result.isascii() else len(result.encode('utf-8'))
+            with stats.lock:
+                stats.latency.add(elapsed)
+                if failed:
+                    stats.failures += 1
+                if size is not None:
+                    stats.result_bytes.add(size)
+            return result
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def tool(**arguments):
+                started = perf_counter()
+                try:
+                    result = await fn(**arguments)
+                except Exception:
+                    self._failed(stats, started)
+                    raise
+                return finish(started, result)
+        else:
+            @functools.wraps(fn)
+            def tool(**arguments):
+                started = perf_counter()
+                try:
+                    result = fn(**arguments)
+                except Exception:
+                    self._failed(stats, started)
+                    raise
+                return finish(started, result)
+        return tool
+
+    @staticmethod
+    def _failed(stats, started):
+        elapsed = int((time.perf_counter() - started) * 1_000_000)
+        with stats.lock:
+            stats.errors += 1
+            stats.latency.add(elapsed)
+
+    def snapshot(self):
+        """Metrics per tool that has been called, latencies in milliseconds"""
+        return {name: stats.snapshot() for name, stats in sorted(self.tools.items()) if stats.latency.count}
+
+    def summary_lines(self):
+        """One line per called tool for the periodic log"""
+        return [
+            f"{name}: calls {s['calls']}, errors {s['errors']}, failures {s['failures']}, "
+            f"p50 {s['p50_ms']:.1f} ms, p99 {s['p99_ms']:.1f} ms, max {s['max_ms']:.1f} ms, "
+            f"result mean {s['result_bytes']['mean']} B, max {s['result_bytes']['max']} B"
+            for name, s in self.snapshot().items()
+        ]
+
+    def start_logging(self, interval):
+        """Log the summary every `interval` seconds from a daemon thread"""
+        def run():
+            while True:
+                time.sleep(interval)
+                lines = self.summary_lines()
+                for line in lines or ["no tool calls yet"]:
+                    logger.info(f"Tool metrics: {line}")
+
+        threading.Thread(target=run, name='tool-metrics', daemon=True).start()
+
+
+def register_metrics_tools(mcp: FastMCP, lazy_tools, interval=None):
+    if interval is None:
+        interval = float(os.environ.get('MCP_TOOL_METRICS_INTERVAL', 0))
+    if interval > 0:
+        lazy_tools.metrics.start_logging(interval)
+
+    @mcp.tool()
+    def get_tool_metrics() -> dict:
+        """
+        获取各工具的调用统计。
+        返回:
+        - 每个工具的调用次数、异常与失败次数、错误率、执行耗时分位数（毫秒）和返回结果大小（字节），
+          结果缓存的命中情况，以及线程池、资源占用情况和各工具模块的加载情况
+        """
+        return {
+            "success": True,
+            "result": {
+                "tools": lazy_tools.metrics.snapshot(),
+                "caches": cache.stats(),
+                "executor": lazy_tools.executor.stats(),
+                "modules": lazy_tools.report(),
+            },
+        }
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 import datetime
-import json
 import os
 import logging
 from selenium import webdriver
 from selenium.webdriver.edge.service import Service as EdgeService
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.common.exceptions import WebDriverException, SessionNotCreatedException
+import threading
 import time
+from tools.cache import cached, invalidates
+from tools.note_html import NotePageRenderer
+from tools.note_index import MATCH_MODES
+from tools.note_store import open_store
 
 logger = logging.getLogger('sticky_notes_manager')
 
@@ -17,53 +21,42 @@ _edge_driver_instance = None
 _browser_initialized = False  # 标记浏览器是否已初始化
 
 class StickyNoteManager:
-    def __init__(self, data_file="sticky_notes.json", html_output_file="sticky_notes.html"):
+    def __init__(self, data_file="sticky_notes.json", html_output_file="sticky_notes.html", store=None,
+                 atomic_html=True):
         self.data_file = data_file
         self.html_output_file = html_output_file
-        self.notes = []
-        self.next_id = 1
-        self._load_notes()
-        
-    def _load_notes(self):
-        """从文件中加载便签数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.notes = data.get("notes", [])
-                    # 确保旧数据有 importance 和 category 字段
-                    for note in self.notes:
-                        if "importance" not in note:
-                            note["importance"] = "普通"
-                        if "category" not in note:
-                            note["category"] = "未分类"
-                    if self.notes:
-                        self.next_id = max(note["id"] for note in self.notes) + 1
-                    else:
-                        self.next_id = 1
-                logger.info(f"已从 '{self.data_file}' 加载 {len(self.notes)} 条便签")
-            except json.JSONDecodeError:
-                logger.warning("便签数据文件损坏或为空，将创建新文件")
-                self.notes = []
-                self.next_id = 1
-            except Exception as e:
-                logger.error(f"加载便签数据失败: {e}")
-                self.notes = []
-                self.next_id = 1
-        else:
-            logger.info("便签数据文件不存在，将创建新文件")
-            self.notes = []
-            self.next_id = 1
+        # 未指定存储时，首次使用才按 STICKY_NOTES_BACKEND 环境变量（json/sqlite）打开，见 tools/note_store.py
+        self._store = store
+        self._owns_store = store is None
+        self._store_lock = threading.Lock()
+        # 增量渲染页面，atomic_html 为 True 时先写临时文件再替换，见 tools/note_html.py
+        self.renderer = NotePageRenderer(atomic=atomic_html)
 
-    def _save_notes(self):
-        """将便签数据保存到文件"""
-        try:
-            data = {"notes": self.notes}
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logger.info(f"已保存 {len(self.notes)} 条便签到 '{self.data_file}'")
-        except IOError as e:
-            logger.error(f"保存便签数据失败: {e}")
+    @property
+    def store(self):
+        """存储后端。延迟到首次使用时打开：fork server 的模板进程导入本模块时不会加载便签、启动日志线程"""
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = open_store(self.data_file)
+        return self._store
+
+    def _after_fork(self):
+        """fork 出的子进程丢弃从父进程继承的存储，下次使用时重新打开。
+
+        继承的便签和下一个ID停留在 fork 时的状态，其他子进程之后的修改都看不到；
+        JSON 存储的后台线程也不会随 fork 复制，日志将不再同步和压缩。
+        这里不关闭继承的存储，以免影响父进程仍在使用的文件和数据库连接。
+        """
+        self._store_lock = threading.Lock()
+        if self._owns_store and self._store is not None:
+            _inherited_stores.append(self._store)
+            self._store = None
+
+    @property
+    def notes(self):
+        """按ID顺序排列的全部便签"""
+        return self.store.all()
 
     def _generate_timestamp(self):
         """生成当前时间戳"""
@@ -141,17 +134,7 @@ class StickyNoteManager:
         if importance not in ["普通", "重要", "紧急"]:
             importance = "普通"
         
-        note = {
-            "id": self.next_id,
-            "content": content,
-            "timestamp": self._generate_timestamp(),
-            "importance": importance,
-            "category": category
-        }
-        
-        self.notes.append(note)
-        self.next_id += 1
-        self._save_notes()
+        note = self.store.add(content, self._generate_timestamp(), importance, category)
         
         # 更新HTML
         html_result = self.generate_html_report(notes_to_display=self.notes)
@@ -169,24 +152,19 @@ class StickyNoteManager:
         """
         修改现有便签
         """
-        note_found = False
-        for note in self.notes:
-            if note["id"] == note_id:
-                note_found = True
-                if new_content is not None:
-                    note["content"] = new_content
-                    note["timestamp"] = self._generate_timestamp()
-                if new_importance is not None:
-                    note["importance"] = new_importance
-                if new_category is not None:
-                    note["category"] = new_category
-                break
-        
-        if not note_found:
+        changes = {}
+        if new_content is not None:
+            changes["content"] = new_content
+            changes["timestamp"] = self._generate_timestamp()
+        if new_importance is not None:
+            changes["importance"] = new_importance
+        if new_category is not None:
+            changes["category"] = new_category
+        
+        updated_note = self.store.update(note_id, changes)
+        if updated_note is None:
             return {"success": False, "error": f"未找到ID为 {note_id} 的便签"}
         
-        self._save_notes()
-        
         # 更新HTML
         html_result = self.generate_html_report(notes_to_display=self.notes)
         if not html_result["success"]:
@@ -195,20 +173,16 @@ class StickyNoteManager:
         return {
             "success": True,
             "message": f"已成功修改便签(ID: {note_id})",
-            "updated_note": next((note for note in self.notes if note["id"] == note_id), None)
+            "updated_note": updated_note
         }
 
     def delete_note(self, note_id: int) -> dict:
         """
         删除便签
         """
-        initial_count = len(self.notes)
-        self.notes = [note for note in self.notes if note["id"] != note_id]
-        
-        if len(self.notes) == initial_count:
+        if not self.store.delete(note_id):
             return {"success": False, "error": f"未找到ID为 {note_id} 的便签"}
-        
-        self._save_notes()
+        self.renderer.forget(note_id)
         
         # 更新HTML
         html_result = self.generate_html_report(notes_to_display=self.notes)
@@ -218,32 +192,17 @@ class StickyNoteManager:
         return {
             "success": True,
             "message": f"已成功删除便签(ID: {note_id})",
-            "remaining_notes": len(self.notes)
+            "remaining_notes": self.store.count()
         }
 
-    def search_notes(self, keyword: str = None, importance: str = None, category: str = None) -> dict:
+    def search_notes(self, keyword: str = None, importance: str = None, category: str = None,
+                     match: str = "phrase", top_k: int = 0) -> dict:
         """
         搜索便签
         """
-        matching_notes = self.notes
-        
-        if keyword:
-            matching_notes = [
-                note for note in matching_notes 
-                if keyword.lower() in note["content"].lower()
-            ]
-        
-        if importance:
-            matching_notes = [
-                note for note in matching_notes 
-                if note.get("importance", "").lower() == importance.lower()
-            ]
-        
-        if category:
-            matching_notes = [
-                note for note in matching_notes 
-                if note.get("category", "").lower() == category.lower()
-            ]
+        if match not in MATCH_MODES:
+            return {"success": False, "error": f"不支持的匹配方式: {match}，可选 {'/'.join(MATCH_MODES)}"}
+        matching_notes = self.store.search(keyword, importance, category, match, max(top_k or 0, 0))
         
         # 更新HTML
         html_result = self.generate_html_report(notes_to_display=matching_notes)
@@ -260,379 +219,46 @@ class StickyNoteManager:
         """
         列出所有便签
         """
+        notes = self.notes
         # 更新HTML
-        html_result = self.generate_html_report(notes_to_display=self.notes)
+        html_result = self.generate_html_report(notes_to_display=notes)
         if not html_result["success"]:
             return html_result
         
         return {
             "success": True,
-            "message": f"共 {len(self.notes)} 条便签",
-            "notes": self.notes
+            "message": f"共 {len(notes)} 条便签",
+            "notes": notes
         }
 
     def generate_html_report(self, notes_to_display: list) -> dict:
         """
-        生成HTML报告
+        生成HTML报告（内容与上次写入的完全相同时跳过写入）
         """
         try:
-            with open(self.html_output_file, 'w', encoding='utf-8') as f:
-                f.write(self._generate_html_content(notes_to_display))
+            self.renderer.write(self.html_output_file, self._generate_html_content(notes_to_display))
             return {"success": True, "message": "HTML报告已生成"}
         except IOError as e:
             return {"success": False, "error": f"生成HTML文件失败: {e}"}
 
     def _generate_html_content(self, notes_to_display: list) -> str:
         """
-        生成HTML内容
+        生成HTML内容，未修改过的便签卡片直接复用缓存
         """
-        html = """<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>我的便签</title>
-    <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
-    <style>
-        :root {
-            --primary-color: #4361ee;
-            --secondary-color: #3f37c9;
-            --success-color: #4cc9f0;
-            --danger-color: #f72585;
-            --warning-color: #f8961e;
-            --info-color: #4895ef;
-            --light-color: #f8f9fa;
-            --dark-color: #212529;
-            
-            --work-color: #4361ee;
-            --life-color: #4cc9f0;
-            --study-color: #7209b7;
-            --other-color: #6c757d;
-        }
-        
-        body {
-            font-family: 'Noto Sans SC', sans-serif;
-            margin: 0;
-            padding: 20px;
-            background-color: #f5f7fa;
-            color: #333;
-            line-height: 1.6;
-        }
-        
-        .container {
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }
-        
-        header {
-            text-align: center;
-            margin-bottom: 30px;
-            padding-bottom: 20px;
-            border-bottom: 1px solid #e0e0e0;
-        }
-        
-        h1 {
-            color: var(--primary-color);
-            font-weight: 700;
-            margin-bottom: 10px;
-            font-size: 2.5rem;
-        }
-        
-        .subtitle {
-            color: #6c757d;
-            font-weight: 300;
-            font-size: 1.1rem;
-        }
-        
-        .stats {
-            display: flex;
-            justify-content: center;
-            gap: 20px;
-            margin-bottom: 20px;
-            flex-wrap: wrap;
-        }
-        
-        .stat-card {
-            background: white;
-            border-radius: 8px;
-            padding: 15px 20px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-            min-width: 120px;
-            text-align: center;
-        }
-        
-        .stat-value {
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: var(--primary-color);
-            margin-bottom: 5px;
-        }
-        
-        .stat-label {
-            font-size: 0.85rem;
-            color: #6c757d;
-        }
-        
-        .note-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-            gap: 25px;
-            margin-top: 20px;
-        }
-        
-        .note-card {
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
-            transition: all 0.3s ease;
-            overflow: hidden;
-            display: flex;
-            flex-direction: column;
-            height: 100%;
-        }
-        
-        .note-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 10px 20px rgba(0, 0, 0, 0.1);
-        }
-        
-        .note-header {
-            padding: 15px 20px;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .note-id {
-            font-size: 0.85rem;
-            color: #6c757d;
-            font-weight: 500;
-        }
-        
-        .note-content {
-            padding: 20px;
-            flex-grow: 1;
-            font-size: 1rem;
-            color: #495057;
-            border-bottom: 1px solid #f1f1f1;
-        }
-        
-        .note-footer {
-            padding: 15px 20px;
-            background-color: #f8f9fa;
-        }
-        
-        .note-timestamp {
-            font-size: 0.8rem;
-            color: #6c757d;
-            margin-bottom: 10px;
-            display: flex;
-            align-items: center;
-        }
-        
-        .note-timestamp i {
-            margin-right: 5px;
-            font-size: 0.9rem;
-        }
-        
-        .note-tags {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 8px;
-            margin-top: 10px;
-        }
-        
-        .tag {
-            font-size: 0.75rem;
-            padding: 4px 10px;
-            border-radius: 50px;
-            font-weight: 500;
-            display: inline-flex;
-            align-items: center;
-        }
-        
-        .importance-stars {
-            display: flex;
-            gap: 3px;
-        }
-        
-        .star {
-            color: #ffc107;
-            font-size: 0.9rem;
-        }
-        
-        .star.empty {
-            color: #e0e0e0;
-        }
-        
-        /* 重要性星级样式 */
-        .importance-1 .star:nth-child(1) { color: #ffc107; }
-        .importance-1 .star:nth-child(n+2) { color: #e0e0e0; }
-        
-        .importance-2 .star:nth-child(-n+2) { color: #ffc107; }
-        .importance-2 .star:nth-child(n+3) { color: #e0e0e0; }
-        
-        .importance-3 .star { color: #ffc107; }
-        
-        /* 类别标签颜色 */
-        .category-work {
-            background-color: rgba(67, 97, 238, 0.1);
-            color: var(--work-color);
-            border: 1px solid rgba(67, 97, 238, 0.2);
-        }
-        
-        .category-life {
-            background-color: rgba(76, 201, 240, 0.1);
-            color: var(--life-color);
-            border: 1px solid rgba(76, 201, 240, 0.2);
-        }
-        
-        .category-study {
-            background-color: rgba(114, 9, 183, 0.1);
-            color: var(--study-color);
-            border: 1px solid rgba(114, 9, 183, 0.2);
-        }
-        .category-other {
-            background-color: rgba(108, 117, 125, 0.1);
-            color: var(--other-color);
-            border: 1px solid rgba(108, 117, 125, 0.2);
-        }
-        
-        .no-notes {
-            text-align: center;
-            padding: 50px 20px;
-            grid-column: 1 / -1;
-        }
-        
-        .no-notes i {
-            font-size: 3rem;
-            color: #adb5bd;
-            margin-bottom: 15px;
-        }
-        
-        .no-notes h3 {
-            color: #6c757d;
-            font-weight: 400;
-            margin-bottom: 10px;
-        }
-        
-        .no-notes p {
-            color: #adb5bd;
-            font-size: 0.9rem;
-        }
-        
-        .search-info {
-            text-align: center;
-            margin-bottom: 20px;
-            color: #6c757d;
-            font-size: 0.9rem;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>我的便签</h1>
-            <p class="subtitle">记录生活中的每一个重要时刻</p>
-        </header>
-        
-        <div class="stats">
-            <div class="stat-card">
-                <div class="stat-value">""" + str(len(self.notes)) + """</div>
-                <div class="stat-label">总便签数</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-value">""" + str(len(notes_to_display)) + """</div>
-                <div class="stat-label">当前显示</div>
-            </div>
-        </div>
-        
-        """ + (f'<div class="search-info">正在显示 {len(notes_to_display)} 条便签</div>' if len(notes_to_display) != len(self.notes) else '') + """
-        
-        <div class="note-grid">
-"""
-
-        if not notes_to_display:
-            html += """
-            <div class="no-notes">
-                <i class="far fa-sticky-note"></i>
-                <h3>没有找到便签</h3>
-                <p>尝试修改搜索条件或添加新便签</p>
-            </div>
-            """
-        else:
-            for note in notes_to_display:
-                # 对内容进行HTML转义
-                escaped_content = note['content'].replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#039;')
-                
-                importance = note.get("importance", "普通")
-                category = note.get("category", "未分类")
-                
-                # 确定重要性星级 (1-3星)
-                importance_level = 1
-                if importance.lower() == "重要":
-                    importance_level = 2
-                elif importance.lower() == "紧急":
-                    importance_level = 3
-                    
-                # 确定类别样式
-                category_class = "category-other"
-                if category.lower() == "工作":
-                    category_class = "category-work"
-                elif category.lower() == "生活":
-                    category_class = "category-life"
-                elif category.lower() == "学习":
-                    category_class = "category-study"
-                    
-                html += f"""
-                <div class="note-card">
-                    <div class="note-header">
-                        <span class="note-id">#{note['id']}</span>
-                        <div class="importance-stars importance-{importance_level}">
-                            <i class="fas fa-star star"></i>
-                            <i class="fas fa-star star"></i>
-                            <i class="fas fa-star star"></i>
-                        </div>
-                    </div>
-                    
-                    <div class="note-content">
-                        {escaped_content}
-                    </div>
-                    
-                    <div class="note-footer">
-                        <div class="note-timestamp">
-                            <i class="far fa-clock"></i>
-                            {note['timestamp']}
-                        </div>
-                        
-                        <div class="note-tags">
-                            <span class="tag {category_class}">
-                                <i class="fas fa-tag"></i> {category}
-                            </span>
-                        </div>
-                    </div>
-                </div>
-                """
-
-        html += """
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return html
+        return self.renderer.render(notes_to_display, self.store.count())
 
 # 实例化便签管理器
 _sticky_note_manager = StickyNoteManager()
+_inherited_stores = []  # fork 前打开的存储，子进程中只保留引用，不再使用
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_sticky_note_manager._after_fork)
 
 def register_sticky_notes_tools(mcp):
     """
     注册便签管理工具
     """
     @mcp.tool()
+    @invalidates("sticky_notes")
     def add_sticky_note(content: str, importance: str = "普通", category: str = "未分类") -> dict:
         """
         添加新便签
@@ -650,6 +276,7 @@ def register_sticky_notes_tools(mcp):
         return result
 
     @mcp.tool()
+    @invalidates("sticky_notes")
     def modify_sticky_note(note_id: int, new_content: str = None, 
                          new_importance: str = None, new_category: str = None) -> dict:
         """
@@ -669,6 +296,7 @@ def register_sticky_notes_tools(mcp):
         return result
 
     @mcp.tool()
+    @invalidates("sticky_notes")
     def delete_sticky_note(note_id: int) -> dict:
         """
         删除便签
@@ -683,17 +311,21 @@ def register_sticky_notes_tools(mcp):
                 result["browser_message"] = browser_result.get("error", "浏览器刷新失败")
         return result
 
+    # 搜索结果会显示在便签页面上，因此只缓存最近一次搜索：其他搜索或任何改变页面内容的操作都会使其失效
     @mcp.tool()
+    @cached(ttl=10, maxsize=1, tags=("sticky_notes",))
     def search_sticky_notes(keyword: str = None, importance: str = None, 
-                          category: str = None) -> dict:
+                          category: str = None, match: str = "phrase", top_k: int = 0) -> dict:
         """
         搜索便签
         :param keyword: 关键词搜索(可选)
         :param importance: 按重要性筛选(可选)
         :param category: 按分类筛选(可选)
+        :param match: 关键词匹配方式，phrase 整体匹配(默认)，all 按空格拆分后须包含全部词，any 包含任意一个词即可
+        :param top_k: 大于0时按相关度(BM25)排序，只返回前 top_k 条；默认0按ID返回全部
         :return: 操作结果和匹配的便签列表
         """
-        result = _sticky_note_manager.search_notes(keyword, importance, category)
+        result = _sticky_note_manager.search_notes(keyword, importance, category, match, top_k)
         if result["success"]:
             # 只有在搜索成功后才会刷新浏览器
             browser_result = _sticky_note_manager._refresh_browser_page(_sticky_note_manager.html_output_file)
@@ -702,6 +334,7 @@ def register_sticky_notes_tools(mcp):
         return result
 
     @mcp.tool()
+    @invalidates("sticky_notes")
     def list_all_sticky_notes() -> dict:
         """
         列出所有便签
@@ -716,6 +349,7 @@ def register_sticky_notes_tools(mcp):
         return result
 
     @mcp.tool()
+    @invalidates("sticky_notes")
     def show_sticky_notes_html() -> dict:
         """
         刷新便签HTML页面
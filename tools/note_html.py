@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+"""
+便签页面（sticky_notes.html）的增量渲染。
+
+页面由固定的外壳（样式表、标题）、统计栏和便签卡片组成。外壳是模块级常量，不再每次拼接；
+每张卡片渲染后按便签ID缓存，并记下渲染时的版本（内容、时间戳、重要性、分类），
+版本不变的卡片直接复用，新增或修改过的便签才重新渲染。输出与原来逐段拼接的页面逐字节相同。
+
+写入页面时默认先写临时文件再替换（浏览器不会读到写了一半的页面），
+并跳过与上次写入内容完全相同的页面（例如重复执行同一个搜索）。
+"""
+
+import logging
+import os
+
+logger = logging.getLogger('sticky_notes_html')
+
+PAGE_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>我的便签</title>
+    <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap" rel="stylesheet">
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
+    <style>
+        :root {
+            --primary-color: #4361ee;
+            --secondary-color: #3f37c9;
+            --success-color: #4cc9f0;
+            --danger-color: #f72585;
+            --warning-color: #f8961e;
+            --info-color: #4895ef;
+            --light-color: #f8f9fa;
+            --dark-color: #212529;
+            
+            --work-color: #4361ee;
+            --life-color: #4cc9f0;
+            --study-color: #7209b7;
+            --other-color: #6c757d;
+        }
+        
+        body {
+            font-family: 'Noto Sans SC', sans-serif;
+            margin: 0;
+            padding: 20px;
+            background-color: #f5f7fa;
+            color: #333;
+            line-height: 1.6;
+        }
+        
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+        
+        header {
+            text-align: center;
+            margin-bottom: 30px;
+            padding-bottom: 20px;
+            border-bottom: 1px solid #e0e0e0;
+        }
+        
+        h1 {
+            color: var(--primary-color);
+            font-weight: 700;
+            margin-bottom: 10px;
+            font-size: 2.5rem;
+        }
+        
+        .subtitle {
+            color: #6c757d;
+            font-weight: 300;
+            font-size: 1.1rem;
+        }
+        
+        .stats {
+            display: flex;
+            justify-content: center;
+            gap: 20px;
+            margin-bottom: 20px;
+            flex-wrap: wrap;
+        }
+        
+        .stat-card {
+            background: white;
+            border-radius: 8px;
+            padding: 15px 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+            min-width: 120px;
+            text-align: center;
+        }
+        
+        .stat-value {
+            font-size: 1.5rem;
+            font-weight: 700;
+            color: var(--primary-color);
+            margin-bottom: 5px;
+        }
+        
+        .stat-label {
+            font-size: 0.85rem;
+            color: #6c757d;
+        }
+        
+        .note-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+            gap: 25px;
+            margin-top: 20px;
+        }
+        
+        .note-card {
+            background: white;
+            border-radius: 12px;
+            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.05);
+            transition: all 0.3s ease;
+            overflow: hidden;
+            display: flex;
+            flex-direction: column;
+            height: 100%;
+        }
+        
+        .note-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 10px 20px rgba(0, 0, 0, 0.1);
+        }
+        
+        .note-header {
+            padding: 15px 20px;
+            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+        
+        .note-id {
+            font-size: 0.85rem;
+            color: #6c757d;
+            font-weight: 500;
+        }
+        
+        .note-content {
+            padding: 20px;
+            flex-grow: 1;
+            font-size: 1rem;
+            color: #495057;
+            border-bottom: 1px solid #f1f1f1;
+        }
+        
+        .note-footer {
+            padding: 15px 20px;
+            background-color: #f8f9fa;
+        }
+        
+        .note-timestamp {
+            font-size: 0.8rem;
+            color: #6c757d;
+            margin-bottom: 10px;
+            display: flex;
+            align-items: center;
+        }
+        
+        .note-timestamp i {
+            margin-right: 5px;
+            font-size: 0.9rem;
+        }
+        
+        .note-tags {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 8px;
+            margin-top: 10px;
+        }
+        
+        .tag {
+            font-size: 0.75rem;
+            padding: 4px 10px;
+            border-radius: 50px;
+            font-weight: 500;
+            display: inline-flex;
+            align-items: center;
+        }
+        
+        .importance-stars {
+            display: flex;
+            gap: 3px;
+        }
+        
+        .star {
+            color: #ffc107;
+            font-size: 0.9rem;
+        }
+        
+        .star.empty {
+            color: #e0e0e0;
+        }
+        
+        /* 重要性星级样式 */
+        .importance-1 .star:nth-child(1) { color: #ffc107; }
+        .importance-1 .star:nth-child(n+2) { color: #e0e0e0; }
+        
+        .importance-2 .star:nth-child(-n+2) { color: #ffc107; }
+        .importance-2 .star:nth-child(n+3) { color: #e0e0e0; }
+        
+        .importance-3 .star { color: #ffc107; }
+        
+        /* 类别标签颜色 */
+        .category-work {
+            background-color: rgba(67, 97, 238, 0.1);
+            color: var(--work-color);
+            border: 1px solid rgba(67, 97, 238, 0.2);
+        }
+        
+        .category-life {
+            background-color: rgba(76, 201, 240, 0.1);
+            color: var(--life-color);
+            border: 1px solid rgba(76, 201, 240, 0.2);
+        }
+        
+        .category-study {
+            background-color: rgba(114, 9, 183, 0.1);
+            color: var(--study-color);
+            border: 1px solid rgba(114, 9, 183, 0.2);
+        }
+        .category-other {
+            background-color: rgba(108, 117, 125, 0.1);
+            color: var(--other-color);
+            border: 1px solid rgba(108, 117, 125, 0.2);
+        }
+        
+        .no-notes {
+            text-align: center;
+            padding: 50px 20px;
+            grid-column: 1 / -1;
+        }
+        
+        .no-notes i {
+            font-size: 3rem;
+            color: #adb5bd;
+            margin-bottom: 15px;
+        }
+        
+        .no-notes h3 {
+            color: #6c757d;
+            font-weight: 400;
+            margin-bottom: 10px;
+        }
+        
+        .no-notes p {
+            color: #adb5bd;
+            font-size: 0.9rem;
+        }
+        
+        .search-info {
+            text-align: center;
+            margin-bottom: 20px;
+            color: #6c757d;
+            font-size: 0.9rem;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>我的便签</h1>
+            <p class="subtitle">记录生活中的每一个重要时刻</p>
+        </header>
+        
+"""
+
+STATS_TEMPLATE = """        <div class="stats">
+            <div class="stat-card">
+                <div class="stat-value">{total}</div>
+                <div class="stat-label">总便签数</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-value">{shown}</div>
+                <div class="stat-label">当前显示</div>
+            </div>
+        </div>
+        
+        """
+
+SEARCH_INFO_TEMPLATE = '<div class="search-info">正在显示 {shown} 条便签</div>'
+
+GRID_START = """
+        
+        <div class="note-grid">
+"""
+
+NO_NOTES = """
+            <div class="no-notes">
+                <i class="far fa-sticky-note"></i>
+                <h3>没有找到便签</h3>
+                <p>尝试修改搜索条件或添加新便签</p>
+            </div>
+            """
+
+CARD_TEMPLATE = """
+                <div class="note-card">
+                    <div class="note-header">
+                        <span class="note-id">#{id}</span>
+                        <div class="importance-stars importance-{level}">
+                            <i class="fas fa-star star"></i>
+                            <i class="fas fa-star star"></i>
+                            <i class="fas fa-star star"></i>
+                        </div>
+                    </div>
+                    
+                    <div class="note-content">
+                        {content}
+                    </div>
+                    
+                    <div class="note-footer">
+                        <div class="note-timestamp">
+                            <i class="far fa-clock"></i>
+                            {timestamp}
+                        </div>
+                        
+                        <div class="note-tags">
+                            <span class="tag {category_class}">
+                                <i class="fas fa-tag"></i> {category}
+                            </span>
+                        </div>
+                    </div>
+                </div>
+                """
+
+PAGE_TAIL = """
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+IMPORTANCE_LEVELS = {"重要": 2, "紧急": 3}  # 其余为 1 星
+CATEGORY_CLASSES = {"工作": "category-work", "生活": "category-life", "学习": "category-study"}
+
+
+def escape(text):
+    """HTML转义"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#039;')
+
+
+def render_card(note):
+    importance = note.get("importance", "普通")
+    category = note.get("category", "未分类")
+    return CARD_TEMPLATE.format(
+        id=note['id'],
+        level=IMPORTANCE_LEVELS.get(importance.lower(), 1),
+        content=escape(note['content']),
+        timestamp=note['timestamp'],
+        category_class=CATEGORY_CLASSES.get(category.lower(), "category-other"),
+        category=category,
+    )
+
+
+def _stat(path):
+    """用于判断文件写入后是否被改动过"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class NotePageRenderer:
+    """渲染并写入便签页面，缓存每张卡片和上次写入的内容"""
+
+    def __init__(self, atomic=True, skip_unchanged=True):
+        self.atomic = atomic
+        self.skip_unchanged = skip_unchanged
+        self.cards = {}  # 便签ID -> (版本, 卡片HTML)
+        self.rendered = 0  # 重新渲染的卡片数
+        self.reused = 0  # 直接复用的卡片数
+        self._last_write = None  # (文件路径, 页面内容, 写入后的文件状态)
+
+    def card(self, note):
+        version = (note['content'], note['timestamp'], note.get("importance"), note.get("category"))
+        cached = self.cards.get(note['id'])
+        if cached is not None and cached[0] == version:
+            self.reused += 1
+            return cached[1]
+        fragment = render_card(note)
+        self.cards[note['id']] = (version, fragment)
+        self.rendered += 1
+        return fragment
+
+    def forget(self, note_id):
+        """便签删除后丢弃其卡片缓存"""
+        self.cards.pop(note_id, None)
+
+    def render(self, notes_to_display, total):
+        """渲染页面：`total` 为便签总数，`notes_to_display` 为当前显示的便签"""
+        shown = len(notes_to_display)
+        parts = [PAGE_HEAD, STATS_TEMPLATE.format(total=total, shown=shown),
+                 SEARCH_INFO_TEMPLATE.format(shown=shown) if shown != total else '', GRID_START]
+        if notes_to_display:
+            parts.extend(self.card(note) for note in notes_to_display)
+        else:
+            parts.append(NO_NOTES)
+        parts.append(PAGE_TAIL)
+        return "".join(parts)
+
+    def write(self, path, html):
+        """写入页面，返回是否实际写入了文件"""
+        if self.skip_unchanged and self._last_write is not None:
+            last_path, last_html, last_stat = self._last_write
+            # 文件被其他程序改动或删除过时照常写入
+            if last_path == path and last_html == html and _stat(path) == last_stat:
+                return False
+        if self.atomic:
+            temp_file = path + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(html)
+            try:
+                os.replace(temp_file, path)
+            except PermissionError:
+                # Windows 上浏览器正在读取页面时无法替换，退回直接覆盖写入
+                logger.debug(f"无法替换 '{path}'，改为直接写入")
+                os.remove(temp_file)
+                self._write_in_place(path, html)
+        else:
+            self._write_in_place(path, html)
+        self._last_write = (path, html, _stat(path))
+        return True
+
+    @staticmethod
+    def _write_in_place(path, html):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+便签关键词搜索的内存倒排索引。
+
+索引以小写内容的字符二元组（bigram）为键，记录包含它的便签ID，中文无需分词即可检索，
+例如 "学ESP32" 会被切分为 "学e"、"es"、"sp"、"p3"、"32"。查询一个词时取其所有二元组
+倒排表的交集作为候选，再用子串匹配确认，结果与逐条执行 `keyword.lower() in content.lower()`
+完全一致；单个字符的词没有二元组，只能逐条匹配。
+
+查询方式（match）:
+- phrase: 整个关键词作为一个词（默认，与原来的搜索相同）
+- all: 按空白拆分为多个词，便签必须包含全部词
+- any: 按空白拆分为多个词，便签包含任意一个词即可
+
+top_k 大于 0 时按 BM25 相关度排序（以词为单位计算词频和文档频率，文档长度按字符数），
+用堆取出前 top_k 条；否则按便签ID排序返回全部结果。
+"""
+
+import functools
+import heapq
+import math
+import operator
+
+MATCH_MODES = ("phrase", "all", "any")
+GRAM = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+EMPTY = frozenset()
+
+
+def query_terms(keyword, match="phrase"):
+    """把关键词拆成小写的查询词"""
+    if not keyword:
+        return []
+    if match == "phrase":
+        return [keyword.lower()]
+    return list(dict.fromkeys(keyword.lower().split()))
+
+
+def grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def bm25_top_k(term_ids, candidates, texts, total, average_length, k):
+    """按 BM25 分数取前 k 个便签ID，分数相同时ID小的在前。
+
+    term_ids: 词 -> 全部包含该词的便签ID集合（其大小即文档频率）；candidates: 参与排序的便签ID集合；
+    texts: 便签ID -> 小写内容。每个词只需计算包含它的候选便签的词频。
+    """
+    average_length = average_length or 1
+    scores = {}
+    for term, ids in term_ids.items():
+        df = len(ids)
+        weight = math.log((total - df + 0.5) / (df + 0.5) + 1) * (BM25_K1 + 1)
+        for note_id in ids & candidates:
+            text = texts[note_id]
+            tf = text.count(term)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(text) / average_length)
+            scores[note_id] = scores.get(note_id, 0.0) + weight * tf / (tf + norm)
+    return heapq.nlargest(k, scores, key=lambda note_id: (scores[note_id], -note_id))
+
+
+class NoteIndex:
+    """便签内容的字符二元组倒排索引，随便签的增删改增量更新"""
+
+    def __init__(self, notes=()):
+        self.postings = {}  # 二元组 -> 便签ID集合
+        self.texts = {}  # 便签ID -> 小写内容
+        self.notes = {}  # 便签ID -> 便签
+        self.total_length = 0
+        for note in notes:
+            self.add(note)
+
+    def add(self, note):
+        note_id = note["id"]
+        text = note["content"].lower()
+        self.notes[note_id] = note
+        self.texts[note_id] = text
+        self.total_length += len(text)
+        for gram in grams(text):
+            postings = self.postings.get(gram)
+            if postings is None:
+                self.postings[gram] = {note_id}
+            else:
+                postings.add(note_id)
+
+    def remove(self, note_id):
+        text = self.texts.pop(note_id, None)
+        if text is None:
+            return
+        del self.notes[note_id]
+        self.total_length -= len(text)
+        for gram in grams(text):
+            postings = self.postings[gram]
+            postings.discard(note_id)
+            if not postings:
+                del self.postings[gram]
+
+    def update(self, note):
+        """内容修改后重新索引；其他字段的修改不影响索引"""
+        if self.texts.get(note["id"]) != note["content"].lower():
+            self.remove(note["id"])
+            self.add(note)
+
+    def estimate(self, term):
+        """包含 `term` 的便签数的上限估计（其最短倒排表的长度）"""
+        if len(term) < GRAM:
+            return len(self.texts)
+        return min(len(self.postings.get(gram, EMPTY)) for gram in grams(term))
+
+    def matching(self, term):
+        """包含 `term` 的便签ID集合（可能是索引内部的集合，不可修改）"""
+        if len(term) < GRAM:
+            return {note_id for note_id, text in self.texts.items() if term in text}
+        # 从最短的倒排表开始求交集；某次交集几乎没有缩小候选范围时（如 "python" 的各个二元组
+        # 总是一起出现）就停止，剩下的交给子串匹配确认，这比继续求交集便宜
+        postings = sorted((self.postings.get(gram, EMPTY) for gram in grams(term)), key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            narrowed = candidates & other
+            shrunk = len(narrowed) < len(candidates) * 0.9
+            candidates = narrowed
+            if not shrunk:
+                break
+        if len(term) == GRAM:
+            return candidates
+        texts = self.texts
+        return {note_id for note_id in candidates if term in texts[note_id]}
+
+    def search(self, keyword, match="phrase", top_k=0, accept=None):
+        """返回匹配的便签；`accept(note)` 可进一步筛选（在取前 top_k 条之前）"""
+        terms = query_terms(keyword, match)
+        if not terms:
+            found = set(self.notes)
+            per_term = {}
+        elif match == "all" and not top_k and len(terms) > 1:
+            # 不需要文档频率时，只查最稀有的词，其余的词在它的结果中用子串匹配确认
+            first, *rest = sorted(terms, key=self.estimate)
+            texts = self.texts
+            found = self.matching(first)
+            for term in rest:
+                found = {note_id for note_id in found if term in texts[note_id]}
+        else:
+            per_term = {term: self.matching(term) for term in terms}
+            sets = sorted(per_term.values(), key=len)
+            if len(sets) == 1:
+                found = sets[0]
+            else:
+                # 集合可能是 EMPTY（frozenset），不能用 set.union / set.intersection 的未绑定方法
+                found = set().union(*sets) if match == "any" else functools.reduce(operator.and_, sets)
+        if accept is not None:
+            found = {note_id for note_id in found if accept(self.notes[note_id])}
+        if top_k and terms:
+            total = len(self.texts)
+            ids = bm25_top_k(per_term, found, self.texts, total, self.total_length / total if total else 0, top_k)
+        else:
+            ids = sorted(found)
+            if top_k:
+                ids = ids[:top_k]
+        return [self.notes[note_id] for note_id in ids]
@@ -0,0 +1,567 @@
+# -*- coding: utf-8 -*-
+"""
+便签存储后端。
+
+StickyNoteManager 通过存储后端读写便签，工具接口不变:
+
+- JsonNoteStore: 原有的 sticky_notes.json，全部便签保存在内存中；每次修改只向日志文件追加一条记录，
+  后台线程定期把日志压缩进 JSON 快照；关键词搜索使用内存中的倒排索引（见 note_index）
+- SqliteNoteStore: SQLite 数据库（WAL 模式），category/importance/timestamp 建有索引，
+  关键词搜索使用 FTS5 trigram 分词器（按字符三元组切分，中文无需分词也能做子串检索）。
+  首次打开时会把已有的 JSON 便签（快照加日志）一次性导入数据库，JSON 文件保持不动
+
+通过环境变量 STICKY_NOTES_BACKEND=json|sqlite 选择后端（默认 json），
+STICKY_NOTES_DB 指定数据库文件（默认与 JSON 文件同名、扩展名为 .db），
+STICKY_NOTES_FSYNC 指定 JSON 日志的同步策略（always/everysec/no，默认 everysec）。
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from tools.note_index import EMPTY, NoteIndex, bm25_top_k, query_terms
+
+logger = logging.getLogger('sticky_notes_store')
+
+FIELDS = ("id", "content", "timestamp", "importance", "category")
+SECONDARY_FIELDS = ("importance", "category")  # JsonNoteStore 为这些字段建索引
+DEFAULT_IMPORTANCE = "普通"
+DEFAULT_CATEGORY = "未分类"
+
+
+JOURNAL_SUFFIX = ".journal"
+COMPACTING_SUFFIX = ".journal.compacting"
+FSYNC_POLICIES = ("always", "everysec", "no")
+COMPACT_MIN_RECORDS = 1000  # 日志记录数达到该值且超过便签数时压缩
+FLUSH_INTERVAL = 1  # 后台线程每隔多少秒同步日志并检查是否需要压缩
+
+
+def _read_snapshot(data_file):
+    """读取快照，返回 (便签列表, 下一个便签ID)；旧版快照没有记录下一个ID，返回 None"""
+    with open(data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("notes", []), data.get("next_id")
+
+
+def _replay(notes, journal_file):
+    """把日志中的修改应用到 notes（ID -> 便签），返回 (记录数, 日志中新增的最大便签ID)。
+
+    日志每行一条记录，每条记录都是幂等的（新增按ID覆盖、修改直接赋值、删除忽略不存在的ID），
+    因此压缩中途崩溃后重复应用同一段日志也不会出错。末尾写了一半的记录会被截掉。
+    """
+    if not os.path.exists(journal_file):
+        return 0, 0
+    records = 0
+    last_id = 0
+    with open(journal_file, 'r+b') as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if line.endswith(b"\n"):
+                    logger.error(f"'{journal_file}' 第 {records + 1} 条记录损坏，已跳过")
+                    offset += len(line)
+                    continue
+                logger.warning(f"'{journal_file}' 末尾的记录不完整（写入时中断），已丢弃")
+                f.truncate(offset)
+                break
+            offset += len(line)
+            records += 1
+            op = record.get("op")
+            if op == "add":
+                notes[record["note"]["id"]] = record["note"]
+                last_id = max(last_id, record["note"]["id"])
+            elif op == "update":
+                if record["id"] in notes:
+                    notes[record["id"]].update(record["set"])
+            elif op == "delete":
+                notes.pop(record["id"], None)
+    return records, last_id
+
+
+def read_json_notes(data_file):
+    """读取 JSON 便签快照并重放其日志，补全旧数据缺少的 importance 和 category 字段"""
+    notes = {}
+    if os.path.exists(data_file):
+        notes = {note["id"]: note for note in _read_snapshot(data_file)[0]}
+    _replay(notes, data_file + COMPACTING_SUFFIX)
+    _replay(notes, data_file + JOURNAL_SUFFIX)
+    notes = list(notes.values())
+    for note in notes:
+        if "importance" not in note:
+            note["importance"] = DEFAULT_IMPORTANCE
+        if "category" not in note:
+            note["category"] = DEFAULT_CATEGORY
+    return notes
+
+
+def write_snapshot(data_file, notes, next_id=None):
+    """原子地写入快照：先写临时文件并同步到磁盘，再替换原文件"""
+    data = {"notes": notes}
+    if next_id is not None:
+        data["next_id"] = next_id
+    temp_file = data_file + ".tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, data_file)
+    if os.name == 'posix':
+        # 同步目录，确保替换本身也已落盘
+        directory = os.open(os.path.dirname(os.path.abspath(data_file)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+def matches(note, keyword=None, importance=None, category=None):
+    """便签是否符合搜索条件（关键词为不区分大小写的子串匹配）"""
+    if keyword and keyword.lower() not in note["content"].lower():
+        return False
+    if importance and note.get("importance", "").lower() != importance.lower():
+        return False
+    if category and note.get("category", "").lower() != category.lower():
+        return False
+    return True
+
+
+class JsonNoteStore:
+    """便签保存在内存中，磁盘上是 JSON 快照加只追加的修改日志。
+
+    每次修改只向 `<data_file>.journal` 追加一行记录，写入开销与便签数量无关。
+    fsync 策略（STICKY_NOTES_FSYNC）:
+    - always: 每条记录写入后立即同步到磁盘，最安全也最慢
+    - everysec: 后台线程每秒同步一次（默认），断电时最多丢失最近一秒的修改
+    - no: 由操作系统决定何时写盘
+    进程崩溃不会丢失已写入的记录；断电只影响尚未同步的记录。
+
+    内存中按ID保存便签，并按重要性和分类（不区分大小写）建有二级索引，查找、修改、删除不随便签数量变慢，
+    按重要性/分类筛选的开销只与结果数量有关。下一个便签ID记录在快照中，不必在加载时遍历全部便签；
+    删除最新的便签后其ID也不会被重新使用（与 SQLite 后端的 AUTOINCREMENT 一致）。
+
+    日志记录数超过便签数（且不少于 COMPACT_MIN_RECORDS）时，后台线程会压缩：
+    先把日志改名为 `.journal.compacting` 并开始写新日志，再原子地写入新快照，最后删除旧日志，
+    压缩期间的修改不受影响。加载时读取快照，再依次重放这两个日志。
+    """
+
+    def __init__(self, data_file="sticky_notes.json", fsync=None, compact_records=COMPACT_MIN_RECORDS):
+        self.data_file = data_file
+        self.journal_file = data_file + JOURNAL_SUFFIX
+        self.compacting_file = data_file + COMPACTING_SUFFIX
+        self.fsync = fsync or os.environ.get("STICKY_NOTES_FSYNC", "everysec").lower()
+        if self.fsync not in FSYNC_POLICIES:
+            logger.warning(f"未知的 fsync 策略 '{self.fsync}'，使用 everysec")
+            self.fsync = "everysec"
+        self.compact_records = compact_records
+        self.notes = {}  # 便签ID -> 便签，按ID顺序
+        self.fields = {field: {} for field in SECONDARY_FIELDS}  # 字段 -> 小写取值 -> 便签ID集合
+        self.index = NoteIndex()
+        self.next_id = 1
+        self.records = 0  # 当前日志中的记录数
+        self.compactions = 0
+        self._dirty = False  # 有尚未同步到磁盘的记录
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._load_notes()
+        if os.path.exists(self.compacting_file):
+            # 上次压缩中途退出：当前数据已包含两个日志的内容，直接写成快照
+            self._write_snapshot(self.all(), self.next_id)
+            os.remove(self.compacting_file)
+            open(self.journal_file, 'wb').close()
+            self.records = 0
+        self._journal = open(self.journal_file, 'ab', buffering=0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._background, name='sticky-notes-journal', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _load_notes(self):
+        """从快照和日志中加载便签数据"""
+        if not any(os.path.exists(path) for path in (self.data_file, self.journal_file, self.compacting_file)):
+            logger.info("便签数据文件不存在，将创建新文件")
+            return
+        try:
+            snapshot, next_id = _read_snapshot(self.data_file) if os.path.exists(self.data_file) else ([], 1)
+            notes = {note["id"]: note for note in snapshot}
+        except ValueError:
+            # JSON 格式错误，或文件在多字节字符中间被截断（UnicodeDecodeError）。
+            # 快照是原子写入的，正常情况下不会损坏；保留损坏的文件，避免被新快照覆盖
+            corrupt_file = f"{self.data_file}.corrupt-{time.strftime('%Y%m%d%H%M%S')}"
+            os.replace(self.data_file, corrupt_file)
+            logger.error(f"便签数据文件损坏，已另存为 '{corrupt_file}'，仅从日志恢复")
+            notes, next_id = {}, None
+        except Exception as e:
+            # 其他错误（如没有读取权限）不能当作没有便签继续运行：之后的压缩会用不完整的数据覆盖快照，
+            # 新便签的ID也会与快照中的重复。不打开存储，日志和快照都保持原样
+            logger.error(f"加载便签数据失败: {e}")
+            raise
+        last_id = _replay(notes, self.compacting_file)[1]
+        self.records, journal_last_id = _replay(notes, self.journal_file)
+        if next_id is None:
+            # 旧版快照没有记录下一个ID，只能遍历一次
+            next_id = max(notes, default=0) + 1
+        self.next_id = max(next_id, last_id + 1, journal_last_id + 1)
+        self.notes = notes
+        for note in notes.values():
+            if "importance" not in note:
+                note["importance"] = DEFAULT_IMPORTANCE
+            if "category" not in note:
+                note["category"] = DEFAULT_CATEGORY
+            self._index_fields(note)
+        self.index = NoteIndex(notes.values())
+        logger.info(f"已从 '{self.data_file}' 加载 {len(self.notes)} 条便签")
+
+    def _append(self, record):
+        """向日志追加一条记录"""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+        with self._lock:
+            try:
+                self._journal.write(line)
+                self.records += 1
+                if self.fsync == "always":
+                    os.fsync(self._journal.fileno())
+                else:
+                    self._dirty = True
+            except (OSError, ValueError) as e:
+                logger.error(f"保存便签数据失败: {e}")
+
+    def _index_fields(self, note):
+        for field, values in self.fields.items():
+            ids = values.get(note[field].lower())
+            if ids is None:
+                values[note[field].lower()] = {note["id"]}
+            else:
+                ids.add(note["id"])
+
+    def _unindex_fields(self, note):
+        for field, values in self.fields.items():
+            ids = values[note[field].lower()]
+            ids.discard(note["id"])
+            if not ids:
+                del values[note[field].lower()]
+
+    def _write_snapshot(self, notes, next_id):
+        write_snapshot(self.data_file, notes, next_id)
+        logger.info(f"已保存 {len(notes)} 条便签到 '{self.data_file}'")
+
+    def _background(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            if self.fsync == "everysec":
+                self._sync()
+            if self.records >= max(self.compact_records, len(self.notes)):
+                try:
+                    self.compact()
+                except OSError as e:
+                    logger.error(f"压缩便签日志失败: {e}")
+
+    def _sync(self):
+        with self._lock:
+            if self._dirty and not self._journal.closed:
+                os.fsync(self._journal.fileno())
+                self._dirty = False
+
+    def compact(self):
+        """把当前便签写成新快照并清空日志，期间的修改写入新日志"""
+        with self._compact_lock:
+            with self._lock:
+                if self.records == 0 or self._journal.closed:
+                    return
+                notes = [dict(note) for note in self.all()]
+                next_id = self.next_id
+                self._journal.close()
+                os.replace(self.journal_file, self.compacting_file)
+                self._journal = open(self.journal_file, 'ab', buffering=0)
+                self.records = 0
+                self._dirty = False
+            self._write_snapshot(notes, next_id)
+            os.remove(self.compacting_file)
+            self.compactions += 1
+
+    def all(self):
+        return list(self.notes.values())
+
+    def count(self):
+        return len(self.notes)
+
+    def get(self, note_id):
+        return self.notes.get(note_id)
+
+    def add(self, content, timestamp, importance, category):
+        note = {
+            "id": self.next_id,
+            "content": content,
+            "timestamp": timestamp,
+            "importance": importance,
+            "category": category
+        }
+        self.notes[note["id"]] = note
+        self._index_fields(note)
+        self.index.add(note)
+        self.next_id += 1
+        self._append({"op": "add", "note": note})
+        return note
+
+    def update(self, note_id, changes):
+        """修改便签字段，返回修改后的便签；未找到时返回 None"""
+        note = self.get(note_id)
+        if note is None:
+            return None
+        reindex = any(field in changes for field in SECONDARY_FIELDS)
+        if reindex:
+            self._unindex_fields(note)
+        note.update(changes)
+        if reindex:
+            self._index_fields(note)
+        self.index.update(note)
+        self._append({"op": "update", "id": note_id, "set": changes})
+        return note
+
+    def delete(self, note_id):
+        """删除便签，返回是否找到"""
+        note = self.notes.pop(note_id, None)
+        if note is None:
+            return False
+        self._unindex_fields(note)
+        self.index.remove(note_id)
+        self._append({"op": "delete", "id": note_id})
+        return True
+
+    def search(self, keyword=None, importance=None, category=None, match="phrase", top_k=0):
+        ids = self._filter(importance=importance, category=category)
+        if not keyword:
+            notes = self.all() if ids is None else [self.notes[note_id] for note_id in sorted(ids)]
+            return notes[:top_k] if top_k else notes
+        accept = None if ids is None else (lambda note: note["id"] in ids)
+        return self.index.search(keyword, match, top_k, accept)
+
+    def _filter(self, **conditions):
+        """通过二级索引找出符合全部条件（不区分大小写）的便签ID集合；没有条件时返回 None"""
+        found = None
+        for field, value in conditions.items():
+            if not value:
+                continue
+            ids = self.fields[field].get(value.lower(), EMPTY)
+            found = ids if found is None else found & ids
+        return found
+
+    def close(self):
+        """停止后台线程，同步并关闭日志"""
+        self._stop.set()
+        with self._lock:
+            if not self._journal.closed:
+                if self._dirty:
+                    os.fsync(self._journal.fileno())
+                    self._dirty = False
+                self._journal.close()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    importance TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_category ON notes (category COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS notes_importance ON notes (importance COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS notes_timestamp ON notes (timestamp);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# 外部内容 FTS5 表，由触发器与 notes 表保持同步
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    content, content='notes', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF content ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO notes_fts (rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+TRIGRAM = 3  # trigram 分词器只能检索至少 3 个字符的关键词
+
+
+class SqliteNoteStore:
+    """便签保存在 SQLite 数据库中，搜索走索引和 FTS5 全文检索"""
+
+    def __init__(self, db_file="sticky_notes.db", json_file=None):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # 工具在线程池中执行，连接由锁保护，可跨线程使用
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 不会损坏数据库，断电时最多丢失最后提交的事务
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # SQLite 的 lower() 和 LIKE 只处理 ASCII 字母，短词改用 Python 的 str.lower()，与 JSON 后端一致
+        self._conn.create_function("py_lower", 1, str.lower, deterministic=True)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            # SQLite 低于 3.34 时没有 trigram 分词器，关键词搜索退回逐条匹配
+            logger.warning(f"无法启用 FTS5 trigram 全文检索，关键词搜索将逐条匹配: {e}")
+            self.fts = False
+        if json_file:
+            self._migrate(json_file)
+
+    def _migrate(self, json_file):
+        """把 JSON 文件中的便签一次性导入数据库"""
+        with self._lock:
+            if self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone() is not None:
+                return
+            if not any(os.path.exists(json_file + suffix) for suffix in ("", COMPACTING_SUFFIX, JOURNAL_SUFFIX)):
+                return
+            try:
+                notes = read_json_notes(json_file)
+            except Exception as e:
+                logger.error(f"读取 '{json_file}' 失败，未导入便签: {e}")
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO notes (id, content, timestamp, importance, category) VALUES (?, ?, ?, ?, ?)",
+                    [tuple(note.get(field) for field in FIELDS) for note in notes])
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)",
+                                   (os.path.abspath(json_file),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            logger.info(f"已从 '{json_file}' 导入 {len(notes)} 条便签到 '{self.db_file}'")
+
+    def _query(self, sql, params=()):
+        """查询便签，每行按 FIELDS 的顺序选出各列"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def all(self):
+        return self._query("SELECT id, content, timestamp, importance, category FROM notes ORDER BY id")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM notes").fetchone()[0]
+
+    def get(self, note_id):
+        rows = self._query("SELECT id, content, timestamp, importance, category FROM notes WHERE id = ?",
+                           (note_id,))
+        return rows[0] if rows else None
+
+    def add(self, content, timestamp, importance, category):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO notes (content, timestamp, importance, category) VALUES (?, ?, ?, ?)",
+                (content, timestamp, importance, category))
+            note_id = cursor.lastrowid
+        return {"id": note_id, "content": content, "timestamp": timestamp,
+                "importance": importance, "category": category}
+
+    def update(self, note_id, changes):
+        """修改便签字段，返回修改后的便签；未找到时返回 None"""
+        columns = [field for field in FIELDS[1:] if field in changes]
+        if columns:
+            assignments = ", ".join(f"{column} = ?" for column in columns)
+            with self._lock:
+                cursor = self._conn.execute(f"UPDATE notes SET {assignments} WHERE id = ?",
+                                            [changes[column] for column in columns] + [note_id])
+            if cursor.rowcount == 0:
+                return None
+        return self.get(note_id)
+
+    def delete(self, note_id):
+        """删除便签，返回是否找到"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM notes WHERE id = ?", (note_id,)).rowcount > 0
+
+    def _keyword_clause(self, term):
+        """缩小到可能包含小写词 `term` 的便签的 SQL 条件，结果仍需子串匹配确认"""
+        if self.fts and len(term) >= TRIGRAM:
+            return "id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)", '"' + term.replace('"', '""') + '"'
+        if term.lower() == term.upper():
+            # 不含大小写字母的词（如中文）直接按子串筛选
+            return "instr(content, ?) > 0", term
+        return "instr(py_lower(content), ?) > 0", term
+
+    def _select(self, clauses, params):
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, content, timestamp, importance, category FROM notes{where} ORDER BY id", params).fetchall()
+
+    def search(self, keyword=None, importance=None, category=None, match="phrase", top_k=0):
+        terms = query_terms(keyword, match)
+        if len(terms) > 1 or (terms and top_k):
+            return self._search_terms(terms, importance, category, match, top_k)
+        clauses, params = [], []
+        if terms:
+            clause, param = self._keyword_clause(terms[0])
+            clauses.append(clause)
+            params.append(param)
+        if importance:
+            clauses.append("importance = ? COLLATE NOCASE")
+            params.append(importance)
+        if category:
+            clauses.append("category = ? COLLATE NOCASE")
+            params.append(category)
+        rows = self._select(clauses, params)
+        if terms:
+            # 对候选结果再做一次与 JSON 后端相同的子串匹配，保证两种后端结果一致
+            rows = [row for row in rows if terms[0] in row[1].lower()]
+        if top_k:
+            rows = rows[:top_k]
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def _search_terms(self, terms, importance, category, match, top_k):
+        """多个词的 AND/OR 查询或 BM25 排序：逐词找出全部包含该词的便签，以得到每个词的文档频率"""
+        per_term = {}
+        rows = {}
+        for term in terms:
+            clause, param = self._keyword_clause(term)
+            ids = per_term[term] = set()
+            for row in self._select([clause], [param]):
+                if term in row[1].lower():
+                    ids.add(row[0])
+                    rows[row[0]] = row
+        sets = sorted(per_term.values(), key=len)
+        found = set.union(*sets) if match == "any" else set.intersection(*sets)
+        notes = {note_id: dict(zip(FIELDS, rows[note_id])) for note_id in found}
+        if importance or category:
+            notes = {note_id: note for note_id, note in notes.items() if matches(note, None, importance, category)}
+        if top_k:
+            with self._lock:
+                total, total_length = self._conn.execute("SELECT count(*), total(length(content)) FROM notes").fetchone()
+            texts = {note_id: row[1].lower() for note_id, row in rows.items()}
+            ids = bm25_top_k(per_term, set(notes), texts, total, total_length / total if total else 0, top_k)
+        else:
+            ids = sorted(notes)
+        return [notes[note_id] for note_id in ids]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(data_file="sticky_notes.json"):
+    """按 STICKY_NOTES_BACKEND 环境变量创建存储后端"""
+    backend = os.environ.get("STICKY_NOTES_BACKEND", "json").lower()
+    if backend == "sqlite":
+        db_file = os.environ.get("STICKY_NOTES_DB") or os.path.splitext(data_file)[0] + ".db"
+        return SqliteNoteStore(db_file, json_file=data_file)
+    if backend != "json":
+        logger.warning(f"未知的便签存储后端 '{backend}'，使用 json")
+    return JsonNoteStore(data_file)
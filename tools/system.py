@@ -11,6 +11,7 @@ import time
 import pyautogui
 from pathlib import Path
 from mcp.server.fastmcp import FastMCP
+from tools.cache import cached
 # 测试中，还没实现完
 
 
@@ -28,6 +29,7 @@ def get_desktop_path():
 
 def register_system_tools(mcp: FastMCP):
     @mcp.tool()
+    @cached(ttl=2)  # cpu_percent 需要采样 1 秒，短时间内重复查询直接返回缓存结果
     def get_server_status() -> dict:
         """
         获取服务器状态监控信息。